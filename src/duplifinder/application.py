@@ -6,7 +6,7 @@ import sys
 import time
 import re
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from .config import Config
 from watchdog.observers import Observer
@@ -15,6 +15,15 @@ from .watcher import CodeWatcher
 from .utils import PerformanceTracker, audit_log_event
 from .finder import find_definitions, find_text_matches, find_token_duplicates, find_search_matches
 from .output import render_duplicates, render_search, render_search_json
+from .processor_utils import is_policy_skip
+from .exceptions import ScanCancelled
+from .index import DefinitionIndex
+from .shard import partial_path, write_partial
+
+
+def _cancel_status(cancelled: Optional[ScanCancelled]) -> Dict[str, object]:
+    """Extra scan_completed audit fields for a cancelled scan."""
+    return {} if cancelled is None else {"status": "cancelled", "not_processed": cancelled.not_processed}
 
 
 class Workflow(ABC):
@@ -57,10 +66,11 @@ class Workflow(ABC):
         )
         observer = Observer()
 
-        # Watch the root directory
-        # If root is a file, watch its parent
-        watch_path = str(self.config.root) if self.config.root.is_dir() else str(self.config.root.parent)
-        observer.schedule(event_handler, watch_path, recursive=True)
+        # Watch every root directory
+        # If a root is a file, watch its parent
+        for root in self.config.scan_roots:
+            watch_path = str(root) if root.is_dir() else str(root.parent)
+            observer.schedule(event_handler, watch_path, recursive=True)
         observer.start()
 
         print("\n👀 Watching for changes...\n")
@@ -95,21 +105,29 @@ class SearchWorkflow(Workflow):
     """Workflow for Search Mode."""
 
     def run(self) -> int:
-        results, skipped, scanned = find_search_matches(self.config)
+        cancelled: Optional[ScanCancelled] = None
+        try:
+            results, skipped, scanned = find_search_matches(self.config, tracker=self.tracker)
+        except ScanCancelled as e:
+            cancelled = e
+            results, skipped, scanned = e.results
+            print(f"\n{e}; reporting the {scanned} files searched so far.", file=sys.stderr)
         self.tracker.mark_phase("Scanning")
         duration_ms = (time.perf_counter() - self.workflow_start) * 1000
 
         if self.config.json_output:
-            render_search_json(results, self.config, scanned, skipped)
+            render_search_json(results, self.config, scanned, skipped, cancelled=cancelled)
         else:
-            render_search(results, self.config)
+            render_search(results, self.config, cancelled)
         self.tracker.mark_phase("Rendering")
 
-        audit_log_event(self.config, "scan_completed", mode="search", scanned=scanned, skipped=len(skipped), duration_ms=duration_ms)
+        audit_log_event(self.config, "scan_completed", mode="search", scanned=scanned, skipped=len(skipped), duration_ms=duration_ms, **_cancel_status(cancelled))
 
         self.tracker.stop()
         self.tracker.print_metrics()
 
+        if cancelled is not None:
+            return 130
         has_multi = any(len(occ) > 1 for occ in results.values())
         return 1 if (self.config.fail_on_duplicates and has_multi) else 0
 
@@ -118,24 +136,32 @@ class TokenWorkflow(Workflow):
     """Workflow for Token Mode."""
 
     def run(self) -> int:
-        results, skipped, scanned, total_lines, dup_lines = find_token_duplicates(self.config)
+        cancelled: Optional[ScanCancelled] = None
+        try:
+            results, skipped, scanned, total_lines, dup_lines = find_token_duplicates(self.config, tracker=self.tracker)
+        except ScanCancelled as e:
+            cancelled = e
+            results, skipped, scanned, total_lines, dup_lines = e.results
+            print(f"\n{e}; reporting the {scanned} files scanned so far.", file=sys.stderr)
         self.tracker.mark_phase("Scanning")
         dup_rate = dup_lines / total_lines if total_lines else 0
         duration_ms = (time.perf_counter() - self.workflow_start) * 1000
 
         if dup_rate > self.config.dup_threshold:
             print(f"ALERT: Dup rate {dup_rate:.1%} > threshold {self.config.dup_threshold:.1%}", file=sys.stderr)
-            if self.config.fail_on_duplicates:
+            if self.config.fail_on_duplicates and cancelled is None:
                 return 1
 
-        render_duplicates(results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped, is_token=True)
+        render_duplicates(results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped, is_token=True, cancelled=cancelled)
         self.tracker.mark_phase("Rendering")
 
-        audit_log_event(self.config, "scan_completed", mode="token", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms)
+        audit_log_event(self.config, "scan_completed", mode="token", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms, **_cancel_status(cancelled))
 
         self.tracker.stop()
         self.tracker.print_metrics()
 
+        if cancelled is not None:
+            return 130
         return 0 if not self.config.fail_on_duplicates or dup_lines == 0 else 1
 
 
@@ -144,47 +170,68 @@ class PatternWorkflow(Workflow):
 
     def run(self) -> int:
         patterns = [re.compile(p) for p in self.config.pattern_regexes]
-        results, skipped, scanned, total_lines, dup_lines = find_text_matches(self.config, patterns)
+        cancelled: Optional[ScanCancelled] = None
+        try:
+            results, skipped, scanned, total_lines, dup_lines = find_text_matches(self.config, patterns, tracker=self.tracker)
+        except ScanCancelled as e:
+            cancelled = e
+            results, skipped, scanned, total_lines, dup_lines = e.results
+            print(f"\n{e}; reporting the {scanned} files scanned so far.", file=sys.stderr)
         self.tracker.mark_phase("Scanning")
         dup_rate = dup_lines / total_lines if total_lines else 0
         duration_ms = (time.perf_counter() - self.workflow_start) * 1000
 
-        render_duplicates(results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped)
+        render_duplicates(results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped, cancelled=cancelled)
         self.tracker.mark_phase("Rendering")
 
-        audit_log_event(self.config, "scan_completed", mode="text_pattern", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms)
+        audit_log_event(self.config, "scan_completed", mode="text_pattern", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms, **_cancel_status(cancelled))
 
         self.tracker.stop()
         self.tracker.print_metrics()
 
+        if cancelled is not None:
+            return 130
         return 0 if not self.config.fail_on_duplicates or dup_lines == 0 else 1
 
 
 class DefaultWorkflow(Workflow):
     """Workflow for Default (Definition) Mode."""
 
+    def scan(self) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
+        return find_definitions(self.config, tracker=self.tracker)
+
     def run(self) -> int:
-        results, skipped, scanned, total_lines, dup_lines = find_definitions(self.config)
+        cancelled: Optional[ScanCancelled] = None
+        try:
+            results, skipped, scanned, total_lines, dup_lines = self.scan()
+        except ScanCancelled as e:
+            cancelled = e
+            results, skipped, scanned, total_lines, dup_lines = e.results
+            print(f"\n{e}; reporting the {scanned} files scanned so far.", file=sys.stderr)
         self.tracker.mark_phase("Scanning")
         dup_rate = dup_lines / total_lines if total_lines else 0
         duration_ms = (time.perf_counter() - self.workflow_start) * 1000
 
-        # Scan fail if >10% skipped
-        skip_rate = len(skipped) / (scanned + len(skipped)) if scanned + len(skipped) > 0 else 0
-        if skip_rate > 0.1:
+        # Scan fail if >10% skipped (files left out by the large/generated file policy do not count).
+        # A cancelled scan is not judged on its partial counts: it reports and exits 130
+        failed = [s for s in skipped if not is_policy_skip(s)]
+        skip_rate = len(failed) / (scanned + len(failed)) if scanned + len(failed) > 0 else 0
+        if skip_rate > 0.1 and cancelled is None:
             print(f"SCAN FAIL: {skip_rate:.1%} files skipped (>10% threshold)", file=sys.stderr)
             audit_log_event(self.config, "scan_completed", mode="definitions", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, skip_rate=skip_rate, duration_ms=duration_ms, status="failed_skip_threshold")
             return 3  # Scan fail
 
         flat_results = self._flatten_definitions(results)
-        render_duplicates(flat_results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped)
+        render_duplicates(flat_results, self.config, False, dup_rate, self.config.dup_threshold, total_lines, dup_lines, scanned, skipped, cancelled=cancelled)
         self.tracker.mark_phase("Rendering")
 
-        audit_log_event(self.config, "scan_completed", mode="definitions", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms)
+        audit_log_event(self.config, "scan_completed", mode="definitions", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, dup_rate=dup_rate, duration_ms=duration_ms, **_cancel_status(cancelled))
 
         self.tracker.stop()
         self.tracker.print_metrics()
 
+        if cancelled is not None:
+            return 130  # Same code as an interrupted run, after the partial report
         return 0 if not self.config.fail_on_duplicates or dup_lines == 0 else 1
 
     def _flatten_definitions(self, results: Dict[str, Dict[str, List[Tuple[str, str]]]]) -> Dict[str, List[Tuple[str, str]]]:
@@ -197,6 +244,39 @@ class DefaultWorkflow(Workflow):
         return flat
 
 
+class ShardWorkflow(DefaultWorkflow):
+    """Workflow for one shard of a sharded definition scan: write the partial index, render nothing."""
+
+    def run(self) -> int:
+        results, skipped, scanned, total_lines, dup_lines = self.scan()
+        self.tracker.mark_phase("Scanning")
+        path = partial_path(self.config)
+        write_partial(path, self.config, results, skipped, scanned, total_lines, dup_lines)
+        self.tracker.mark_phase("Writing partial")
+        index, count = self.config.shard
+        duration_ms = (time.perf_counter() - self.workflow_start) * 1000
+        print(f"Shard {index}/{count}: {scanned} files scanned, partial index written to {path}")
+
+        audit_log_event(self.config, "scan_completed", mode="definitions", shard=f"{index}/{count}", scanned=scanned, skipped=len(skipped), total_lines=total_lines, dup_lines=dup_lines, duration_ms=duration_ms, partial=str(path))
+
+        self.tracker.stop()
+        self.tracker.print_metrics()
+
+        return 0  # Thresholds and --fail apply to the merged report
+
+
+class MergeWorkflow(DefaultWorkflow):
+    """Workflow for `duplifinder merge`: report the combined partial indexes of a sharded scan."""
+
+    def __init__(self, config: Config, tracker: PerformanceTracker, workflow_start: float, index: DefinitionIndex):
+        super().__init__(config, tracker, workflow_start)
+        self.index = index
+
+    def scan(self) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
+        index = self.index
+        return index.definitions, index.skipped, index.scanned, index.total_lines, index.dup_lines
+
+
 class WorkflowFactory:
     """Factory to create the appropriate workflow."""
 
@@ -208,5 +288,7 @@ class WorkflowFactory:
             return TokenWorkflow(config, tracker, workflow_start)
         elif config.pattern_regexes:
             return PatternWorkflow(config, tracker, workflow_start)
+        elif config.shard is not None:
+            return ShardWorkflow(config, tracker, workflow_start)
         else:
             return DefaultWorkflow(config, tracker, workflow_start)
@@ -2,13 +2,11 @@
 
 """AST file processor for definition extraction."""
 
-import fnmatch
 import logging
-import tokenize
 import re  # For exclude_names
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import ast
 
@@ -17,35 +15,81 @@ from .config import Config
 from .utils import audit_log_event
 from .exceptions import FileProcessingError
 from .cache import CacheManager
+from .file_loader import SourceFile
+from .processor_utils import generated_reason, oversize_reason, skip_by_policy
 
+# Line-based definition scan for streamed files (no parse; may see defs inside multi-line strings)
+_DEF_LINE_RE = re.compile(r"^([ \t]*)(async[ \t]+def|def|class)[ \t]+([A-Za-z_]\w*)")
+_DEF_TYPES = {"class": "class", "def": "def"}
+
+
+def _stream_definitions(source: SourceFile, str_py_file: str, config: Config) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], int]:
+    """Collect definitions one line at a time in bounded memory; methods are named Class.method as in the AST path."""
+    definitions: Dict[str, Dict[str, List[Tuple[str, str]]]] = {t: defaultdict(list) for t in config.types_to_search}
+    classes: List[Tuple[int, str]] = []  # (indent, name) of enclosing classes
+    total_lines = 0
+    for total_lines, line in enumerate(source.iter_lines(), 1):
+        m = _DEF_LINE_RE.match(line)
+        if m is None:
+            continue
+        indent = len(m.group(1).expandtabs())
+        while classes and classes[-1][0] >= indent:
+            classes.pop()
+        typ = _DEF_TYPES.get(m.group(2), "async_def")
+        name = m.group(3)
+        if typ == "class":
+            classes.append((indent, name))
+        elif classes:
+            name = f"{classes[-1][1]}.{name}"
+        if typ not in config.types_to_search or any(re.match(pat, name) for pat in config.exclude_names):
+            continue
+        definitions[typ][name].append((f"{str_py_file}:{total_lines}", ""))
+    return definitions, total_lines
 
-def process_file_ast(py_file: Path, config: Config, cache_manager: CacheManager = None) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], str | None, int]:
-    """Process a single Python file for definitions using AST; return total_lines."""
-    str_py_file = str(py_file)
-    if any(fnmatch.fnmatch(py_file.name, pat) for pat in config.exclude_patterns):
-        if config.verbose:
-            logging.info(f"Skipping {str_py_file}: matches exclude pattern")
-        audit_log_event(config, "file_skipped", path=str_py_file, reason="exclude_pattern_match")
-        return {}, str_py_file, 0
 
-    # Cache check
-    file_hash = None
-    if cache_manager:
-        file_hash = CacheManager.compute_hash(py_file)
-        if file_hash:
-            cached = cache_manager.get(str_py_file, file_hash)
-            if cached:
-                if config.verbose:
-                    logging.info(f"Cache hit for {str_py_file}")
-                return cached["definitions"], None, cached["total_lines"]
+def process_file_ast(py_file: Path, config: Config, cache_manager: CacheManager = None, source: Optional[SourceFile] = None) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]] | None, str | None, int]:
+    """Process a single Python file for definitions using AST; return total_lines.
 
+    source is the file already read (e.g. by a pipeline reader stage); otherwise it is loaded here.
+    Returns (None, None, 0) for a .py file whose content has no Python markers (not scanned, not skipped).
+    """
+    str_py_file = str(py_file)
     total_lines = 0
     try:
         # Audit: Log open attempt
         audit_log_event(config, "file_opened", path=str_py_file, action="ast_open")
-        # Encoding-aware open with fallback
-        with tokenize.open(py_file) as fh:  # Handles BOM/encoding
-            text = fh.read()
+        # Single read; sniff, cache hash, encoding detection and parsing share the buffer
+        with source if source is not None else SourceFile.load(py_file, max_bytes=config.max_file_bytes) as source:
+            if py_file.suffix == ".py" and not source.looks_like_python():
+                audit_log_event(config, "file_skipped", path=str_py_file, reason="No Python markers")
+                logging.info(f"Skipping non-Py content '{str_py_file}': No Python markers")
+                return None, None, 0
+
+            skip_reason = generated_reason(source, config)
+            oversize = oversize_reason(source, config) if skip_reason is None else None
+            if oversize and config.large_file_mode == "skip":
+                skip_reason = oversize
+            if skip_reason:
+                return skip_by_policy(str_py_file, skip_reason, config)
+
+            # Cache check
+            file_hash = None
+            if cache_manager:
+                file_hash = source.digest()
+                cached = cache_manager.get(str_py_file, file_hash)
+                if cached:
+                    if config.verbose:
+                        logging.info(f"Cache hit for {str_py_file}")
+                    return cached["definitions"], None, cached["total_lines"]
+
+            if oversize:
+                definitions, total_lines = _stream_definitions(source, str_py_file, config)
+                audit_log_event(config, "file_parsed", path=str_py_file, action="ast_stream", bytes_read=source.size, lines=total_lines, reason=oversize)
+                if cache_manager and file_hash:
+                    cache_manager.set(str_py_file, file_hash, {"definitions": definitions, "total_lines": total_lines})
+                return definitions, None, total_lines
+
+            text = source.text()  # Handles BOM/encoding cookie
         bytes_read = len(text)
         total_lines = len(text.splitlines())
         audit_log_event(config, "file_parsed", path=str_py_file, action="ast_success", bytes_read=bytes_read, lines=total_lines)
@@ -0,0 +1,216 @@
+# src/duplifinder/audit.py
+
+"""Buffered audit log: one writer thread batches the JSONL events of every thread and process-pool worker."""
+
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Default for --audit-flush-interval: the log on disk lags the scan by at most this much
+AUDIT_FLUSH_SECONDS = 1.0
+# How long flush_audit_log waits for the writer before giving up
+_FLUSH_TIMEOUT = 5.0
+# How often a retired listener checks whether its pool's workers are gone
+_POLL_SECONDS = 0.1
+_STOP = object()
+
+
+class AuditWriter:
+    """Appends lines to one audit file from a background thread, flushing every flush_interval seconds.
+
+    The file is opened once, when the writer is created (so an unwritable path fails in the
+    caller), and written through its buffer; write() only queues the line.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = AUDIT_FLUSH_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        self._queue.put(line)
+
+    def flush(self, timeout: Optional[float] = _FLUSH_TIMEOUT) -> bool:
+        """Write out everything queued so far; False if the writer did not get to it within timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(_FLUSH_TIMEOUT)
+
+    def _run(self) -> None:
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval if dirty else None)
+            except queue.Empty:
+                item = None  # Interval elapsed with writes pending
+            try:
+                if isinstance(item, str):
+                    self._file.write(item)
+                    dirty = True
+                    continue
+                if dirty:
+                    self._file.flush()
+                    dirty = False
+            except (OSError, ValueError) as e:
+                logging.warning(f"Audit log write failed: {e}")
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                self._file.close()
+                return
+
+
+_writers: Dict[Tuple[Path, float], AuditWriter] = {}
+_writers_lock = threading.Lock()
+
+# In process-pool workers: where events go instead (set by the pool initializer)
+_worker_queue: Optional[Any] = None
+
+# In the parent: one listener per process pool, until its workers are gone
+_listeners: List["AuditListener"] = []
+_flush_ids = itertools.count()
+
+
+def _deliver(path: Path, flush_interval: float, line: str) -> None:
+    key = (path, flush_interval)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = AuditWriter(path, flush_interval)
+    writer.write(line)
+
+
+def emit(path: Path, flush_interval: float, line: str) -> None:
+    """Queue one JSONL line for path's writer; in a process-pool worker, send it to the parent's."""
+    if _worker_queue is not None:
+        _worker_queue.put((path, flush_interval, line))
+    else:
+        _deliver(path, flush_interval, line)
+
+
+class AuditListener:
+    """The audit queue of one process pool's workers, drained into this process's writers by a thread.
+
+    Each pool gets its own queue, so a pool whose workers were terminated (possibly while
+    holding the queue's lock, or halfway through a message) takes its queue down with it.
+    Call retire() with the pool's worker processes when the pool is shut down: once they
+    have exited, a sentinel queued behind their last events stops the thread.
+    """
+
+    def __init__(self, context: Any):
+        # SimpleQueue writes to the pipe in put() itself (no feeder thread), so a worker's
+        # events are in the parent's queue before the result of the task that emitted them
+        self.events = context.SimpleQueue()
+        self._workers: List[Any] = []
+        self._retired = threading.Event()
+        self._flushes: Dict[int, threading.Event] = {}
+        self._thread = threading.Thread(target=self._run, name="audit-listener", daemon=True)
+        with _writers_lock:
+            _listeners.append(self)
+        self._thread.start()
+
+    def flush(self, timeout: Optional[float] = _FLUSH_TIMEOUT) -> bool:
+        """Wait until every event sent so far is with its writer; False on timeout."""
+        if self._retired.is_set():
+            self._thread.join(timeout)  # Nothing can be sent any more: wait for the rest to drain
+            if self._thread.is_alive():
+                # A worker killed mid-message left the queue unreadable; do not wait on it again
+                logging.warning("Audit events of a terminated worker pool could not be read; dropping its queue")
+                self._forget()
+                return False
+            return True
+        marker = next(_flush_ids)
+        self._flushes[marker] = done = threading.Event()
+        try:
+            self.events.put(marker)
+        except OSError:
+            return self.flush(timeout)  # Retired and closed meanwhile
+        return done.wait(timeout)
+
+    def retire(self, workers: Iterable[Any] = ()) -> None:
+        """Stop listening once workers (the pool's processes) have exited and their events are delivered."""
+        self._workers = list(workers)
+        self._retired.set()
+        threading.Thread(target=self._stop_when_exited, name="audit-retire", daemon=True).start()
+
+    def _stop_when_exited(self) -> None:
+        while any(worker.is_alive() for worker in self._workers):
+            time.sleep(_POLL_SECONDS)
+        self.events.put(None)  # Behind everything the workers sent
+
+    def _forget(self) -> None:
+        with _writers_lock:
+            if self in _listeners:
+                _listeners.remove(self)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    message = self.events.get()
+                except (EOFError, OSError):
+                    return
+                except Exception as e:  # Unpicklable message: skip it, keep the rest coming
+                    logging.warning(f"Dropped an unreadable audit event from a worker: {e}")
+                    continue
+                if message is None:
+                    return  # Retired and its workers are gone
+                if isinstance(message, int):  # flush marker: everything before it is delivered
+                    done = self._flushes.pop(message, None)
+                    if done is not None:
+                        done.set()
+                    continue
+                try:
+                    _deliver(*message)
+                except Exception as e:
+                    logging.warning(f"Audit log write failed: {e}")
+        finally:
+            self.events.close()
+            self._forget()
+
+
+def set_worker_queue(events: Any) -> None:
+    """Pool initializer side of AuditListener: send this worker's events to the parent."""
+    global _worker_queue
+    _worker_queue = events
+
+
+def flush_audit_log() -> None:
+    """Write every audit event emitted so far to disk, process-pool workers' included.
+
+    Writers also flush on their own every flush interval, and at exit.
+    """
+    for listener in list(_listeners):
+        listener.flush()
+    for writer in list(_writers.values()):
+        writer.flush()
+
+
+def close_audit_log() -> None:
+    """Flush and close every audit writer (registered to run at exit)."""
+    for listener in list(_listeners):
+        if not listener._retired.is_set():
+            listener.retire()
+    flush_audit_log()
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_audit_log)
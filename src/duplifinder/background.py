@@ -0,0 +1,117 @@
+# src/duplifinder/background.py
+
+"""Resource limits for scans that share a host with builds: lower priority, fewer workers, rate-limited reads."""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from .config import Config
+
+# --background: niceness the scan runs at (never lowered if already higher)
+BACKGROUND_NICENESS = 10
+# --background: fraction of the cores used for workers when --max-workers is not given
+BACKGROUND_CPU_SHARE = 0.25
+# --background: reader threads of the --pipeline scan (4 otherwise)
+BACKGROUND_READERS = 1
+# --background without --io-rate: read bandwidth cap in bytes per second
+BACKGROUND_IO_RATE = 32 * 1024 * 1024
+
+
+class ReadThrottle:
+    """Token bucket limiting the bytes read per second; thread-safe.
+
+    Up to one second of reads may go through as a burst. A read that overdraws the
+    bucket is let through after sleeping off its debt, so large files are throttled too
+    rather than waiting for a bucket that never holds them whole.
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.bytes = 0
+        self.waited = 0.0
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int) -> float:
+        """Account for a read of nbytes, sleeping as long as the rate requires; returns the time slept."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.rate), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= nbytes
+            self.bytes += nbytes
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait:
+            time.sleep(wait)  # Outside the lock: later readers queue behind the debt instead
+        return wait
+
+
+# This process's throttle, installed by apply_limits
+_throttle: Optional[ReadThrottle] = None
+
+
+def throttle_read(nbytes: int) -> None:
+    """Called before reading nbytes of a source file; a no-op unless a read rate is in effect."""
+    if _throttle is not None and nbytes:
+        _throttle.consume(nbytes)
+
+
+def limited(config: Config) -> bool:
+    """True when config asks for background mode or a read rate cap."""
+    return config.background or config.io_rate is not None
+
+
+def io_rate(config: Config) -> Optional[int]:
+    """Read bandwidth cap in bytes per second: io_rate, or BACKGROUND_IO_RATE in background mode."""
+    if config.io_rate is not None:
+        return config.io_rate
+    return BACKGROUND_IO_RATE if config.background else None
+
+
+def background_workers() -> int:
+    """Default worker count in background mode: BACKGROUND_CPU_SHARE of the cores, at least one."""
+    return max(1, int((os.cpu_count() or 4) * BACKGROUND_CPU_SHARE))
+
+
+def lower_priority() -> Optional[int]:
+    """Raise this process's niceness to BACKGROUND_NICENESS; returns the niceness in effect (None without os.nice)."""
+    if not hasattr(os, "nice"):
+        return None
+    niceness = os.nice(0)
+    if niceness < BACKGROUND_NICENESS:
+        try:
+            niceness = os.nice(BACKGROUND_NICENESS - niceness)
+        except OSError as e:
+            logging.warning(f"Could not lower the scan's priority: {e}")
+    return niceness
+
+
+def apply_limits(config: Config, share: int = 1) -> None:
+    """Put this process under config's background/io_rate limits (none, if it sets neither); called as each scan starts.
+
+    share is how many processes split the read rate: process-pool workers each get
+    1/share of it, while the threads of one process share a single throttle. A lowered
+    priority is kept for the life of the process.
+    """
+    global _throttle
+    if config.background:
+        lower_priority()
+    rate = io_rate(config)
+    rate = max(1, rate // share) if rate is not None else None
+    if rate is None:
+        _throttle = None
+    elif _throttle is None or _throttle.rate != rate:
+        _throttle = ReadThrottle(rate)
+
+
+def throughput_summary(config: Config, files: int, nbytes: int, seconds: float) -> str:
+    """Throughput of a throttled scan, next to the limits it ran under, for the metrics table."""
+    seconds = max(seconds, 1e-9)
+    rate = io_rate(config)
+    cap = f"cap {rate / 1048576:.1f} MiB/s" if rate is not None else "no read cap"
+    return f"{files / seconds:.1f} files/s, {nbytes / 1048576 / seconds:.2f} MiB/s ({cap})"
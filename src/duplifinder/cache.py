@@ -2,11 +2,14 @@
 
 import hashlib
 import json
+import os
 import time
 import logging
+import threading
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from .background import throttle_read
 from .config import Config
 
 class CacheManager:
@@ -55,6 +58,23 @@ class CacheManager:
             return entry.get("data")
         return None
 
+    def get_stored(self, file_path: str, mtime: Optional[float] = None) -> Optional[Any]:
+        """Retrieve the stored result without hashing; None if the file was modified (mtime) after it was stored."""
+        entry = self.data.get(str(file_path))
+        if not isinstance(entry, dict):
+            return None
+        if mtime is not None and mtime > entry.get("timestamp", 0):
+            return None
+        return entry.get("data")
+
+    def get_git_head(self, root: Path) -> Optional[str]:
+        """Commit of root's repository when the stored results were last saved, if recorded."""
+        return self.data.get("_git_heads", {}).get(str(root))
+
+    def set_git_head(self, root: Path, commit: Optional[str]):
+        if commit:
+            self.data.setdefault("_git_heads", {})[str(root)] = commit
+
     def set(self, file_path: str, file_hash: str, data: Any):
         """Update cache entry."""
         self.data[str(file_path)] = {
@@ -63,12 +83,21 @@ class CacheManager:
             "data": data
         }
 
+    def slice(self, paths: Iterable[Path]) -> "CacheSlice":
+        """The entries of paths only, for a process-pool task (instead of pickling the whole cache)."""
+        return CacheSlice({str(p): self.data[str(p)] for p in paths if str(p) in self.data})
+
+    def update(self, entries: Dict[str, Any]):
+        """Take in the entries a CacheSlice recorded (CacheSlice.updates)."""
+        self.data.update(entries)
+
     @staticmethod
     def compute_hash(file_path: Path) -> Optional[str]:
         """Compute MD5 hash of a file."""
         try:
             hasher = hashlib.md5()
             with open(file_path, "rb") as f:
+                throttle_read(os.fstat(f.fileno()).st_size)
                 # Read in chunks to avoid memory issues
                 for chunk in iter(lambda: f.read(4096), b""):
                     hasher.update(chunk)
@@ -83,6 +112,164 @@ class CacheManager:
             "types_to_search": sorted(list(config.types_to_search)),
             "exclude_patterns": sorted(list(config.exclude_patterns)),
             "exclude_names": sorted(list(config.exclude_names)),
+            # Streamed files yield line-scanned results, so the large-file policy is part of the key
+            "large_file_policy": [config.max_file_bytes, config.max_file_lines, config.large_file_mode, config.skip_generated],
             # Add other fields if they affect parsing
         }
         return hashlib.md5(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CacheSlice:
+    """Part of a CacheManager shipped to a process-pool worker, with the same get/set as the full cache.
+
+    Entries set in the worker are kept in updates.
+    """
+
+    def __init__(self, entries: Dict[str, Any]):
+        self.entries = entries
+        self.updates: Dict[str, Any] = {}
+
+    def get(self, file_path: str, file_hash: str) -> Optional[Any]:
+        entry = self.entries.get(str(file_path))
+        if entry and entry.get("hash") == file_hash:
+            return entry.get("data")
+        return None
+
+    def set(self, file_path: str, file_hash: str, data: Any):
+        self.entries[str(file_path)] = self.updates[str(file_path)] = {
+            "hash": file_hash,
+            "timestamp": time.time(),
+            "data": data
+        }
+
+
+class DiscoveryCache:
+    """Persistent snapshot of directory listings, keyed on each directory's mtime."""
+
+    VERSION = 2
+    # Listings younger than this may still change within the same mtime tick ("racy" entries)
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self.dirs: Dict[str, Any] = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._seen_dirs: set = set()
+        self._lock = threading.Lock()  # Roots are discovered concurrently
+        self.load()
+
+    def load(self):
+        """Load the snapshot from disk; start fresh on any error or version mismatch."""
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if loaded.get("version") == self.VERSION:
+                self.dirs = loaded.get("dirs", {})
+        except Exception as e:
+            logging.warning(f"Failed to load discovery cache: {e}. Starting fresh.")
+            self.dirs = {}
+
+    def save(self):
+        """Save the snapshot to disk if anything changed."""
+        if not self.dirty:
+            return
+        # Drop entries for paths that no longer exist (only for the parts consulted this run)
+        if self._seen_dirs:
+            self.dirs = {k: v for k, v in self.dirs.items() if k in self._seen_dirs}
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "dirs": self.dirs}, f)
+            self.dirty = False
+        except Exception as e:
+            logging.warning(f"Failed to save discovery cache: {e}")
+
+    def get_listing(self, directory: str, mtime_ns: int) -> Optional[Tuple[List[str], List[str]]]:
+        """Return cached (subdir names, file names) if the directory mtime is unchanged."""
+        with self._lock:
+            self._seen_dirs.add(directory)
+            entry = self.dirs.get(directory)
+            if entry and entry[0] == mtime_ns:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            return None
+
+    def set_listing(self, directory: str, mtime_ns: int, dir_names: List[str], file_names: List[str]):
+        """Record a fresh listing, unless the mtime is too recent to be trusted."""
+        with self._lock:
+            self._seen_dirs.add(directory)
+            if time.time_ns() - mtime_ns < self.RACY_WINDOW_NS:
+                self.dirs.pop(directory, None)
+                return
+            self.dirs[directory] = [mtime_ns, dir_names, file_names]
+            self.dirty = True
+
+
+class CostHistory:
+    """Per-file processing times from previous runs, used to start the most expensive files first."""
+
+    VERSION = 1
+    # Weight of the newest measurement in the running estimate
+    SMOOTHING = 0.5
+    # Parse throughput assumed before any history exists (roughly ast.parse speed)
+    DEFAULT_SECONDS_PER_BYTE = 1e-7
+
+    def __init__(self, cache_path: Path, section: str):
+        self.cache_path = cache_path
+        self.section = section
+        self.sections: Dict[str, Dict[str, float]] = {}
+        self.dirty = False
+        self.load()
+
+    @property
+    def costs(self) -> Dict[str, float]:
+        return self.sections.setdefault(self.section, {})
+
+    def load(self):
+        """Load history from disk; start fresh on any error or version mismatch."""
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if loaded.get("version") == self.VERSION:
+                self.sections = loaded.get("sections", {})
+        except Exception as e:
+            logging.warning(f"Failed to load cost history: {e}. Starting fresh.")
+            self.sections = {}
+
+    def save(self):
+        """Save history to disk if anything was recorded."""
+        if not self.dirty:
+            return
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "sections": self.sections}, f)
+            self.dirty = False
+        except Exception as e:
+            logging.warning(f"Failed to save cost history: {e}")
+
+    def record(self, file_path: str, seconds: float):
+        """Fold a new measurement into the file's running estimate."""
+        costs = self.costs
+        previous = costs.get(file_path)
+        costs[file_path] = seconds if previous is None else previous + self.SMOOTHING * (seconds - previous)
+        self.dirty = True
+
+    def seconds_per_byte(self, sizes: Dict[str, int]) -> float:
+        """Throughput observed for files with both a recorded cost and a known size."""
+        costs = self.costs
+        known = [(costs[p], size) for p, size in sizes.items() if p in costs and size]
+        total_bytes = sum(size for _, size in known)
+        if not total_bytes:
+            return self.DEFAULT_SECONDS_PER_BYTE
+        return sum(cost for cost, _ in known) / total_bytes
+
+    def expected(self, file_path: str, size: int, seconds_per_byte: float) -> float:
+        """Recorded cost, or an estimate from the file size."""
+        cost = self.costs.get(file_path)
+        return cost if cost is not None else size * seconds_per_byte
@@ -5,7 +5,7 @@
 import argparse
 import logging
 import pathlib
-from typing import Dict
+from typing import Any, Dict, Tuple
 from importlib import metadata
 
 from .config import Config, load_config_file, DEFAULT_IGNORES
@@ -20,7 +20,7 @@ def create_parser() -> argparse.ArgumentParser:
     )
     
     # Positional: Scan roots
-    parser.add_argument("root", nargs="*", help="Root directory to scan or find arguments.")
+    parser.add_argument("root", nargs="*", help="Root directories to scan (several are merged into one index) or find arguments.")
     
     # Config & Filtering Groups
     config_group = parser.add_argument_group("Configuration & Filtering")
@@ -29,6 +29,7 @@ def create_parser() -> argparse.ArgumentParser:
     config_group.add_argument("--exclude-patterns", default="", help="Comma-separated glob patterns for files to exclude.")
     config_group.add_argument("--exclude-names", default="", help="Comma-separated regex patterns for definition names to exclude.")
     config_group.add_argument("--no-gitignore", action="store_true", help="Disable auto-respect of .gitignore patterns (default: respect).")
+    config_group.add_argument("--no-git-index", action="store_true", help="Walk the filesystem even when the root is a git work tree (default: read the git index).")
     
     # Scan Mode Groups
     scan_group = parser.add_argument_group("Scan Modes")
@@ -45,8 +46,26 @@ def create_parser() -> argparse.ArgumentParser:
     behavior_group.add_argument("--min", type=int, default=2, help="Min occurrences to report as duplicate.")
     behavior_group.add_argument("--parallel", action="store_true", help="Scan files in parallel.")
     behavior_group.add_argument("--use-multiprocessing", action="store_true", help="Use multiprocessing instead of threading.")
+    behavior_group.add_argument("--executor", choices=["auto", "sequential", "threads", "processes"], help="Execution strategy (overrides --parallel/--use-multiprocessing); auto picks one from file count, size, mode and whether Python is free-threaded.")
     behavior_group.add_argument("--max-workers", type=int, help="Max workers for parallel processing.")
+    behavior_group.add_argument("--max-memory", type=parse_size, metavar="SIZE", help="Memory budget for the scan (e.g. 8G, 512M): caps the worker count and throttles process workers by their measured RSS, recycling them periodically.")
+    behavior_group.add_argument("--background", action="store_true", help="Run as a background job beside builds: lower CPU priority, use a quarter of the cores (unless --max-workers), one reader thread and a read rate cap (--io-rate, default 32M per second).")
+    behavior_group.add_argument("--io-rate", type=parse_size, metavar="SIZE", help="Cap file reads at SIZE bytes per second (e.g. 20M), shared by all workers.")
+    behavior_group.add_argument("--max-in-flight", type=int, metavar="N", help="Max tasks pending in the worker pool at once (default: two per worker).")
+    behavior_group.add_argument("--chunk-size", type=int, metavar="N", help="Files per task with --use-multiprocessing (default: adaptive, by file count and bytes).")
+    behavior_group.add_argument("--pipeline", action="store_true", help="Definition mode: parse files while discovery is still walking, through bounded queues between discovery, reader, parser and merge stages.")
+    behavior_group.add_argument("--task-timeout", type=float, metavar="SECONDS", help="Abandon a file still processing after SECONDS, replace its worker and report it as skipped (parallel runs only; enforced with processes, since threads cannot be stopped).")
+    behavior_group.add_argument("--discovery-workers", type=int, metavar="N", help="Concurrent directory listings during discovery (default: 1; raise on NFS and other high-latency storage).")
     behavior_group.add_argument("--watch", action="store_true", help="Watch mode: live scanning on file changes.")
+    behavior_group.add_argument("--cache", action="store_true", help="Cache per-file results and directory listings between runs.")
+    behavior_group.add_argument("--max-file-bytes", type=int, metavar="N", help="Skip (or stream) files larger than N bytes (default: 10 MiB; 0 disables).")
+    behavior_group.add_argument("--max-file-lines", type=int, metavar="N", help="Skip (or stream) files with more than N lines (default: 100000; 0 disables).")
+    behavior_group.add_argument("--large-file-mode", choices=["skip", "stream"], help="What to do with files over the limits: skip them (default) or scan them line by line in bounded memory.")
+    behavior_group.add_argument("--include-generated", action="store_true", help="Scan files detected as generated or minified (skipped by default).")
+    behavior_group.add_argument("--no-dedupe-files", action="store_true", help="Parse identical files separately instead of reporting them as one file-level clone group.")
+    behavior_group.add_argument("--shard", type=parse_shard, metavar="K/N", help="Definition mode: scan only shard K of N (files split by path hash) and write a partial index for 'duplifinder merge' instead of a report.")
+    behavior_group.add_argument("--shard-output", metavar="PATH", help="Partial index file for --shard (default: .duplifinder_shard_K_of_N.json).")
+    behavior_group.add_argument("--since", metavar="REF", help="Re-process only files changed since git REF; other results come from the stored index (--cache file).")
 
     # Output & Misc
     output_group = parser.add_argument_group("Output & Misc")
@@ -56,6 +75,7 @@ def create_parser() -> argparse.ArgumentParser:
     output_group.add_argument("--verbose", action="store_true", help="Print detailed logs.")
     output_group.add_argument("--audit", action="store_true", help="Enable audit logging for file access trails (JSONL).")
     output_group.add_argument("--audit-log", type=str, help="Path for audit log output (defaults to .duplifinder_audit.jsonl).")
+    output_group.add_argument("--audit-flush-interval", type=float, metavar="SECONDS", help="How often buffered audit events are written to disk (default: 1; always at exit).")
     
     try:
         __version__ = metadata.version("duplifinder")
@@ -66,6 +86,134 @@ def create_parser() -> argparse.ArgumentParser:
     return parser
 
 
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(value: str) -> int:
+    """argparse type for byte sizes: a number with an optional K/M/G/T suffix (binary units; 'B'/'iB' allowed)."""
+    text = str(value).strip().upper().removesuffix("B").removesuffix("I")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    try:
+        size = int(float(text[: len(text) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 512M or 8G, got '{value}'")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got '{value}'")
+    return size
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """argparse type for --shard: 'K/N' with 1 <= K <= N."""
+    index, sep, count = value.partition("/")
+    try:
+        if not sep:
+            raise ValueError
+        shard = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N (e.g. 2/8), got '{value}'")
+    if not 1 <= shard[0] <= shard[1]:
+        raise argparse.ArgumentTypeError(f"need 1 <= K <= N, got '{value}'")
+    return shard
+
+
+def create_coordinate_parser() -> argparse.ArgumentParser:
+    """Parser for `duplifinder coordinate`: the usual scan options, with parsing farmed out to `duplifinder work` processes."""
+    parser = create_parser()
+    parser.prog = "duplifinder coordinate"
+    parser.description = "Discover files and hand them out in batches to 'duplifinder work' processes, then report as a local scan would."
+    group = parser.add_argument_group("Coordinator")
+    group.add_argument("--listen", required=True, metavar="ADDRESS", help="host:port (port 0 picks a free one) or Unix socket path to serve batches on.")
+    group.add_argument("--authkey", help="Shared secret workers must present (default: $DUPLIFINDER_AUTHKEY, else a generated key that is printed).")
+    group.add_argument("--batch-files", type=int, metavar="N", help="Files per batch handed to a worker (default: 64).")
+    return parser
+
+
+def create_work_parser() -> argparse.ArgumentParser:
+    """Parser for `duplifinder work`: pull batches from a coordinator until the scan is done."""
+    parser = argparse.ArgumentParser(
+        prog="duplifinder work",
+        description="Process batches of files for a 'duplifinder coordinate' run. Start it in the directory the coordinator runs in (paths are sent as discovered).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--connect", required=True, metavar="ADDRESS", help="Coordinator address: host:port or Unix socket path.")
+    parser.add_argument("--authkey", help="Shared secret (default: $DUPLIFINDER_AUTHKEY).")
+    parser.add_argument("--executor", choices=["auto", "sequential", "threads", "processes"], default="auto", help="How this machine processes each batch.")
+    parser.add_argument("--max-workers", type=int, help="Max local workers per batch.")
+    parser.add_argument("--connect-timeout", type=float, default=30.0, metavar="SECONDS", help="How long to retry while the coordinator is not listening yet.")
+    parser.add_argument("--verbose", action="store_true", help="Print detailed logs.")
+    return parser
+
+
+def create_merge_parser() -> argparse.ArgumentParser:
+    """Parser for `duplifinder merge`: combine the partial indexes of a --shard run and report."""
+    parser = argparse.ArgumentParser(
+        prog="duplifinder merge",
+        description="Combine the partial index files written by 'duplifinder --shard K/N' runs into one report.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("partials", nargs="+", help="Partial index files, one per shard.")
+    parser.add_argument("--config", help="Path to configuration file (.duplifinder.yaml) for output settings.")
+    parser.add_argument("--min", type=int, help="Min occurrences to report as duplicate.")
+    parser.add_argument("--dup-threshold", type=float, help="Duplication rate threshold for alerts (0.0-1.0, default: 0.1).")
+    parser.add_argument("-p", "--preview", action="store_true", help="Show formatted preview of duplicates.")
+    parser.add_argument("--json", action="store_true", help="Output as JSON.")
+    parser.add_argument("--html-report", metavar="PATH", help="Also write an HTML report to PATH.")
+    parser.add_argument("--fail", action="store_true", help="Exit 1 if duplicates found.")
+    parser.add_argument("--verbose", action="store_true", help="Print detailed logs.")
+    parser.add_argument("--audit", action="store_true", help="Enable audit logging (JSONL).")
+    parser.add_argument("--audit-log", type=str, help="Path for audit log output (defaults to .duplifinder_audit.jsonl).")
+    return parser
+
+
+def build_merge_config(args: argparse.Namespace, scan: Dict[str, Any]) -> Config:
+    """Config for rendering merged partials: roots and types come from the scan, output settings from args/config file."""
+    config_dict = {}
+    if args.config:
+        config_dict = load_config_file(args.config)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+
+    roots = scan["roots"]
+    merged = {
+        "root": roots[0],
+        "roots": roots if len(roots) > 1 else [],
+        "types_to_search": set(scan["types"]),
+        "dup_threshold": args.dup_threshold or config_dict.get("dup_threshold", 0.1),
+        "json_output": args.json or config_dict.get("json", False),
+        "fail_on_duplicates": args.fail or config_dict.get("fail", False),
+        "min_occurrences": args.min or config_dict.get("min", 2),
+        "verbose": args.verbose or config_dict.get("verbose", False),
+        "preview": args.preview or config_dict.get("preview", False),
+        "html_report": args.html_report or config_dict.get("html_report", None),
+        "audit_enabled": args.audit or config_dict.get("audit", False),
+        "audit_log_path": args.audit_log or config_dict.get("audit_log", ".duplifinder_audit.jsonl"),
+    }
+    try:
+        return Config(**merged)
+    except (ValueError, ConfigError) as e:
+        logging.error(f"Config validation failed: {e}")
+        raise SystemExit(2)
+
+
+def _size_or_none(value):
+    """Config-file size (e.g. "8G" or a byte count); invalid values are left for Pydantic to reject."""
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except argparse.ArgumentTypeError:
+        return value
+
+
+def _limit(cli_value, file_value):
+    """CLI value if given, else the config file's; 0 (or null in YAML) means no limit."""
+    value = cli_value if cli_value is not None else file_value
+    return value or None
+
+
 def build_config(args: argparse.Namespace) -> Config:
     """Merge CLI args with config file (if provided); validate via Pydantic."""
     # Load config file if specified
@@ -74,8 +222,12 @@ def build_config(args: argparse.Namespace) -> Config:
         config_dict = load_config_file(args.config)
 
     root_candidates = args.root or config_dict.get("root", ["."])
-    root_str = root_candidates[0] if len(root_candidates) > 0 and pathlib.Path(root_candidates[0]).exists() and pathlib.Path(root_candidates[0]).is_dir() else "."
-    extra = root_candidates[1:] if len(root_candidates) > 1 else []
+    if isinstance(root_candidates, str):
+        root_candidates = [root_candidates]
+    # Every existing directory is a scan root; anything else is a find argument
+    roots = [r for r in root_candidates if pathlib.Path(r).is_dir()]
+    extra = [r for r in root_candidates if not pathlib.Path(r).is_dir()]
+    root_str = roots[0] if roots else "."
 
     # Setup logging early
     logging.basicConfig(
@@ -86,6 +238,7 @@ def build_config(args: argparse.Namespace) -> Config:
     # Merge into dict for Pydantic
     merged = {
         "root": root_str,
+        "roots": roots if len(roots) > 1 else [],
         "ignore_dirs": {x.strip() for x in (args.ignore or config_dict.get("ignore", "")).split(",") if x.strip()},
         "exclude_patterns": {x.strip() for x in (args.exclude_patterns or config_dict.get("exclude_patterns", "")).split(",") if x.strip()},
         "exclude_names": {x.strip() for x in (args.exclude_names or config_dict.get("exclude_names", "")).split(",") if x.strip()},
@@ -102,12 +255,35 @@ def build_config(args: argparse.Namespace) -> Config:
         "verbose": args.verbose or config_dict.get("verbose", False),
         "parallel": args.parallel or config_dict.get("parallel", False),
         "use_multiprocessing": args.use_multiprocessing or config_dict.get("use_multiprocessing", False),
+        "executor": getattr(args, "executor", None) or config_dict.get("executor", None),
         "max_workers": args.max_workers or config_dict.get("max_workers", None),
+        "max_memory": getattr(args, "max_memory", None) or _size_or_none(config_dict.get("max_memory", None)),
+        "background": getattr(args, "background", False) or config_dict.get("background", False),
+        "io_rate": getattr(args, "io_rate", None) or _size_or_none(config_dict.get("io_rate", None)),
+        "max_in_flight": getattr(args, "max_in_flight", None) or config_dict.get("max_in_flight", None),
+        "chunk_size": getattr(args, "chunk_size", None) or config_dict.get("chunk_size", None),
+        "pipeline": getattr(args, "pipeline", False) or config_dict.get("pipeline", False),
+        "task_timeout": getattr(args, "task_timeout", None) or config_dict.get("task_timeout", None),
+        "discovery_workers": getattr(args, "discovery_workers", None) or config_dict.get("discovery_workers", 1),
         "preview": args.preview or config_dict.get("preview", False),
         "audit_enabled": args.audit or config_dict.get("audit", False),
         "audit_log_path": args.audit_log or config_dict.get("audit_log", ".duplifinder_audit.jsonl"),
+        "audit_flush_interval": getattr(args, "audit_flush_interval", None) or config_dict.get("audit_flush_interval", 1.0),
         "respect_gitignore": not getattr(args, 'no_gitignore', False) and config_dict.get("respect_gitignore", True),
+        "use_git_index": not getattr(args, 'no_git_index', False) and config_dict.get("use_git_index", True),
         "watch_mode": args.watch or config_dict.get("watch", False),
+        "enable_cache": getattr(args, "cache", False) or config_dict.get("cache", False),
+        "since_ref": getattr(args, "since", None) or config_dict.get("since", None),
+        "shard": getattr(args, "shard", None),
+        "shard_output": getattr(args, "shard_output", None),
+        "coordinator_address": getattr(args, "listen", None),
+        "coordinator_authkey": getattr(args, "authkey", None),
+        "coordinator_batch_files": getattr(args, "batch_files", None) or config_dict.get("coordinator_batch_files", 64),
+        "max_file_bytes": _limit(getattr(args, "max_file_bytes", None), config_dict.get("max_file_bytes", 10 * 1024 * 1024)),
+        "max_file_lines": _limit(getattr(args, "max_file_lines", None), config_dict.get("max_file_lines", 100_000)),
+        "large_file_mode": getattr(args, "large_file_mode", None) or config_dict.get("large_file_mode", "skip"),
+        "skip_generated": not getattr(args, "include_generated", False) and config_dict.get("skip_generated", True),
+        "dedupe_files": not getattr(args, "no_dedupe_files", False) and config_dict.get("dedupe_files", True),
     }
 
     # Process find arguments
@@ -4,7 +4,7 @@
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List, Set, Optional
+from typing import Dict, List, Literal, Set, Optional, Tuple
 
 # MODIFIED: Import field_validator and ValidationInfo, remove validator
 from pydantic import BaseModel, Field, field_validator, ValidationInfo
@@ -19,6 +19,7 @@ class Config(BaseModel):
     """Validated configuration model."""
 
     root: Path = Field(default_factory=lambda: Path("."), description="Scan root directory")
+    roots: List[Path] = Field(default_factory=list, description="All scan roots for a multi-root run (root is the first); empty means just root")
     ignore_dirs: Set[str] = Field(default_factory=lambda: DEFAULT_IGNORES.copy())
     exclude_patterns: Set[str] = Field(default_factory=set)
     exclude_names: Set[str] = Field(default_factory=set)  # Raw patterns; compiled in processors
@@ -37,14 +38,27 @@ class Config(BaseModel):
     verbose: bool = False
     parallel: bool = False
     use_multiprocessing: bool = False
+    executor: Optional[Literal["auto", "sequential", "threads", "processes"]] = Field(
+        None, description="Execution strategy; auto picks one per scan; None follows parallel/use_multiprocessing"
+    )
     max_workers: int | None = Field(None, ge=1)
+    max_memory: Optional[int] = Field(None, ge=1, description="Memory budget in bytes for the scan; caps and throttles process workers by their measured RSS")
+    background: bool = Field(False, description="Run beside other work: lower priority, a quarter of the cores, one pipeline reader and a read rate cap")
+    io_rate: Optional[int] = Field(None, ge=1, description="Read bandwidth cap in bytes per second (approximate); defaults to 32 MiB/s with background")
+    max_in_flight: Optional[int] = Field(None, ge=1, description="Max tasks pending in the pool at once; None means two per worker")
+    chunk_size: Optional[int] = Field(None, ge=1, description="Files per process-pool task; None sizes chunks adaptively by file count and bytes")
+    pipeline: bool = Field(False, description="Overlap discovery, reading and parsing in stages joined by bounded queues (definition mode)")
+    task_timeout: Optional[float] = Field(None, gt=0, description="Seconds a file may take in a worker pool before it is abandoned and reported as skipped")
+    discovery_workers: int = Field(1, ge=1, description="Concurrent directory listings/stats during discovery (raise for network filesystems)")
     preview: bool = False
     audit_enabled: bool = Field(False, description="Enable audit logging for file access trails")
     audit_log_path: Path = Field(
         default_factory=lambda: Path(".duplifinder_audit.jsonl"),
         description="Path for audit log output (JSONL format)"
     )
+    audit_flush_interval: float = Field(1.0, gt=0, description="Seconds between flushes of the buffered audit log; it is also flushed at exit")
     respect_gitignore: bool = Field(True, description="Auto-respect .gitignore patterns for exclusions")
+    use_git_index: bool = Field(True, description="List files from the git index when the root is a git work tree")
     watch_mode: bool = Field(False, description="Enable watch mode for live scanning")
 
     # Language Support
@@ -56,10 +70,44 @@ class Config(BaseModel):
         default_factory=lambda: Path(".duplifinder_cache.json"),
         description="Path to the cache file"
     )
+    cost_history_path: Path = Field(
+        default_factory=lambda: Path(".duplifinder_costs.json"),
+        description="Per-file processing times used to schedule the most expensive files first (used when caching is enabled)"
+    )
+    discovery_cache_path: Path = Field(
+        default_factory=lambda: Path(".duplifinder_discovery_cache.json"),
+        description="Path to the directory-listing cache (used when caching is enabled)"
+    )
+
+    # Large and generated files
+    max_file_bytes: Optional[int] = Field(10 * 1024 * 1024, ge=1, description="Files larger than this are skipped or streamed (see large_file_mode); None for no limit")
+    max_file_lines: Optional[int] = Field(100_000, ge=1, description="Files with more lines than this are skipped or streamed; None for no limit")
+    large_file_mode: Literal["skip", "stream"] = Field("skip", description="Skip files over the limits, or scan them line by line in bounded memory")
+    skip_generated: bool = Field(True, description="Skip files detected as generated (banner) or minified (very long lines)")
+
+    # Identical files (hardlinks, symlinks, vendored copies) are parsed once and reported as one clone group
+    dedupe_files: bool = Field(True, description="Parse identical files once and report them as a file-level clone group")
+
+    # Incremental scans
+    since_ref: Optional[str] = Field(None, description="Only re-process files changed since this git ref; reuse the stored index for the rest")
+
+    # Static sharding (definition mode): this run scans shard K of N and writes a partial index
+    shard: Optional[Tuple[int, int]] = Field(None, description="(K, N): scan only the files hashed to shard K (1-based) of N")
+    shard_output: Optional[Path] = Field(None, description="Partial index file for a sharded run; None means .duplifinder_shard_K_of_N.json")
+
+    # Dynamic work queue: this run discovers files and serves them in batches to `duplifinder work` processes
+    coordinator_address: Optional[str] = Field(None, description="host:port or Unix socket path to serve batches on; None scans locally")
+    coordinator_authkey: Optional[str] = Field(None, repr=False, description="Shared secret for workers; None means DUPLIFINDER_AUTHKEY or a generated key")
+    coordinator_batch_files: int = Field(64, ge=1, description="Files per batch handed to a worker")
 
     # HTML Report
     html_report: Optional[Path] = Field(None, description="Path to generate HTML report")
 
+    @property
+    def scan_roots(self) -> List[Path]:
+        """Roots to discover, in order."""
+        return list(self.roots) if self.roots else [self.root]
+
     # MODIFIED: Use @field_validator
     @field_validator("types_to_search")
     def validate_types(cls, v: Set[str]) -> Set[str]:
@@ -99,6 +147,17 @@ class Config(BaseModel):
                 raise ConfigError(f"Empty name in '{spec}'.")
         return v
 
+    @field_validator("shard")
+    def validate_shard(cls, v: Optional[Tuple[int, int]], info: ValidationInfo) -> Optional[Tuple[int, int]]:
+        if v is None:
+            return v
+        index, count = v
+        if not 1 <= index <= count:
+            raise ConfigError(f"Invalid shard {index}/{count}: need 1 <= K <= N")
+        if info.data.get("search_mode") or info.data.get("token_mode") or info.data.get("pattern_regexes"):
+            raise ConfigError("Sharding is only supported in definition mode")
+        return v
+
     # MODIFIED: Use @field_validator and ValidationInfo to access other field data
     @field_validator("audit_log_path")
     def validate_audit_path(cls, v: Path, info: ValidationInfo) -> Path:
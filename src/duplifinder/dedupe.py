@@ -0,0 +1,58 @@
+# src/duplifinder/dedupe.py
+
+"""Whole-file deduplication: hardlinks/symlinks by inode, identical copies by content hash."""
+
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .cache import CacheManager
+
+
+def group_identical_files(py_files: List[Path]) -> Tuple[List[Path], Dict[Path, List[Path]]]:
+    """Split files into (unique files to parse, {representative: identical other paths}).
+
+    Paths sharing a (device, inode) are aliases of one file. Remaining files are only
+    hashed when their size collides with another file's, so most files are never read
+    here. The first path in discovery order represents its group; empty files are left alone.
+    """
+    by_inode: Dict[Tuple[int, int], Path] = {}
+    aliases: Dict[Path, List[Path]] = defaultdict(list)
+    by_size: Dict[int, List[Path]] = defaultdict(list)
+    order: List[Path] = []
+    for p in py_files:
+        try:
+            st = os.stat(p)
+        except OSError:
+            order.append(p)  # Let the worker report it
+            continue
+        key = (st.st_dev, st.st_ino)
+        rep = by_inode.get(key)
+        if rep is not None:
+            aliases[rep].append(p)
+            continue
+        by_inode[key] = p
+        order.append(p)
+        if st.st_size:
+            by_size[st.st_size].append(p)
+
+    clones: Dict[Path, List[Path]] = {rep: list(paths) for rep, paths in aliases.items()}
+    for candidates in by_size.values():
+        if len(candidates) < 2:
+            continue
+        by_digest: Dict[str, Path] = {}
+        for p in candidates:
+            digest = CacheManager.compute_hash(p)
+            if digest is None:
+                continue
+            rep = by_digest.setdefault(digest, p)
+            if rep is not p:
+                clones.setdefault(rep, []).extend([p, *clones.pop(p, [])])
+
+    duplicates = {p for paths in clones.values() for p in paths}
+    unique = [p for p in order if p not in duplicates]
+    if clones:
+        logging.info(f"Deduplicated {len(duplicates)} identical files into {len(clones)} clone groups")
+    return unique, clones
@@ -2,53 +2,189 @@
 
 """AST-based definition finder for classes, functions, and async functions."""
 
+import functools
 import logging
-from collections import defaultdict
-from typing import Dict, List, Tuple
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
+from .background import apply_limits
 from .config import Config
-from .processors import process_file_ast, estimate_dup_lines
-from .utils import discover_py_files, run_parallel, log_file_count
+from .executor import prestart_pool
+from .index import DefinitionIndex, combine_definitions
+from .pipeline import ScanPipeline
+from .processors import process_file_ast
+from .utils import PerformanceTracker, audit_log_event, discover_py_files, run_parallel, log_file_count
 from .cache import CacheManager
+from .dedupe import group_identical_files
+from .exceptions import ScanCancelled
+from .distributed import Coordinator
+from .vcs import git_changed_files, git_rev_parse
 
 
-def find_definitions(config: Config) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
+def _changed_since(config: Config, cache_manager: CacheManager) -> Optional[Set[str]]:
+    """Discovery-style path strings changed since config.since_ref (and since the index was saved), over all roots."""
+    changed_paths: Set[str] = set()
+    for scan_root in config.scan_roots:
+        changed = git_changed_files(scan_root, config.since_ref)
+        if changed is None:
+            logging.warning(f"Cannot diff '{scan_root}' against '{config.since_ref}'; scanning all files.")
+            return None
+        # If the stored index was saved at another commit, files changed since then are stale too
+        index_head = cache_manager.get_git_head(scan_root)
+        if index_head and index_head != git_rev_parse(scan_root, config.since_ref):
+            since_index = git_changed_files(scan_root, index_head)
+            if since_index is None:
+                logging.warning(f"Stored index commit {index_head[:12]} is unknown in '{scan_root}'; scanning all files.")
+                return None
+            changed.extend(since_index)
+        root = str(scan_root)
+        changed_paths.update(str(Path(os.path.join(root, rel))) for rel in changed)
+    return changed_paths
+
+
+def _reuse_unchanged(py_files: List[Path], config: Config, cache_manager: CacheManager) -> Tuple[List[Path], List[Tuple[Path, Tuple]]]:
+    """Split files into (to_process, (path, stored result) pairs) for --since scans."""
+    changed = _changed_since(config, cache_manager)
+    if changed is None:
+        return py_files, []
+    to_process: List[Path] = []
+    stored_results: List[Tuple[Path, Tuple]] = []
+    for p in py_files:
+        stored = None
+        if str(p) not in changed:
+            try:
+                # Catches edits git cannot see, e.g. a file dirty when the index was saved and reverted since
+                stored = cache_manager.get_stored(str(p), mtime=p.stat().st_mtime)
+            except OSError:
+                pass
+        if stored is None:
+            to_process.append(p)
+        else:
+            stored_results.append((p, (stored["definitions"], None, stored["total_lines"])))
+    if config.verbose:
+        logging.info(f"--since {config.since_ref}: re-processing {len(to_process)} files, {len(stored_results)} reused from the stored index")
+    audit_log_event(config, "since_scan", ref=config.since_ref, processed=len(to_process), reused=len(stored_results))
+    return to_process, stored_results
+
+
+def _cancelled(index: DefinitionIndex, expected: Optional[int]) -> ScanCancelled:
+    """ScanCancelled carrying what index holds so far; expected is the number of files discovered (None if unknown)."""
+    not_processed = None if expected is None else max(expected - index.files, 0)
+    logging.warning(f"Scan cancelled after {index.files} files" + ("" if not_processed is None else f"; {not_processed} not processed"))
+    return ScanCancelled((index.definitions, index.skipped, index.scanned, index.total_lines, index.dup_lines), not_processed)
+
+
+def _find_definitions_pipelined(config: Config, index: DefinitionIndex, tracker: Optional[PerformanceTracker]) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
+    """find_definitions over a ScanPipeline: parsing starts while discovery is still walking the tree."""
+    cache_manager = CacheManager(config.cache_path, config=config) if config.enable_cache else None
+    pipeline = ScanPipeline(
+        config, process_file_ast, functools.partial(combine_definitions, clones=None),
+        accept=lambda p: p.suffix == ".py", tracker=tracker, cache=cache_manager,
+    )
+    results = pipeline.run()
+    cancelled = False
+    try:
+        for partial in results:
+            index.merge(partial)
+    except KeyboardInterrupt:
+        results.close()
+        cancelled = True
+    index.relocate(pipeline.renamed)  # Results of a copy read ahead of its group's first file
+    for path, copies in pipeline.clones.items():
+        if path in pipeline.file_results:
+            index.add_copies(path, pipeline.file_results[path], copies)
+    if cache_manager:
+        cache_manager.save()
+    if cancelled:
+        raise _cancelled(index, pipeline.discovered)
+    if config.verbose:
+        logging.info(f"Scanned {index.scanned} files, skipped {len(index.skipped)}, total lines: {index.total_lines}, estimated dup lines: {index.dup_lines}")
+    return index.definitions, index.skipped, index.scanned, index.total_lines, index.dup_lines
+
+
+def _find_definitions_coordinated(config: Config, index: DefinitionIndex, tracker: Optional[PerformanceTracker]) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
+    """find_definitions with the parsing done by `duplifinder work` processes (see distributed.Coordinator)."""
+    coordinator = Coordinator(config, "definitions", tracker=tracker)  # Listening before discovery, so workers can connect early
+    try:
+        py_files = [p for p in discover_py_files(config) if p.suffix == ".py"]
+        log_file_count(py_files, config)
+        clones: Dict[Path, List[Path]] = {}
+        expected = len(py_files)
+        if config.dedupe_files:
+            py_files, clones = group_identical_files(py_files)
+        results = coordinator.run(py_files, clones)
+        try:
+            for partial in results:
+                index.merge(partial)
+        except KeyboardInterrupt:
+            results.close()
+            raise _cancelled(index, expected) from None
+    finally:
+        coordinator.close()
+    if config.verbose:
+        logging.info(f"Scanned {index.scanned} files, skipped {len(index.skipped)}, total lines: {index.total_lines}, estimated dup lines: {index.dup_lines}")
+    return index.definitions, index.skipped, index.scanned, index.total_lines, index.dup_lines
+
+
+def find_definitions(config: Config, tracker: Optional[PerformanceTracker] = None) -> Tuple[Dict[str, Dict[str, List[Tuple[str, str]]]], List[str], int, int, int]:
     """Find definitions across the project using AST, optionally in parallel; return total_lines, dup_lines."""
-    all_definitions: Dict[str, Dict[str, List[Tuple[str, str]]]] = {t: defaultdict(list) for t in config.types_to_search}
-    skipped: List[str] = []
-    scanned = 0
-    total_lines = 0
-    dup_lines = 0
+    apply_limits(config)
+    if config.shard is not None and config.dedupe_files:
+        # Copies hashed into different shards could never be grouped, so shards parse every file
+        logging.info("--shard parses identical files separately (dedupe_files is off for sharded runs)")
+        config = config.model_copy(update={"dedupe_files": False})
+    index = DefinitionIndex(config.types_to_search)
+    if config.coordinator_address:
+        return _find_definitions_coordinated(config, index, tracker)
 
+    prestart_pool(config)  # Workers spawn while discovery runs
+    if config.pipeline:
+        if not config.since_ref:
+            return _find_definitions_pipelined(config, index, tracker)
+        logging.info("--pipeline does not apply to --since scans; using the batch scan")
     py_files = discover_py_files(config)
     # Filter for AST: Only .py files supported for now
     py_files = [p for p in py_files if p.suffix == '.py']
 
     log_file_count(py_files, config)
+    expected = len(py_files)
+
+    # Parse each distinct file once; identical copies share its result and form a file-level clone group
+    clones: Dict[Path, List[Path]] = {}
+    if config.dedupe_files:
+        py_files, clones = group_identical_files(py_files)
 
-    # Load cache if enabled
+    # Load cache if enabled (--since always needs the stored index)
     cache_manager = None
-    if config.enable_cache:
+    if config.enable_cache or config.since_ref:
         cache_manager = CacheManager(config.cache_path, config=config)
 
-    for result in run_parallel(py_files, process_file_ast, config=config, cache_manager=cache_manager):
-        defs, skipped_file, file_lines = result
-        if isinstance(skipped_file, str):
-            skipped.append(skipped_file)
-            logging.debug(f"Skipped file: {skipped_file}")
-        else:
-            scanned += 1
-            total_lines += file_lines
-            for t, name_locs in defs.items():
-                for name, items in name_locs.items():
-                    all_definitions[t][name].extend(items)
-                    dup_lines += estimate_dup_lines(items, False, config)
+    stored_results: List[Tuple[Path, Tuple]] = []
+    if config.since_ref and cache_manager:
+        py_files, stored_results = _reuse_unchanged(py_files, config, cache_manager)
+
+    # Workers fold each chunk into a partial index; identical copies are expanded there too
+    for path, result in stored_results:
+        index.add(path, result, config, clones.get(path, []))
+    combine = functools.partial(combine_definitions, clones=clones)
+    results = run_parallel(py_files, process_file_ast, config=config, tracker=tracker, combine=combine, cache=cache_manager)
+    try:
+        for partial in results:
+            index.merge(partial)
+    except KeyboardInterrupt:
+        results.close()  # Interrupted between results: cancel the queued work too
+        if cache_manager:
+            cache_manager.save()  # Keep what was parsed for the next run
+        raise _cancelled(index, expected) from None
 
     # Save cache if enabled
     if cache_manager:
+        for scan_root in config.scan_roots:
+            cache_manager.set_git_head(scan_root, git_rev_parse(scan_root, "HEAD"))
         cache_manager.save()
 
     if config.verbose:
-        logging.info(f"Scanned {scanned} files, skipped {len(skipped)}, total lines: {total_lines}, estimated dup lines: {dup_lines}")
+        logging.info(f"Scanned {index.scanned} files, skipped {len(index.skipped)}, total lines: {index.total_lines}, estimated dup lines: {index.dup_lines}")
 
-    return all_definitions, skipped, scanned, total_lines, dup_lines
\ No newline at end of file
+    return index.definitions, index.skipped, index.scanned, index.total_lines, index.dup_lines
\ No newline at end of file
@@ -0,0 +1,277 @@
+# src/duplifinder/distributed.py
+
+"""Multi-machine scans: a coordinator hands out batches of files, workers pull them and send back partial results."""
+
+import functools
+import logging
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .background import apply_limits
+from .config import Config
+from .exceptions import DuplifinderError
+from .index import DefinitionIndex, combine_definitions
+from .processors import process_file_ast, process_file_tokens
+from .utils import PerformanceTracker, run_parallel
+
+AUTHKEY_ENV = "DUPLIFINDER_AUTHKEY"
+DEFAULT_BATCH_FILES = 64
+# A batch whose worker disconnected this many times is reported as skipped instead of retried
+MAX_BATCH_ATTEMPTS = 3
+# How long `work` keeps retrying while the coordinator is not up yet
+CONNECT_TIMEOUT = 30.0
+# How long close() waits for connected workers to be told the scan is done
+CLOSE_TIMEOUT = 5.0
+_POLL_SECONDS = 0.1
+
+Address = Union[Tuple[str, int], str]
+
+
+def parse_address(value: str) -> Address:
+    """'host:port' for TCP; anything without a numeric port is a Unix socket path."""
+    host, sep, port = value.rpartition(":")
+    if sep and host and port.isdigit():
+        return host, int(port)
+    return value
+
+
+def format_address(address: Address) -> str:
+    return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+
+def resolve_authkey(authkey: Optional[str]) -> Optional[bytes]:
+    """Shared secret from the argument or DUPLIFINDER_AUTHKEY; None if neither is set."""
+    authkey = authkey or os.environ.get(AUTHKEY_ENV)
+    return authkey.encode("utf-8") if authkey else None
+
+
+def _lost_batch(mode: str, paths: List[str], config: Config) -> Any:
+    """Payload reporting every file of a batch as skipped, in the shape its mode's workers send."""
+    results = [(None, f"{p} (worker lost)", 0) for p in paths]
+    if mode == "definitions":
+        return combine_definitions([Path(p) for p in paths], results, config)
+    return results
+
+
+class Coordinator:
+    """Owns the file list of a scan and serves it in batches to `duplifinder work` processes.
+
+    The listener starts with the coordinator, so workers may connect while discovery is
+    still running. Each connection gets the scan config, then one batch at a time: a
+    worker receives its next batch after returning the previous one's partial result,
+    so fast machines simply take more batches. Batches held by a worker that disconnects
+    go back on the queue, whatever ended the connection.
+    """
+
+    def __init__(self, config: Config, mode: str, tracker: Optional[PerformanceTracker] = None):
+        self.config = config
+        self.mode = mode
+        self.tracker = tracker
+        authkey = resolve_authkey(config.coordinator_authkey)
+        if authkey is None:
+            authkey = secrets.token_hex(16).encode("ascii")
+            print(f"Worker auth key (set {AUTHKEY_ENV} or pass --authkey): {authkey.decode('ascii')}", file=sys.stderr)
+        self._authkey = authkey
+        self._listener = Listener(parse_address(config.coordinator_address), authkey=authkey)
+        self.address = self._listener.address
+        # Workers get the scan settings, not the coordinator's own
+        self._worker_config = config.model_copy(update={"coordinator_address": None, "coordinator_authkey": None})
+        self._pending: "queue.Queue[Tuple[int, List[str], Dict[str, List[str]]]]" = queue.Queue()
+        self._results: "queue.Queue[Tuple[int, Any]]" = queue.Queue()
+        self._attempts: Dict[int, int] = {}
+        self._held: set = set()  # Ids of batches sent to a worker and not yet answered or requeued
+        self._servers: List[threading.Thread] = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self.workers = 0
+        self.requeued = 0
+        print(f"Coordinator listening on {format_address(self.address)}; start workers with: duplifinder work --connect {format_address(self.address)}", file=sys.stderr)
+        self._acceptor = threading.Thread(target=self._accept, name="coordinator-accept", daemon=True)
+        self._acceptor.start()
+
+    def _accept(self) -> None:
+        while not self._done.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._done.is_set():
+                    return  # Listener closed
+                logging.warning("Rejected a worker connection (bad auth key or handshake)")
+                continue
+            if self._done.is_set():
+                conn.close()  # close() waking us up
+                return
+            server = threading.Thread(target=self._serve, args=(conn,), name="coordinator-serve", daemon=True)
+            with self._lock:
+                self._servers.append(server)
+            server.start()
+
+    def _next_batch(self) -> Optional[Tuple[int, List[str], Dict[str, List[str]]]]:
+        while not self._done.is_set():
+            with self._lock:  # Taking a batch and marking it held is atomic for run()'s lost-batch check
+                try:
+                    batch = self._pending.get_nowait()
+                except queue.Empty:
+                    batch = None
+                else:
+                    self._held.add(batch[0])
+                    return batch
+            time.sleep(_POLL_SECONDS)
+        return None
+
+    def _serve(self, conn: Connection) -> None:
+        batch = None
+        try:
+            with conn:
+                hello = conn.recv()
+                if self._done.is_set():
+                    conn.send(("done",))
+                    return
+                with self._lock:
+                    self.workers += 1
+                logging.info(f"Worker connected: {hello[1]} (pid {hello[2]})")
+                conn.send(("config", self.mode, self._worker_config))
+                while True:
+                    batch = self._next_batch()
+                    if batch is None:
+                        conn.send(("done",))
+                        return
+                    conn.send(("batch", *batch))
+                    kind, batch_id, payload = conn.recv()
+                    self._results.put((batch[0], payload))
+                    with self._lock:
+                        self._held.discard(batch[0])
+                    batch = None
+        except (EOFError, OSError) as e:
+            if batch is not None:
+                logging.warning(f"Worker lost with batch {batch[0]} ({e.__class__.__name__}); requeueing it")
+        except Exception:
+            # An unreadable result or a broken handshake must not take the batch down with it
+            logging.exception("Worker connection failed" + (f" with batch {batch[0]}; requeueing it" if batch is not None else ""))
+        finally:
+            if batch is not None:
+                self._requeue(batch)
+
+    def _requeue(self, batch: Tuple[int, List[str], Dict[str, List[str]]]) -> None:
+        with self._lock:
+            self.requeued += 1
+            attempts = self._attempts[batch[0]] = self._attempts.get(batch[0], 1) + 1
+            if attempts > MAX_BATCH_ATTEMPTS:
+                logging.warning(f"Batch {batch[0]} lost {MAX_BATCH_ATTEMPTS} workers; reporting its {len(batch[1])} files as skipped")
+                self._results.put((batch[0], _lost_batch(self.mode, batch[1], self.config)))
+            else:
+                self._pending.put(batch)
+            self._held.discard(batch[0])
+
+    def _check_outstanding(self, missing: int) -> None:
+        """Fail instead of waiting forever when unanswered batches are neither queued nor held by a worker."""
+        with self._lock:
+            lost = self._pending.empty() and not self._held and self._results.empty()
+        if lost:
+            raise DuplifinderError(f"Coordinator lost track of {missing} batches: none are queued or held by a worker")
+
+    def run(self, py_files: List[Path], clones: Optional[Dict[Path, List[Path]]] = None) -> Iterator[Any]:
+        """Queue py_files in batches and yield each batch's partial result as workers return it."""
+        size = self.config.coordinator_batch_files
+        total = 0
+        for start in range(0, len(py_files), size):
+            paths = py_files[start : start + size]
+            batch_clones = {str(p): [str(c) for c in clones[p]] for p in paths if clones and p in clones}
+            self._pending.put((total, [str(p) for p in paths], batch_clones))
+            total += 1
+        received = set()
+        try:
+            while len(received) < total:
+                try:
+                    batch_id, payload = self._results.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    self._check_outstanding(total - len(received))
+                    continue
+                if batch_id not in received:  # A presumed-lost worker may still have answered
+                    received.add(batch_id)
+                    yield payload
+        finally:
+            self.close()
+            if self.tracker is not None:
+                self.tracker.record("Workers", self.workers)
+                self.tracker.record("Batches", f"{total} of up to {size} files, {self.requeued} requeued")
+
+    def close(self) -> None:
+        """Stop serving: connected workers are told the scan is done and the listener shuts down.
+
+        Waits up to CLOSE_TIMEOUT for the serving threads to send their worker ("done",): they
+        are daemons, so returning earlier lets the process exit under them and the workers
+        see a dropped connection instead.
+        """
+        if self._done.is_set():
+            return
+        self._done.set()
+        try:
+            Client(self.address, authkey=self._authkey).close()  # Wake the acceptor
+        except OSError:
+            pass
+        self._acceptor.join(timeout=1.0)
+        self._listener.close()
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        with self._lock:
+            servers = list(self._servers)
+        for server in servers:
+            server.join(timeout=max(0.0, deadline - time.monotonic()))
+
+
+def _process_batch(mode: str, paths: List[str], clones: Dict[str, List[str]], config: Config) -> Any:
+    """Run one batch through the local executor and fold it into a single payload."""
+    py_files = [Path(p) for p in paths]
+    if mode == "definitions":
+        combine = functools.partial(combine_definitions, clones={Path(p): [Path(c) for c in copies] for p, copies in clones.items()})
+        index = DefinitionIndex()
+        for partial in run_parallel(py_files, process_file_ast, config=config, combine=combine):
+            index.merge(partial)
+        return index
+    return list(run_parallel(py_files, process_file_tokens, config=config))
+
+
+def run_worker(
+    address: Address, authkey: bytes, executor: Optional[str] = "auto", max_workers: Optional[int] = None, connect_timeout: float = CONNECT_TIMEOUT
+) -> int:
+    """Serve a coordinator until it reports the scan done; return the number of batches processed.
+
+    File paths arrive as the coordinator discovered them, so run workers from the same
+    directory (e.g. the checkout root) the coordinator was started in.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)  # Coordinator not up yet
+    batches = 0
+    with conn:
+        conn.send(("hello", socket.gethostname(), os.getpid()))
+        message = conn.recv()
+        if message[0] == "done":
+            return batches
+        _, mode, config = message
+        config = config.model_copy(update={"executor": executor, "max_workers": max_workers})
+        apply_limits(config)  # The coordinator's --background/--io-rate hold on every worker machine
+        while True:
+            message = conn.recv()
+            if message[0] == "done":
+                break
+            _, batch_id, paths, clones = message
+            conn.send(("result", batch_id, _process_batch(mode, paths, clones, config)))
+            batches += 1
+    logging.info(f"Worker finished after {batches} batches")
+    return batches
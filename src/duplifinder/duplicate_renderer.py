@@ -5,7 +5,7 @@
 import json
 import logging
 import time
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 
 from rich.console import Console
 from rich.table import Table
@@ -13,7 +13,9 @@ from rich.panel import Panel
 from rich.syntax import Syntax
 
 from .config import Config
+from .exceptions import ScanCancelled
 from .html_renderer import render_html_report
+from .processor_utils import is_policy_skip
 from .refactoring import get_refactoring_suggestion
 
 
@@ -49,9 +51,13 @@ def render_duplicates(
     dup_lines: int,
     scanned_files: int,
     skipped_files: List[str],
-    is_token: bool = False
+    is_token: bool = False,
+    cancelled: Optional[ScanCancelled] = None,
 ) -> None:
-    """Render duplicates to console or JSON; handles token normalization."""
+    """Render duplicates to console or JSON; handles token normalization.
+
+    With cancelled, the report covers only the files scanned before the scan stopped and says so.
+    """
     console = Console()
     normalized = _normalize_for_render(all_results, is_token)
     duplicates = {k: v for k, v in normalized.items() if len(v) >= config.min_occurrences}
@@ -66,9 +72,12 @@ def render_duplicates(
         out = {
             "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
             "root": str(config.root),
+            "roots": [str(r) for r in config.scan_roots],
             "scanned_files": scanned_files,
             "skipped_files": skipped_files,
             "duplicate_count": len(duplicates),
+            "incomplete": cancelled is not None,
+            "files_not_processed": cancelled.not_processed if cancelled is not None else 0,
             "duplicates": duplicates  # Already normalized with suggestions
         }
         print(json.dumps(out, indent=2))
@@ -122,6 +131,15 @@ def render_duplicates(
     if not duplicates:
         console.print("[green]No duplicates found.[/green]")
 
+    # Large and generated files are left out by default; say so instead of dropping them silently
+    policy_skips = sum(1 for entry in skipped_files if is_policy_skip(entry))
+    if policy_skips:
+        console.print(f"[yellow]Skipped {policy_skips} large or generated file(s) by policy (see --max-file-bytes, --max-file-lines, --include-generated).[/yellow]")
+
+    if cancelled is not None:
+        left = "an unknown number of" if cancelled.not_processed is None else str(cancelled.not_processed)
+        console.print(f"[bold red]INCOMPLETE: scan cancelled after {scanned_files} files; {left} files not processed.[/bold red]")
+
     if dup_rate > threshold:
         console.print(f"[red]ALERT: Duplication rate {dup_rate:.1%} exceeds threshold {threshold:.1%} (est. {dup_lines}/{total_lines} lines duplicated).[/red]")
 
@@ -147,7 +165,7 @@ def render_duplicates(
                 html_items.append((item["loc"], item["snippet"]))
             html_duplicates[key] = html_items
 
-        render_html_report(html_duplicates, config, scanned_files, total_lines, dup_lines, dup_rate)
+        render_html_report(html_duplicates, config, scanned_files, total_lines, dup_lines, dup_rate, cancelled)
         console.print(f"[green]HTML report generated at {config.html_report}[/green]")
 
     if config.fail_on_duplicates and duplicates:
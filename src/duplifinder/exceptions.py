@@ -2,6 +2,9 @@
 
 """Custom exceptions for Duplifinder."""
 
+from typing import Optional
+
+
 class DuplifinderError(Exception):
     """Base class for all Duplifinder exceptions."""
     pass
@@ -16,3 +19,15 @@ class FileProcessingError(DuplifinderError):
         super().__init__(message)
         self.filepath = filepath
         self.reason = reason
+
+class ScanCancelled(DuplifinderError):
+    """Raised when a scan is interrupted (Ctrl+C, SIGTERM); carries what was scanned before it stopped.
+
+    results has the shape of the finder's normal return value; not_processed is None when
+    discovery had not finished, so the number of files left is unknown.
+    """
+    def __init__(self, results: tuple, not_processed: Optional[int] = None):
+        left = "an unknown number of" if not_processed is None else str(not_processed)
+        super().__init__(f"Scan cancelled; {left} files not processed")
+        self.results = results
+        self.not_processed = not_processed
@@ -0,0 +1,325 @@
+# src/duplifinder/executor.py
+
+"""Long-lived worker pools shared by repeated scans (watch mode, programmatic calls) in one process."""
+
+import atexit
+import concurrent.futures
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .audit import AuditListener, set_worker_queue
+from .background import apply_limits, background_workers, limited
+from .config import Config
+
+# Fields that do not change what a worker computes (max_workers is part of the pool key instead)
+_FINGERPRINT_EXCLUDE = {
+    "max_workers", "watch_mode", "json_output", "html_report", "task_timeout", "shard", "shard_output",
+    "coordinator_address", "coordinator_authkey", "coordinator_batch_files",
+}
+
+# (kind, workers) -> (config fingerprint, pool, audit listener of its process workers)
+_pools: Dict[Tuple[str, int], Tuple[str, concurrent.futures.Executor, Optional[AuditListener]]] = {}
+_pools_lock = threading.Lock()
+
+# --executor auto: below both limits a pool costs more than it saves
+AUTO_MIN_FILES = 32
+AUTO_MIN_BYTES = 1024 * 1024
+# With the GIL, process pools pay for their startup and pickling from this much source
+PROCESS_MIN_BYTES = 16 * 1024 * 1024
+# tokenize is pure Python, several times slower per byte than ast.parse
+TOKEN_MODE_COST_FACTOR = 4
+
+# --max-memory: assumed RSS of a process worker until real ones have been measured
+WORKER_RSS_ESTIMATE = 128 * 1024 * 1024
+# --max-memory: process workers are replaced after this many tasks, returning memory the allocator kept
+WORKER_RECYCLE_TASKS = 16
+# How often MemoryBudget re-reads worker RSS
+MEMORY_SAMPLE_SECONDS = 0.5
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Set inside process-pool workers by _init_worker
+_worker_config: Optional[Config] = None
+
+
+def _init_worker(config: Config, audit_events: Any = None) -> None:
+    """Process-pool initializer: receive the config (and the parent's audit queue) once and import the processors ahead of the first task."""
+    global _worker_config
+    _worker_config = config
+    if audit_events is not None:
+        set_worker_queue(audit_events)
+    # Ctrl+C is handled by the parent, which shuts the pool down; SIGTERM is how the parent
+    # stops a worker, so a fork must not keep the CLI's cancel-on-SIGTERM handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if limited(config):
+        apply_limits(config, share=resolve_workers(config))
+    from . import ast_processor, text_processor, token_processor  # noqa: F401
+
+
+def worker_config() -> Optional[Config]:
+    """Config shipped to this process-pool worker, or None outside a worker."""
+    return _worker_config
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def config_fingerprint(config: Config) -> str:
+    """Stable hash of the config fields that affect worker results."""
+    dumped = config.model_dump_json(exclude=_FINGERPRINT_EXCLUDE)
+    return hashlib.md5(dumped.encode("utf-8")).hexdigest()
+
+
+def resolve_workers(config: Config) -> int:
+    """Pool size: max_workers (default: CPU count, a share of it with --background), capped by what --max-memory allows at the estimated worker RSS."""
+    workers = config.max_workers or (background_workers() if config.background else os.cpu_count() or 4)
+    if config.max_memory is not None:
+        workers = min(workers, max(1, config.max_memory // WORKER_RSS_ESTIMATE))
+    return workers
+
+
+def process_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size in bytes of pid (default: this process); None where it cannot be read.
+
+    Reads /proc on Linux. Elsewhere only this process is measured, by its peak RSS.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is not None:
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # KiB on Linux and the BSDs
+
+
+def pool_processes(pool: Any) -> Optional[List[Any]]:
+    """Worker processes of a process pool, or None when the pool does not expose them.
+
+    ProcessPoolExecutor has no public accessor: this reads CPython's private _processes,
+    so callers must cope with None (another implementation, a thread pool, or a pool shut down).
+    """
+    processes = getattr(pool, "_processes", None)
+    return list(processes.values()) if isinstance(processes, dict) else None
+
+
+class MemoryBudget:
+    """How many tasks a process pool may run at once for its workers to fit in config.max_memory.
+
+    What the parent is not using is divided by the largest worker RSS seen so far
+    (WORKER_RSS_ESTIMATE until a worker has been measured). Concurrency drops as workers
+    grow, and recovers as recycled ones come back small.
+    """
+
+    def __init__(self, config: Config, pool: Any):
+        self.budget = config.max_memory
+        self.pool = pool
+        self.workers = resolve_workers(config)
+        self.worker_rss = 0
+        self.peak_worker_rss = 0
+        self.lowest = self.workers
+        self._limit = self.workers
+        self._sampled = 0.0
+        self._unmeasured = False
+
+    def limit(self) -> int:
+        now = time.monotonic()
+        if now - self._sampled < MEMORY_SAMPLE_SECONDS:
+            return self._limit
+        self._sampled = now
+        processes = pool_processes(self.pool)
+        if processes is None and not self._unmeasured:
+            self._unmeasured = True
+            logging.warning(f"Memory budget: cannot measure worker RSS (the pool does not expose its processes); assuming {WORKER_RSS_ESTIMATE // 1048576} MiB per worker")
+        sizes = [process_rss(p.pid) for p in processes or []]
+        sizes = [size for size in sizes if size]
+        if sizes:
+            self.worker_rss = max(sizes)
+            self.peak_worker_rss = max(self.peak_worker_rss, self.worker_rss)
+        room = self.budget - (process_rss() or 0)
+        self._limit = max(1, min(self.workers, room // (self.worker_rss or WORKER_RSS_ESTIMATE)))
+        if self._limit < self.lowest:
+            self.lowest = self._limit
+            logging.info(f"Memory budget: {self._limit} of {self.workers} workers busy (worker RSS {self.worker_rss / 1048576:.0f} MiB)")
+        return self._limit
+
+    def window(self, window: int) -> int:
+        """Tasks to keep in flight: the usual window, or no queue-ahead while concurrency is capped."""
+        limit = self.limit()
+        return window if limit >= self.workers else limit
+
+    def summary(self) -> str:
+        return f"{self.budget / 1048576:.0f} MiB, {self.workers} workers, as few as {self.lowest} busy, peak worker RSS {self.peak_worker_rss / 1048576:.0f} MiB"
+
+
+def free_threaded() -> bool:
+    """True when running on a free-threaded (no-GIL) build with the GIL disabled."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def configured_strategy(config: Config) -> str:
+    """Strategy requested by --executor, or implied by --parallel/--use-multiprocessing."""
+    if config.executor is not None:
+        return config.executor
+    if not config.parallel:
+        return "sequential"
+    return "processes" if config.use_multiprocessing else "threads"
+
+
+def choose_strategy(config: Config, file_count: int, total_bytes: int) -> str:
+    """Resolve "auto" to sequential, threads or processes for this workload; other strategies pass through.
+
+    Small scans stay sequential. Free-threaded builds use threads, which parse in parallel
+    there without any pickling. With the GIL, threads only overlap I/O, so large scans
+    (lower bar in token mode) go to processes. A task_timeout always means processes:
+    a thread stuck on a file cannot be stopped.
+    """
+    strategy = configured_strategy(config)
+    if strategy != "auto":
+        return strategy
+    if resolve_workers(config) < 2 or (file_count < AUTO_MIN_FILES and total_bytes < AUTO_MIN_BYTES):
+        return "sequential"
+    if config.task_timeout:
+        return "processes"
+    if free_threaded():
+        return "threads"
+    process_min = PROCESS_MIN_BYTES // TOKEN_MODE_COST_FACTOR if config.token_mode else PROCESS_MIN_BYTES
+    return "processes" if total_bytes >= process_min else "threads"
+
+
+def with_strategy(config: Config, strategy: str) -> Config:
+    """Config whose parallel/use_multiprocessing flags match strategy (config itself if they already do)."""
+    parallel, processes = strategy != "sequential", strategy == "processes"
+    if config.parallel == parallel and config.use_multiprocessing == processes:
+        return config
+    return config.model_copy(update={"parallel": parallel, "use_multiprocessing": processes})
+
+
+def get_pool(config: Config) -> concurrent.futures.Executor:
+    """Return the shared pool for this config's executor kind and size, creating (or replacing) it as needed.
+
+    Process pools are keyed on the config fingerprint too, since their workers hold the config
+    shipped by the initializer; a changed config replaces the pool.
+    """
+    kind = "process" if config.use_multiprocessing else "thread"
+    workers = resolve_workers(config)
+    fingerprint = config_fingerprint(config) if kind == "process" else ""
+    key = (kind, workers)
+    with _pools_lock:
+        cached = _pools.get(key)
+        if cached is not None:
+            if cached[0] == fingerprint:
+                return cached[1]
+            _close_pool(cached, cancel_futures=True)
+        listener = None
+        if kind == "process":
+            # With a memory budget, workers are recycled (this requires the spawn start method)
+            recycle = {"max_tasks_per_child": WORKER_RECYCLE_TASKS} if config.max_memory is not None else {}
+            context = multiprocessing.get_context("spawn" if recycle else None)
+            listener = AuditListener(context) if config.audit_enabled else None
+            pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker,
+                initargs=(config, listener.events if listener is not None else None), **recycle
+            )
+        else:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duplifinder")
+        _pools[key] = (fingerprint, pool, listener)
+        logging.debug(f"Started {kind} pool with {workers} workers")
+        return pool
+
+
+def prestart_pool(config: Config) -> None:
+    """Create the pool and spawn its workers in the background, e.g. while discovery runs.
+
+    "auto" waits for discovery to pick a strategy, so there is nothing to prestart.
+    """
+    if configured_strategy(config) != "processes":
+        return  # Threads start in microseconds; nothing to hide
+    pool = get_pool(with_strategy(config, "processes"))
+    # Process pools spawn workers on demand; one no-op per worker brings them all up
+    for _ in range(resolve_workers(config)):
+        pool.submit(_warmup)
+
+
+def _close_pool(
+    cached: Tuple[str, concurrent.futures.Executor, Optional[AuditListener]], cancel_futures: bool, terminate: bool = False, wait: bool = False
+) -> None:
+    """Shut down a pool from _pools (terminating its process workers if terminate) and retire its audit listener."""
+    _, pool, listener = cached
+    processes = pool_processes(pool) or []  # Read before shutdown clears them
+    pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+    if terminate:
+        for process in processes:
+            process.terminate()
+    if listener is not None:
+        listener.retire(processes)
+
+
+def discard_pool(config: Config) -> None:
+    """Drop the pool for this config (e.g. after a worker died) so the next scan builds a fresh one."""
+    kind = "process" if config.use_multiprocessing else "thread"
+    with _pools_lock:
+        cached = _pools.pop((kind, resolve_workers(config)), None)
+    if cached is not None:
+        _close_pool(cached, cancel_futures=True)
+
+
+def _retire_pool(config: Config, cancel_queued: bool) -> None:
+    """Drop this config's pool now, terminating its process workers (their queued tasks are cancelled).
+
+    Threads cannot be stopped: the old thread pool finishes the files its threads are on,
+    and its queue too unless cancel_queued, in the background.
+    """
+    kind = "process" if config.use_multiprocessing else "thread"
+    with _pools_lock:
+        cached = _pools.pop((kind, resolve_workers(config)), None)
+    if cached is None:
+        return
+    if kind == "process":
+        _close_pool(cached, cancel_futures=True, terminate=True)
+    else:
+        _close_pool(cached, cancel_futures=cancel_queued)
+
+
+def replace_pool(config: Config) -> concurrent.futures.Executor:
+    """Retire this config's pool after a task overran its budget and return a fresh one.
+
+    Process workers are terminated, the stuck one with them, and their queued tasks
+    cancelled. Threads cannot be stopped: the old thread pool finishes its queue in the
+    background and the stuck thread is abandoned.
+    """
+    _retire_pool(config, cancel_queued=False)
+    logging.debug(f"Replaced {'process' if config.use_multiprocessing else 'thread'} pool after a task timeout")
+    return get_pool(config)
+
+
+def cancel_pool(config: Config) -> None:
+    """Stop a cancelled scan's work: queued tasks are dropped and process workers terminated,
+    so the interpreter can exit without waiting for them. The next scan starts a fresh pool."""
+    _retire_pool(config, cancel_queued=True)
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Shut down every shared pool (registered at exit); wait=True lets queued tasks finish."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for cached in pools:
+        _close_pool(cached, cancel_futures=not wait, wait=wait)
+
+
+atexit.register(shutdown_pools, wait=False)
@@ -0,0 +1,160 @@
+# src/duplifinder/file_loader.py
+
+"""Read-once source loader shared by sniffing, hashing, encoding detection and parsing."""
+
+import hashlib
+import io
+import mmap
+import os
+import re
+import tokenize
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from .background import throttle_read
+
+# Files at least this large are memory-mapped instead of copied into a bytes object
+MMAP_THRESHOLD = 8 * 1024 * 1024
+SNIFF_BYTES = 1024
+# detect_encoding only looks at the first two lines; bound what it sees for mapped files
+_ENCODING_PROBE_BYTES = 64 * 1024
+# Generated-code banners (protoc, Thrift, "Code generated ... DO NOT EDIT", @generated), matched
+# only on comment lines of the file's leading comment block
+_GENERATED_RE = re.compile(
+    rb"^#.*(@generated\b|generated by the protocol buffer compiler|auto-?generated by\b|\bgenerated\b.*\bdo not edit\b)", re.IGNORECASE
+)
+_GENERATED_PROBE_BYTES = 2048
+# Minified sources pack most of their bytes into a few very long lines
+_MINIFIED_PROBE_BYTES = 64 * 1024
+MINIFIED_AVG_LINE_BYTES = 500
+_LINE_COUNT_CHUNK = 1024 * 1024
+
+
+class SourceFile:
+    """A file's contents read with a single open; every consumer works from the same buffer."""
+
+    __slots__ = ("path", "data", "_mmap", "_encoding")
+
+    def __init__(self, path: Path, data: Union[bytes, mmap.mmap], mapped: Optional[mmap.mmap] = None):
+        self.path = path
+        self.data = data
+        self._mmap = mapped
+        self._encoding: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Path, max_bytes: Optional[int] = None) -> "SourceFile":
+        """Read path once: into bytes, or an mmap for files of MMAP_THRESHOLD (or more than max_bytes) bytes.
+
+        Files over max_bytes are mapped rather than copied, since the caller will not parse them whole.
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            throttle_read(size)
+            if size >= MMAP_THRESHOLD or (max_bytes is not None and size > max_bytes):
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return cls(path, mapped, mapped)
+            return cls(path, f.read())
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "SourceFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def header(self) -> bytes:
+        return bytes(self.data[:SNIFF_BYTES])
+
+    def looks_like_python(self) -> bool:
+        """Cheap content sniff (shebang or def/class in the first 1024 bytes) for .py masqueraders."""
+        header = self.header
+        return header.startswith(b"#!") or b"def " in header or b"class " in header
+
+    def looks_generated(self) -> bool:
+        """Generated-code banner (protoc, "Code generated ... DO NOT EDIT", @generated) in the leading comment block.
+
+        Code and docstrings are never looked at, so a module that merely mentions
+        generated code is not mistaken for generated code.
+        """
+        for line in bytes(self.data[:_GENERATED_PROBE_BYTES]).splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith(b"#"):
+                return False  # End of the leading comment block
+            if _GENERATED_RE.match(line):
+                return True
+        return False
+
+    def looks_minified(self) -> bool:
+        """Average line length in the first 64 KiB is at least MINIFIED_AVG_LINE_BYTES."""
+        probe = self.data[:_MINIFIED_PROBE_BYTES]
+        if len(probe) < MINIFIED_AVG_LINE_BYTES:
+            return False
+        return len(probe) // (probe.count(b"\n") + 1) >= MINIFIED_AVG_LINE_BYTES
+
+    def line_count(self) -> int:
+        """Number of lines, counted in bounded chunks for mapped files."""
+        if self._mmap is None:
+            newlines = self.data.count(b"\n")
+        else:
+            newlines = sum(self.data[i : i + _LINE_COUNT_CHUNK].count(b"\n") for i in range(0, self.size, _LINE_COUNT_CHUNK))
+        return newlines + (1 if self.size and self.data[-1:] != b"\n" else 0)
+
+    def digest(self) -> str:
+        """MD5 of the full contents, compatible with CacheManager.compute_hash."""
+        return hashlib.md5(self.data).hexdigest()
+
+    @property
+    def encoding(self) -> str:
+        """Source encoding from the BOM or PEP 263 cookie (as tokenize.open would pick)."""
+        if self._encoding is None:
+            probe = self.data if self._mmap is None else self.data[:_ENCODING_PROBE_BYTES]
+            self._encoding, _ = tokenize.detect_encoding(io.BytesIO(probe).readline)
+        return self._encoding
+
+    def _codec(self, errors: str) -> str:
+        """Encoding to decode with: the detected one; with lenient errors, utf-8 when none can be detected."""
+        if errors == "strict":
+            return self.encoding
+        try:
+            return self.encoding
+        except SyntaxError:
+            return "utf-8"  # Not UTF-8 and no (valid) coding cookie: decode what we can, with replacements
+
+    def text(self, errors: str = "strict") -> str:
+        """Decode with the detected encoding and universal newlines, like tokenize.open().read().
+
+        Unless errors is "strict", a file whose encoding cannot be detected is read as utf-8.
+        """
+        text = str(self.data, self._codec(errors), errors)
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def lines(self, errors: str = "strict") -> List[str]:
+        """Lines with their endings, split only on newlines (as file.readlines() does)."""
+        return io.StringIO(self.text(errors)).readlines()
+
+    def iter_lines(self, errors: str = "replace") -> Iterator[str]:
+        """Decode one line at a time (bounded memory, no full-text copy); '\\r\\n' endings become '\\n'."""
+        encoding = self._codec(errors)
+        if self._mmap is not None:
+            self._mmap.seek(0)
+            readline = self._mmap.readline
+        else:
+            readline = io.BytesIO(self.data).readline
+        for raw in iter(readline, b""):
+            line = str(raw, encoding, errors)
+            if line.endswith("\r\n"):
+                line = line[:-2] + "\n"
+            yield line
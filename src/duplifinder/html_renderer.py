@@ -2,9 +2,10 @@
 
 import html as html_lib
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from .config import Config
+from .exceptions import ScanCancelled
 
 TEMPLATE_PATH = Path(__file__).parent / "templates" / "report.html"
 
@@ -14,9 +15,10 @@ def render_html_report(
     scanned: int,
     total_lines: int,
     dup_lines: int,
-    dup_rate: float
+    dup_rate: float,
+    cancelled: Optional[ScanCancelled] = None,
 ) -> None:
-    """Generate an HTML report for the duplicates."""
+    """Generate an HTML report for the duplicates (marked incomplete for a cancelled scan)."""
     if not config.html_report:
         return
 
@@ -52,6 +54,10 @@ def render_html_report(
         </div>
         """)
 
+    if cancelled is not None:
+        left = "an unknown number of" if cancelled.not_processed is None else str(cancelled.not_processed)
+        content_parts.insert(0, f'<div class="group alert"><div class="group-header">Incomplete report: the scan was cancelled; {left} files were not processed.</div></div>')
+
     content = "\n".join(content_parts)
     alert_class = "alert" if dup_rate > config.dup_threshold else ""
 
@@ -0,0 +1,209 @@
+# src/duplifinder/index.py
+
+"""Mergeable definition index: workers combine a batch of files before results cross the process boundary."""
+
+import marshal
+import operator
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import Config
+from .processor_utils import estimate_dup_lines
+
+
+# Bump when the packed layout changes
+_PACK_VERSION = 1
+
+
+class DefinitionIndex:
+    """Definitions by type and name plus scan counters, for any number of files.
+
+    Built per batch in the workers (see combine_definitions) and merged in the parent,
+    which handles a few partial indexes instead of one result per file.
+
+    Pickles compactly: file paths, names and snippets are interned into tables and each
+    location becomes three integers in packed columns, so a chunk crosses the process
+    boundary as a handful of flat objects. An unpickled index keeps that payload and only
+    builds its dicts when definitions is read; merge() decodes it straight into the target.
+    """
+
+    __slots__ = ("_definitions", "_packed", "skipped", "scanned", "total_lines", "dup_lines", "files")
+
+    def __init__(self, types: Iterable[str] = ()):
+        self._definitions: Optional[Dict[str, Dict[str, List[Tuple[str, str]]]]] = {t: defaultdict(list) for t in types}
+        self._packed: Optional[bytes] = None
+        self.skipped: List[str] = []
+        self.scanned = 0
+        self.total_lines = 0
+        self.dup_lines = 0
+        self.files = 0  # Results folded in, whatever their outcome (scanned, skipped, not source)
+
+    @classmethod
+    def from_results(
+        cls, definitions: Dict[str, Dict[str, List[Tuple[str, str]]]], skipped: List[str], scanned: int, total_lines: int, dup_lines: int
+    ) -> "DefinitionIndex":
+        """Index holding a finished scan's results, in the shape find_definitions returns them."""
+        index = cls()
+        index._definitions = {t: defaultdict(list, name_locs) for t, name_locs in definitions.items()}
+        index.skipped = list(skipped)
+        index.scanned, index.total_lines, index.dup_lines = scanned, total_lines, dup_lines
+        index.files = scanned + len(skipped)
+        return index
+
+    @property
+    def definitions(self) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+        if self._definitions is None:
+            self._definitions = {}
+            _unpack_into(self._packed, self._definitions)
+            self._packed = None
+        return self._definitions
+
+    def __getstate__(self) -> Tuple:
+        packed = self._packed if self._definitions is None else _pack(self._definitions)
+        return packed, self.skipped, self.scanned, self.total_lines, self.dup_lines, self.files
+
+    def __setstate__(self, state: Tuple) -> None:
+        self._packed, self.skipped, self.scanned, self.total_lines, self.dup_lines, self.files = state
+        self._definitions = None
+
+    def add(self, path: Optional[Path], result: Tuple, config: Config, copies: List[Path] = ()) -> None:
+        """Fold in one processor result; identical copies of path share it and form a file-level clone group."""
+        defs, skipped_file, file_lines = result
+        self.files += 1
+        if isinstance(skipped_file, str):
+            self.skipped.append(skipped_file)
+        elif defs is not None:  # None: not source content (rejected by the header sniff)
+            self.scanned += 1
+            self.total_lines += file_lines
+            for t, name_locs in defs.items():
+                by_name = self.definitions.setdefault(t, defaultdict(list))
+                for name, items in name_locs.items():
+                    by_name[name].extend(items)
+                    self.dup_lines += estimate_dup_lines(items, False, config)
+        if copies:
+            self.add_copies(path, result, copies)
+
+    def add_copies(self, path: Path, result: Tuple, copies: List[Path]) -> None:
+        """Account for identical copies of path, whose result was already added (only its skip entry and line count are read)."""
+        _, skipped_file, file_lines = result
+        self.files += len(copies)
+        if isinstance(skipped_file, str):
+            reason_suffix = skipped_file[len(str(path)):]
+            self.skipped.extend(f"{c}{reason_suffix}" for c in copies)
+            return
+        if result[0] is None:
+            return
+        self.scanned += len(copies)
+        self.total_lines += file_lines * len(copies)
+        self.definitions.setdefault("file", defaultdict(list))[str(path)] = [(f"{p}:1", "") for p in (path, *copies)]
+        self.dup_lines += file_lines * len(copies)
+
+    def relocate(self, moves: Dict[Path, Path]) -> None:
+        """Attribute each moved file's results to its new path (an identical copy): locations and skip entries are rewritten."""
+        if not moves:
+            return
+        paths = {str(old): str(new) for old, new in moves.items()}
+        for name_locs in self.definitions.values():
+            for name, items in name_locs.items():
+                if any(loc.rpartition(":")[0] in paths for loc, _ in items):
+                    name_locs[name] = [(_moved(loc, paths), snippet) for loc, snippet in items]
+        for i, entry in enumerate(self.skipped):
+            for old, new in paths.items():
+                if entry == old or entry.startswith(f"{old} ("):  # Failed, or skipped with a reason
+                    self.skipped[i] = new + entry[len(old):]
+                    break
+
+    def merge(self, other: "DefinitionIndex") -> None:
+        """Fold another (partial) index into this one."""
+        if other._definitions is None:
+            _unpack_into(other._packed, self.definitions)  # No intermediate dicts for a packed partial
+        else:
+            for t, name_locs in other._definitions.items():
+                by_name = self.definitions.setdefault(t, defaultdict(list))
+                for name, items in name_locs.items():
+                    by_name[name].extend(items)
+        self.skipped.extend(other.skipped)
+        self.scanned += other.scanned
+        self.total_lines += other.total_lines
+        self.dup_lines += other.dup_lines
+        self.files += other.files
+
+
+def _moved(loc: str, paths: Dict[str, str]) -> str:
+    path, _, line = loc.rpartition(":")
+    return f"{paths[path]}:{line}" if path in paths else loc
+
+
+def _pack_ints(values: List[int]) -> Tuple[str, bytes]:
+    """Pack integers as 16-bit when they all fit, else 32-bit."""
+    typecode = "H" if max(values, default=0) < 1 << 16 else "I"
+    return typecode, array(typecode, values).tobytes()
+
+
+def _unpack_ints(packed: Tuple[str, bytes]) -> array:
+    values = array(packed[0])
+    values.frombytes(packed[1])
+    return values
+
+
+def _pack(definitions: Dict[str, Dict[str, List[Tuple[str, str]]]]) -> bytes:
+    """Encode definitions as interned file/name/snippet tables plus flat integer columns.
+
+    Each name contributes a (type, count) header; each location a (file, line, snippet)
+    row. Falls back to marshalling the plain dicts if a location is not 'path:lineno'.
+    """
+    files: Dict[str, int] = {}
+    snippets: Dict[str, int] = {"": 0}
+    names: List[str] = []
+    heads: List[int] = []
+    file_ids: List[int] = []
+    lines: List[int] = []
+    snippet_ids: List[int] = []
+    for type_id, name_locs in enumerate(definitions.values()):
+        for name, items in name_locs.items():
+            names.append(name)
+            heads.extend((type_id, len(items)))
+            for loc, snippet in items:
+                path, _, line = loc.rpartition(":")
+                if not path or not line.isdigit():
+                    return marshal.dumps((_PACK_VERSION, {t: dict(n) for t, n in definitions.items()}))
+                file_ids.append(files.setdefault(path, len(files)))
+                lines.append(int(line))
+                snippet_ids.append(snippets.setdefault(snippet, len(snippets)))
+    # Paths and names cannot contain NUL, so each table travels as a single string
+    return marshal.dumps((
+        _PACK_VERSION, tuple(definitions), "\0".join(names), "\0".join(files), tuple(snippets),
+        _pack_ints(heads), _pack_ints(file_ids), _pack_ints(lines), _pack_ints(snippet_ids),
+    ))
+
+
+def _unpack_into(packed: bytes, target: Dict[str, Dict[str, List[Tuple[str, str]]]]) -> None:
+    """Decode a _pack payload, appending its locations to target (rows are rebuilt column-wise, in C loops)."""
+    payload: Any = marshal.loads(packed)
+    if len(payload) == 2:
+        for t, name_locs in payload[1].items():
+            by_name = target.setdefault(t, defaultdict(list))
+            for name, items in name_locs.items():
+                by_name[name].extend(tuple(item) for item in items)
+        return
+    _, types, names, files, snippets, heads, file_ids, lines, snippet_ids = payload
+    prefixes = [f"{path}:" for path in files.split("\0")]
+    locs = map(operator.add, map(prefixes.__getitem__, _unpack_ints(file_ids)), map(str, _unpack_ints(lines)))
+    rows = list(zip(locs, map(snippets.__getitem__, _unpack_ints(snippet_ids))))
+    type_maps = [target.setdefault(t, defaultdict(list)) for t in types]
+    heads = _unpack_ints(heads)
+    pos = 0
+    for k, name in enumerate(names.split("\0") if names else ()):
+        count = heads[2 * k + 1]
+        type_maps[heads[2 * k]][name].extend(rows[pos : pos + count])
+        pos += count
+
+
+def combine_definitions(paths: List[Path], results: List[Tuple], config: Config, clones: Optional[Dict[Path, List[Path]]] = None) -> DefinitionIndex:
+    """Map-side combine for run_parallel: one partial index for a batch of process_file_ast results."""
+    index = DefinitionIndex()
+    for path, result in zip(paths, results):
+        index.add(path, result, config, clones.get(path, []) if clones else [])
+    return index
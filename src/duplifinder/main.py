@@ -2,23 +2,62 @@
 
 """Main entry point for Duplifinder."""
 
+import logging
+import signal
 import sys
+import threading
 import time
+from multiprocessing import AuthenticationError
 from typing import Dict, List, Tuple
 from pydantic import ValidationError
 
-from .cli import create_parser, build_config
+from .cli import create_parser, create_coordinate_parser, create_merge_parser, create_work_parser, build_config, build_merge_config
+from .distributed import parse_address, resolve_authkey, run_worker
 from .utils import PerformanceTracker
 from .banner import print_logo
-from .exceptions import DuplifinderError, ConfigError
-from .application import WorkflowFactory
+from .exceptions import DuplifinderError, ConfigError, ScanCancelled
+from .application import MergeWorkflow, WorkflowFactory
+from .shard import merge_partials
+
+
+def _work(argv: List[str]) -> int:
+    """`duplifinder work`: serve a coordinator until its scan is done."""
+    parser = create_work_parser()
+    args = parser.parse_args(argv)
+    authkey = resolve_authkey(args.authkey)
+    if authkey is None:
+        parser.error("an auth key is required: pass --authkey or set DUPLIFINDER_AUTHKEY")
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    try:
+        batches = run_worker(parse_address(args.connect), authkey, args.executor, args.max_workers, args.connect_timeout)
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"Error: lost the coordinator at {args.connect}: {e.__class__.__name__} {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nOperation cancelled by user.", file=sys.stderr)
+        return 130
+    print(f"Processed {batches} batches.", file=sys.stderr)
+    return 0
+
+
+def _interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
 
 
 def main() -> None:
     """Run the main Duplifinder workflow."""
     print_logo()
-    parser = create_parser()
-    args = parser.parse_args()
+    if threading.current_thread() is threading.main_thread():
+        # CI runners stop a job with SIGTERM: cancel like Ctrl+C, so the partial report still gets written
+        signal.signal(signal.SIGTERM, _interrupt)
+    # Subcommands: `merge` combines the partial indexes of a --shard run; `coordinate` and
+    # `work` run one scan over a dynamic work queue shared by several machines
+    command = sys.argv[1] if sys.argv[1:2] in (["merge"], ["coordinate"], ["work"]) else None
+    if command == "work":
+        sys.exit(_work(sys.argv[2:]))
+    merging = command == "merge"
+    parser = {"merge": create_merge_parser, "coordinate": create_coordinate_parser}.get(command, create_parser)()
+    args = parser.parse_args(sys.argv[2:] if command else None)
 
     # Pre-parse verbose for tracker init (config not built yet)
     # We can check args.verbose directly since build_config also checks it
@@ -27,7 +66,11 @@ def main() -> None:
 
     try:
         try:
-            config = build_config(args)
+            if merging:
+                scan, index = merge_partials(args.partials)
+                config = build_merge_config(args, scan)
+            else:
+                config = build_config(args)
             tracker.mark_phase("Configuration")
         except (ConfigError, ValidationError, SystemExit) as e:
             if isinstance(e, SystemExit):
@@ -48,7 +91,10 @@ def main() -> None:
 
         workflow_start = time.perf_counter()  # Start timing post-config
 
-        workflow = WorkflowFactory.create(config, tracker, workflow_start)
+        if merging:
+            workflow = MergeWorkflow(config, tracker, workflow_start, index)
+        else:
+            workflow = WorkflowFactory.create(config, tracker, workflow_start)
 
         if config.watch_mode:
             exit_code = workflow.run_with_watch()
@@ -57,6 +103,10 @@ def main() -> None:
 
         sys.exit(exit_code)
 
+    except ScanCancelled as e:
+        # Workflows without a partial report (e.g. a shard, whose partial index is not written)
+        print(f"\n{e}.", file=sys.stderr)
+        sys.exit(130)
     except DuplifinderError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
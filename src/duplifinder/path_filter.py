@@ -0,0 +1,185 @@
+# src/duplifinder/path_filter.py
+
+"""Compiled path filter for .gitignore rules, ignore_dirs and exclude_patterns."""
+
+import fnmatch
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import Config
+
+# Exclusion reasons reported by PathFilter.exclusion_reason
+IGNORE_DIR = "ignore_dir"
+GITIGNORE = "gitignore"
+EXCLUDE_PATTERN = "exclude_pattern_match"
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring/negation markers) into a regex fragment."""
+    out: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n
+                if at_start and at_end:
+                    out.append(".*")
+                    i += 2
+                    continue
+                if at_start and pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")  # '**/' matches zero or more directories
+                    i += 3
+                    continue
+            out.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            start = i + 1
+            if start < n and pattern[start] in "!^":
+                start += 1
+            j = pattern.find("]", start + 1)  # A leading ']' is part of the class
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = j + 1
+                continue
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_gitignore_pattern(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """Compile one .gitignore line into (regex, negate, dir_only); None for blanks/comments."""
+    if not line.strip() or line.startswith("#"):
+        return None
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = _translate_glob(line)
+    if not anchored and not line.startswith("**"):
+        regex = "(?:.*/)?" + regex
+    return regex, negate, dir_only
+
+
+class GitignoreRules:
+    """Rules from one .gitignore file, each path evaluated with a single regex match.
+
+    Alternatives are joined in reverse file order so the first alternative that
+    matches is the last matching rule, which is the one git applies.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        compiled = [c for c in (compile_gitignore_pattern(p) for p in patterns) if c]
+        self.rule_count = len(compiled)
+        self._negated: Dict[str, bool] = {}
+        dir_alts: List[str] = []
+        file_alts: List[str] = []
+        for idx in range(len(compiled) - 1, -1, -1):
+            regex, negate, dir_only = compiled[idx]
+            group = f"r{idx}"
+            self._negated[group] = negate
+            # A rule matching a directory also covers everything below it
+            dir_alts.append(f"(?P<{group}>{regex}(?:/.*)?)")
+            tail = "/.*" if dir_only else "(?:/.*)?"
+            file_alts.append(f"(?P<{group}>{regex}{tail})")
+        self._dir_re = re.compile("|".join(dir_alts), re.DOTALL) if dir_alts else None
+        self._file_re = re.compile("|".join(file_alts), re.DOTALL) if file_alts else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if ignored, False if re-included by a negation, None if no rule applies."""
+        regex = self._dir_re if is_dir else self._file_re
+        if regex is None:
+            return None
+        m = regex.fullmatch(rel_path)
+        if m is None:
+            return None
+        return not self._negated[m.lastgroup]
+
+
+class PathFilter:
+    """Single compiled matcher for every discovery-time exclusion decision.
+
+    Paths are POSIX strings relative to the scan root. Nested .gitignore files
+    are registered with add_gitignore as the walk reaches their directory.
+    """
+
+    def __init__(self, ignore_dirs: Iterable[str] = (), exclude_patterns: Iterable[str] = ()):
+        self.ignore_dirs = frozenset(ignore_dirs)
+        patterns = sorted(exclude_patterns)
+        self._exclude_re = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+        self._gitignores: Dict[str, GitignoreRules] = {}
+
+    @classmethod
+    def from_config(cls, config: Config) -> "PathFilter":
+        """Build a filter from ignore_dirs and exclude_patterns (gitignores are added during discovery)."""
+        return cls(config.ignore_dirs, config.exclude_patterns)
+
+    @property
+    def has_gitignores(self) -> bool:
+        return bool(self._gitignores)
+
+    def add_gitignore(self, base_rel: str, patterns: List[str]) -> None:
+        """Register the rules of the .gitignore located in directory base_rel ('' for the root)."""
+        rules = GitignoreRules(patterns)
+        if rules.rule_count:
+            self._gitignores[base_rel] = rules
+
+    def _gitignored(self, rel_path: str, is_dir: bool) -> bool:
+        # Deeper .gitignore files take precedence over their parents
+        base = rel_path
+        while True:
+            base = base.rpartition("/")[0] if "/" in base else ""
+            rules = self._gitignores.get(base)
+            if rules is not None:
+                sub = rel_path[len(base) + 1 :] if base else rel_path
+                decision = rules.match(sub, is_dir)
+                if decision is not None:
+                    return decision
+            if not base:
+                return False
+
+    def exclusion_reason(self, rel_path: str, is_dir: bool = False) -> Optional[str]:
+        """Return why rel_path is excluded (IGNORE_DIR, GITIGNORE, EXCLUDE_PATTERN) or None to keep it."""
+        name = rel_path.rpartition("/")[2]
+        if is_dir:
+            if name in self.ignore_dirs:
+                return IGNORE_DIR
+        elif self._exclude_re is not None and (self._exclude_re.match(name) or self._exclude_re.match(rel_path)):
+            return EXCLUDE_PATTERN
+        if self._gitignores and self._gitignored(rel_path, is_dir):
+            return GITIGNORE
+        return None
+
+    def path_exclusion_reason(self, rel_path: str) -> Optional[str]:
+        """Like exclusion_reason for a file, but also checks every parent directory of rel_path."""
+        parent = ""
+        for part in rel_path.split("/")[:-1]:
+            parent = f"{parent}/{part}" if parent else part
+            reason = self.exclusion_reason(parent, is_dir=True)
+            if reason:
+                return reason
+        return self.exclusion_reason(rel_path)
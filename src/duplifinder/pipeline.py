@@ -0,0 +1,343 @@
+# src/duplifinder/pipeline.py
+
+"""Staged scan: discovery, reading and parsing overlap, connected by bounded queues."""
+
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .background import BACKGROUND_READERS, limited, throttle_read, throughput_summary
+from .cache import CacheManager, CacheSlice
+from .config import Config
+from .executor import cancel_pool, configured_strategy, free_threaded, get_pool, resolve_workers, with_strategy, worker_config
+from .file_loader import MMAP_THRESHOLD, SourceFile
+from .utils import PerformanceTracker, iter_py_files
+
+READER_THREADS = 4
+# Capacity of the queues between stages, per parse worker
+QUEUE_ITEMS_PER_WORKER = 8
+# Most files per parse task; tasks get smaller when the readers fall behind
+MAX_BATCH_FILES = 32
+# How often blocked stages check whether the scan was stopped
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised in a stage when the scan is stopped (consumer gone or another stage failed)."""
+
+
+class StageStats:
+    """Per-stage counters: items handled, time waiting for input (idle) or for room downstream (blocked), peak queue depth."""
+
+    __slots__ = ("name", "capacity", "items", "idle", "blocked", "max_depth", "_lock")
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.items = 0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 0, idle: float = 0.0, blocked: float = 0.0, depth: int = 0) -> None:
+        with self._lock:
+            self.items += items
+            self.idle += idle
+            self.blocked += blocked
+            self.max_depth = max(self.max_depth, depth)
+
+    def summary(self) -> str:
+        return f"{self.items} items, idle {self.idle:.2f}s, blocked {self.blocked:.2f}s, max queue {self.max_depth}/{self.capacity}"
+
+
+def _parse_batch(
+    process_fn: Callable,
+    batch: List[Tuple[Path, Optional[SourceFile]]],
+    kwargs: Dict[str, Any],
+    combine: Callable,
+    config: Optional[Config] = None,
+    cache: Optional[Union[CacheManager, CacheSlice]] = None,
+) -> Tuple[Any, List[Tuple], Dict[str, Any]]:
+    """Parse-stage task: process pre-read files, combine them, and summarize each result for clone accounting.
+
+    cache (the whole cache in a thread, the batch's entries in a process) is passed to
+    process_fn as cache_manager; the entries set in a CacheSlice are returned for the parent.
+    """
+    config = config if config is not None else worker_config()
+    if cache is not None:
+        kwargs = {**kwargs, "cache_manager": cache}
+    results = [process_fn(path, config=config, source=source, **kwargs) for path, source in batch]
+    summaries = [(None if data is None else {}, skipped, lines) for data, skipped, lines in results]
+    updates = cache.updates if isinstance(cache, CacheSlice) else {}
+    return combine([path for path, _ in batch], results, config), summaries, updates
+
+
+class ScanPipeline:
+    """Discovery producer -> reader threads -> parse pool -> merge consumer (whoever iterates run()).
+
+    Every queue between stages is bounded, so a fast stage waits for a slow one instead of
+    buffering the tree, and the first partial results arrive while discovery is still walking.
+    Readers hand the parser the bytes they read; identical files are recognised from their
+    digest there and parsed once, whichever copy is read first. After run() finishes, each
+    group is represented by its first file in discovery order (as in the batch scan): clones
+    maps each representative to its copies, file_results holds the representatives' result
+    summaries, for DefinitionIndex.add_copies, and renamed maps each parsed copy that is not
+    its group's representative to the one that is, for DefinitionIndex.relocate.
+
+    cache is passed to process_fn as cache_manager; process workers get only their batch's
+    entries (CacheManager.slice), and the entries they set are merged back here.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        process_fn: Callable,
+        combine: Callable,
+        accept: Optional[Callable[[Path], bool]] = None,
+        tracker: Optional[PerformanceTracker] = None,
+        cache: Optional[CacheManager] = None,
+        **kwargs,
+    ):
+        self.config = config
+        self.cache = cache
+        self.process_fn = process_fn
+        self.combine = combine
+        self.accept = accept
+        self.tracker = tracker
+        self.kwargs = kwargs
+        self.workers = resolve_workers(config)
+        capacity = self.workers * QUEUE_ITEMS_PER_WORKER
+        self.window = self.workers * 2
+        self._paths: "queue.Queue[Any]" = queue.Queue(capacity)
+        self._sources: "queue.Queue[Any]" = queue.Queue(capacity)
+        self._results: "queue.Queue[Any]" = queue.Queue()  # Bounded by the task window
+        self._slots = threading.Semaphore(self.window)
+        self.stats = {
+            "discover": StageStats("discover", capacity),
+            "read": StageStats("read", capacity),
+            "parse": StageStats("parse", self.window),
+            "merge": StageStats("merge", self.window),
+        }
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+        self.readers = BACKGROUND_READERS if config.background else READER_THREADS
+        self._readers_left = self.readers
+        self.bytes_read = 0
+        self._started = 0.0
+        self._consumed = 0
+        self._digests: Dict[str, Path] = {}
+        self._tracked: Set[Path] = set()
+        self._order: Dict[Path, int] = {}  # Discovery position of each file with a digest
+        self.clones: Dict[Path, List[Path]] = {}
+        self.file_results: Dict[Path, Tuple] = {}
+        self.renamed: Dict[Path, Path] = {}
+        self.discovered: Optional[int] = None  # Set once discovery has finished
+
+    def _parse_config(self) -> Config:
+        """Config for the parse pool. The file count is unknown up front, so "auto" (and
+        "sequential", since the pipeline needs a pool) pick threads on free-threaded builds
+        or a single worker, processes otherwise; the choice is logged and recorded."""
+        configured = configured_strategy(self.config)
+        strategy = configured
+        if strategy not in ("threads", "processes"):
+            strategy = "threads" if free_threaded() or self.workers < 2 else "processes"
+            logging.info(f"Pipeline parse pool: {strategy} ({self.workers} workers) for a {configured} config; set --executor to choose")
+        if self.tracker is not None:
+            self.tracker.record("Executor", strategy)
+        return with_strategy(self.config, strategy)
+
+    def _get(self, q: "queue.Queue[Any]", stats: StageStats) -> Any:
+        start = time.perf_counter()
+        while True:
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Stopped
+        stats.add(idle=time.perf_counter() - start)
+        return item
+
+    def _put(self, q: "queue.Queue[Any]", item: Any, stats: StageStats) -> None:
+        start = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Stopped
+        stats.add(blocked=time.perf_counter() - start, depth=q.qsize())
+
+    def _stage(self, fn: Callable[[], None]) -> None:
+        try:
+            fn()
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _discover(self) -> None:
+        stats = self.stats["discover"]
+        for path in iter_py_files(self.config):
+            if self.accept is None or self.accept(path):
+                self._put(self._paths, (stats.items, path), stats)
+                stats.add(items=1)
+        self.discovered = stats.items
+        for _ in range(self.readers):
+            self._put(self._paths, _DONE, stats)
+
+    def _load(self, path: Path) -> Tuple[Optional[SourceFile], Optional[str]]:
+        """Read a file for the parser; (None, None) leaves large or unreadable files to the parser itself."""
+        try:
+            size = os.stat(path).st_size
+            with self._lock:
+                self.bytes_read += size  # Mapped files included: the parser reads them
+            if size >= MMAP_THRESHOLD or (self.config.max_file_bytes is not None and size > self.config.max_file_bytes):
+                return None, None  # Mapped (or streamed) by the parser instead of shipped
+            throttle_read(size)
+            with open(path, "rb") as f:
+                source = SourceFile(path, f.read())
+        except OSError:
+            return None, None  # The parser reports it as skipped
+        digest = source.digest() if self.config.dedupe_files and source.size else None
+        return source, digest
+
+    def _read(self) -> None:
+        stats = self.stats["read"]
+        try:
+            while True:
+                item = self._get(self._paths, stats)
+                if item is _DONE:
+                    break
+                position, path = item
+                source, digest = self._load(path)
+                if digest is not None:
+                    with self._lock:
+                        self._order[path] = position
+                        rep = self._digests.setdefault(digest, path)
+                        if rep is not path:
+                            self.clones.setdefault(rep, []).append(path)
+                            stats.add(items=1)
+                            continue
+                        self._tracked.add(path)
+                self._put(self._sources, (path, source), stats)
+                stats.add(items=1)
+        finally:
+            with self._lock:
+                self._readers_left -= 1
+                last = self._readers_left == 0
+            if last and not self._stop.is_set():
+                self._put(self._sources, _DONE, stats)
+
+    def _dispatch(self, pool: Any, task_config: Optional[Config]) -> None:
+        stats = self.stats["parse"]
+        submitted = 0
+        finished = False
+        while not finished:
+            batch: List[Tuple[Path, Optional[SourceFile]]] = []
+            item = self._get(self._sources, stats)
+            # Take whatever else is already waiting: full batches while the readers are ahead
+            while True:
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+                if len(batch) >= MAX_BATCH_FILES:
+                    break
+                try:
+                    item = self._sources.get_nowait()
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            start = time.perf_counter()
+            while not self._slots.acquire(timeout=_POLL_SECONDS):
+                if self._stop.is_set():
+                    raise _Stopped
+            cache = self.cache
+            if cache is not None and task_config is None:  # Process pool
+                cache = cache.slice(path for path, _ in batch)
+            future = pool.submit(_parse_batch, self.process_fn, batch, self.kwargs, self.combine, task_config, cache)
+            submitted += 1
+            stats.add(items=len(batch), blocked=time.perf_counter() - start, depth=submitted - self._consumed)
+            future.add_done_callback(lambda f, b=batch: self._results.put((b, f)))
+        self._results.put((_DONE, submitted))
+
+    def run(self) -> Iterator[Any]:
+        """Start the stages and yield each parse task's combined result as it completes."""
+        config = self._parse_config()
+        pool = get_pool(config)
+        task_config = None if config.use_multiprocessing else config  # Process workers hold it already
+        self._started = time.perf_counter()
+        threads = [threading.Thread(target=self._stage, args=(self._discover,), name="pipeline-discover", daemon=True)]
+        threads += [threading.Thread(target=self._stage, args=(self._read,), name=f"pipeline-read-{i}", daemon=True) for i in range(self.readers)]
+        threads.append(threading.Thread(target=self._stage, args=(lambda: self._dispatch(pool, task_config),), name="pipeline-parse", daemon=True))
+        for thread in threads:
+            thread.start()
+        stats = self.stats["merge"]
+        try:
+            total = None
+            while total is None or self._consumed < total:
+                try:
+                    batch, future = self._get(self._results, stats)
+                except _Stopped:
+                    break
+                if batch is _DONE:
+                    total = future
+                    continue
+                self._slots.release()
+                partial, summaries, cache_updates = future.result()
+                if self.cache is not None:
+                    self.cache.update(cache_updates)
+                for (path, _), summary in zip(batch, summaries):
+                    if path in self._tracked:
+                        self.file_results[path] = summary
+                self._consumed += 1
+                stats.add(items=len(batch), depth=self._results.qsize())
+                yield partial
+            if self._errors:
+                raise self._errors[0]
+        except (KeyboardInterrupt, GeneratorExit):
+            cancel_pool(config)  # Cancelled scan: drop queued batches and stop process workers
+            raise
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self._resolve_representatives()
+            self._report()
+
+    def _resolve_representatives(self) -> None:
+        """Re-key each clone group on its first file in discovery order, whichever copy the readers got to first."""
+        clones: Dict[Path, List[Path]] = {}
+        file_results: Dict[Path, Tuple] = {}
+        for parsed, copies in self.clones.items():
+            rep, *others = sorted([parsed, *copies], key=self._order.__getitem__)
+            clones[rep] = others
+            if rep != parsed:
+                self.renamed[parsed] = rep
+            if parsed in self.file_results:
+                data, skipped, lines = self.file_results[parsed]
+                if isinstance(skipped, str):
+                    skipped = str(rep) + skipped[len(str(parsed)):]
+                file_results[rep] = (data, skipped, lines)
+        self.clones, self.file_results = clones, file_results
+
+    def _report(self) -> None:
+        for stats in self.stats.values():
+            if self.tracker is not None:
+                self.tracker.record(f"Stage {stats.name}", stats.summary())
+            if self.config.verbose:
+                logging.info(f"Pipeline stage {stats.name}: {stats.summary()}")
+        if limited(self.config) and self.tracker is not None:
+            seconds = time.perf_counter() - self._started
+            self.tracker.record("Background throughput", throughput_summary(self.config, self.stats["read"].items, self.bytes_read, seconds))
@@ -2,9 +2,51 @@
 
 """Shared utilities for processors (e.g., dup estimation)."""
 
-from typing import List
+import logging
+from typing import Dict, List, Optional, Tuple
 
 from .config import Config
+from .file_loader import SourceFile
+from .utils import audit_log_event
+
+_POLICY_SKIP_MARK = " (skipped by policy: "
+
+
+def policy_skip_entry(path: str, reason: str) -> str:
+    """Skipped-list entry for a file left out on purpose (size/line limits, generated code)."""
+    return f"{path}{_POLICY_SKIP_MARK}{reason})"
+
+
+def is_policy_skip(entry: str) -> bool:
+    """True for entries made by policy_skip_entry, as opposed to files that failed to process."""
+    return _POLICY_SKIP_MARK in entry
+
+
+def skip_by_policy(path: str, reason: str, config: Config) -> Tuple[Dict, str, int]:
+    """Audit/log a policy skip and return the processor result that reports it."""
+    audit_log_event(config, "file_skipped", path=path, reason=reason)
+    logging.info(f"Skipping {path}: {reason}")
+    return {}, policy_skip_entry(path, reason), 0
+
+
+def generated_reason(source: SourceFile, config: Config) -> Optional[str]:
+    """'generated' or 'minified' if the file should be skipped as machine-written (cheap byte heuristics)."""
+    if not config.skip_generated:
+        return None
+    if source.looks_generated():
+        return "generated"
+    if source.looks_minified():
+        return "minified"
+    return None
+
+
+def oversize_reason(source: SourceFile, config: Config) -> Optional[str]:
+    """Why the file is too big to load whole (max_file_bytes / max_file_lines), or None."""
+    if config.max_file_bytes is not None and source.size > config.max_file_bytes:
+        return f"larger than {config.max_file_bytes} bytes"
+    if config.max_file_lines is not None and source.line_count() > config.max_file_lines:
+        return f"more than {config.max_file_lines} lines"
+    return None
 
 
 def estimate_dup_lines(items: List, is_text_like: bool, config: Config) -> int:
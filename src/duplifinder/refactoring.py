@@ -5,7 +5,7 @@ def get_refactoring_suggestion(duplicate_type: str, occurrences: int) -> str:
     Generate a refactoring suggestion based on the duplicate type and number of occurrences.
 
     Args:
-        duplicate_type (str): The type of duplicate (e.g., 'function my_func', 'class MyClass', 'text', 'token').
+        duplicate_type (str): The type of duplicate (e.g., 'function my_func', 'class MyClass', 'file pkg/mod.py', 'text', 'token').
         occurrences (int): The number of times the duplicate appears.
 
     Returns:
@@ -21,6 +21,10 @@ def get_refactoring_suggestion(duplicate_type: str, occurrences: int) -> str:
         name = duplicate_type.split(" ", 1)[1] if " " in duplicate_type else "class"
         return f"Consider using inheritance or composition to share '{name}' logic."
 
+    if duplicate_type.startswith("file"):
+        name = duplicate_type.split(" ", 1)[1] if " " in duplicate_type else "file"
+        return f"Keep one copy of '{name}' and import it instead of {occurrences - 1} identical copies."
+
     if duplicate_type == "text":
         return "Move duplicated text to a constant, configuration file, or localization resource."
 
@@ -4,11 +4,13 @@
 
 import logging
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from .background import apply_limits
 from .config import Config
+from .executor import prestart_pool
 from .processors import process_file_ast
-from .utils import discover_py_files, run_parallel, log_file_count
+from .utils import PerformanceTracker, discover_py_files, fold_cancellable, run_parallel, log_file_count
 
 
 def _parse_search_specs(config: Config) -> Dict[str, set]:
@@ -25,23 +27,22 @@ def _parse_search_specs(config: Config) -> Dict[str, set]:
     return spec_map
 
 
-def find_search_matches(config: Config) -> Tuple[Dict[str, List[Tuple[str, str]]], List[str], int]:
-    """Find all occurrences matching search specs; no dup filtering."""
+def _fold_search_results(results: Iterable[Tuple], spec_map: Dict[str, set], config: Config, expected: Optional[int] = None) -> Tuple[Dict[str, List[Tuple[str, str]]], List[str], int]:
+    """Fold process_file_ast results into (matches per spec, skipped, scanned).
+
+    On KeyboardInterrupt, raises ScanCancelled with what was folded so far (expected is the file count).
+    """
     all_matches: Dict[str, List[Tuple[str, str]]] = defaultdict(list)  # spec -> list of (loc, snippet)
     skipped: List[str] = []
     scanned = 0
 
-    spec_map = _parse_search_specs(config)
-
-    py_files = discover_py_files(config)
-    log_file_count(py_files, config, "search")
-
-    for result in run_parallel(py_files, process_file_ast, config=config):
+    def fold(result: Tuple) -> None:
+        nonlocal scanned
         defs, skipped_file, _ = result  # Ignore lines for search
         if isinstance(skipped_file, str):
             skipped.append(skipped_file)
             logging.debug(f"Skipped file: {skipped_file}")
-        else:
+        elif defs is not None:  # None: not source content (rejected by the header sniff)
             scanned += 1
             for t, name_locs in defs.items():
                 if t in spec_map:
@@ -50,7 +51,21 @@ def find_search_matches(config: Config) -> Tuple[Dict[str, List[Tuple[str, str]]
                             spec_key = f"{t} {name}"
                             all_matches[spec_key].extend(items)  # All locs/snippets
 
+    fold_cancellable(results, fold, lambda: (all_matches, skipped, scanned), expected)
+
     if config.verbose:
         logging.info(f"Searched {scanned} files, skipped {len(skipped)}, found {sum(len(occ) for occ in all_matches.values())} occurrences")
 
-    return all_matches, skipped, scanned
\ No newline at end of file
+    return all_matches, skipped, scanned
+
+
+def find_search_matches(config: Config, tracker: Optional[PerformanceTracker] = None) -> Tuple[Dict[str, List[Tuple[str, str]]], List[str], int]:
+    """Find all occurrences matching search specs; no dup filtering."""
+    spec_map = _parse_search_specs(config)
+
+    apply_limits(config)
+    prestart_pool(config)  # Workers spawn while discovery runs
+    py_files = discover_py_files(config)
+    log_file_count(py_files, config, "search")
+
+    return _fold_search_results(run_parallel(py_files, process_file_ast, config=config, tracker=tracker), spec_map, config, len(py_files))
@@ -5,22 +5,28 @@
 import json
 import logging
 import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.syntax import Syntax
 
 from .config import Config
+from .exceptions import ScanCancelled
 
 
 def render_search(
     search_results: Dict[str, List[Tuple[str, str]]],
-    config: Config
+    config: Config,
+    cancelled: Optional[ScanCancelled] = None,
 ) -> None:
-    """Render search results to console."""
+    """Render search results to console; with cancelled, says they cover only the files searched before the scan stopped."""
     console = Console()
 
+    if cancelled is not None:
+        left = "an unknown number of" if cancelled.not_processed is None else str(cancelled.not_processed)
+        console.print(f"[bold red]INCOMPLETE: search cancelled; {left} files not processed.[/bold red]")
+
     for spec, occ in search_results.items():
         count = len(occ)
         if count == 0:
@@ -57,15 +63,19 @@ def render_search_json(
     search_results: Dict[str, List[Tuple[str, str]]],
     config: Config,
     scanned: int,
-    skipped: List[str]
+    skipped: List[str],
+    cancelled: Optional[ScanCancelled] = None,
 ) -> None:
     """Render search results as JSON."""
     out = {
         "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "root": str(config.root),
+        "roots": [str(r) for r in config.scan_roots],
         "scanned_files": scanned,
         "skipped_files": skipped if config.verbose else len(skipped),
         "search_specs": config.search_specs,
+        "incomplete": cancelled is not None,
+        "files_not_processed": cancelled.not_processed if cancelled is not None else 0,
         "search_results": {
             spec: {
                 "count": len(occ),
@@ -0,0 +1,90 @@
+# src/duplifinder/shard.py
+
+"""Sharded scans: each runner writes a partial index for its shard; merge combines them for rendering."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .config import Config
+from .exceptions import DuplifinderError
+from .index import DefinitionIndex
+
+# Bump when the partial file layout changes
+PARTIAL_VERSION = 1
+
+
+def partial_path(config: Config) -> Path:
+    """Where a sharded run writes its partial index."""
+    if config.shard_output is not None:
+        return config.shard_output
+    index, count = config.shard
+    return Path(f".duplifinder_shard_{index}_of_{count}.json")
+
+
+def write_partial(
+    path: Path, config: Config, definitions: Dict[str, Dict[str, List[Tuple[str, str]]]], skipped: List[str], scanned: int, total_lines: int, dup_lines: int
+) -> None:
+    """Write one shard's find_definitions results, atomically (a crashed runner leaves no half-written file)."""
+    payload = {
+        "version": PARTIAL_VERSION,
+        "shard": list(config.shard),
+        "roots": [str(r) for r in config.scan_roots],
+        "types": sorted(config.types_to_search),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "scanned": scanned,
+        "total_lines": total_lines,
+        "dup_lines": dup_lines,
+        "skipped": skipped,
+        "definitions": {t: {name: [list(item) for item in items] for name, items in name_locs.items()} for t, name_locs in definitions.items()},
+    }
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def read_partial(path: Path) -> Dict[str, Any]:
+    """Load and check a partial index file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise DuplifinderError(f"Cannot read partial index '{path}': {e}")
+    if not isinstance(data, dict) or data.get("version") != PARTIAL_VERSION:
+        raise DuplifinderError(f"'{path}' is not a version {PARTIAL_VERSION} partial index")
+    return data
+
+
+def merge_partials(paths: Sequence[Path]) -> Tuple[Dict[str, Any], DefinitionIndex]:
+    """Combine the partial indexes of every shard of one scan.
+
+    All files must come from the same split (same N, roots and types) and together cover
+    shards 1..N exactly once. Sharded runs do not group identical files (copies can land in
+    different shards), so the merged index is the one an unsharded run with
+    dedupe_files=False (--no-dedupe-files) would build.
+    Returns the scan's metadata (roots, types, shards) and the merged index.
+    """
+    partials = []
+    for path in paths:
+        data = read_partial(Path(path))
+        partials.append((data["shard"][0], path, data))
+    partials.sort(key=lambda p: p[0])  # Shard order, not command-line order
+    _, first_path, first = partials[0]
+    count, roots, types = first["shard"][1], first["roots"], first["types"]
+    index = DefinitionIndex(types)
+    seen: Dict[int, Path] = {}
+    for k, path, data in partials:
+        if data["shard"][1] != count or data["roots"] != roots or data["types"] != types:
+            raise DuplifinderError(f"'{path}' (shard {k}/{data['shard'][1]}) is not from the same sharded scan as '{first_path}'")
+        if k in seen:
+            raise DuplifinderError(f"Shard {k}/{count} given twice: '{seen[k]}' and '{path}'")
+        seen[k] = path
+        definitions = {t: {name: [tuple(item) for item in items] for name, items in name_locs.items()} for t, name_locs in data["definitions"].items()}
+        index.merge(DefinitionIndex.from_results(definitions, data["skipped"], data["scanned"], data["total_lines"], data["dup_lines"]))
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    if missing:
+        raise DuplifinderError(f"Missing shard(s) {', '.join(map(str, missing))} of {count}")
+    return {"roots": roots, "types": types, "shards": count}, index
@@ -5,37 +5,52 @@
 import logging
 import re
 from collections import defaultdict
-from typing import Dict, List ,Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from .background import apply_limits
 from .config import Config
+from .executor import prestart_pool
 from .processors import process_file_text, estimate_dup_lines
-from .utils import discover_py_files, run_parallel, log_file_count
+from .utils import PerformanceTracker, discover_py_files, fold_cancellable, run_parallel, log_file_count
 
 
-def find_text_matches(config: Config, patterns: List[re.Pattern]) -> Tuple[Dict[str, List[str]], List[str], int, int, int]:
-    """Find text matches across the project, optionally in parallel; return total_lines, dup_lines."""
+def _fold_text_results(results: Iterable[Tuple], config: Config, expected: Optional[int] = None) -> Tuple[Dict[str, List[str]], List[str], int, int, int]:
+    """Fold process_file_text results into (matches, skipped, scanned, total_lines, dup_lines).
+
+    On KeyboardInterrupt, raises ScanCancelled with what was folded so far (expected is the file count).
+    """
     all_matches: Dict[str, List[str]] = defaultdict(list)
     skipped: List[str] = []
     scanned = 0
     total_lines = 0
     dup_lines = 0
 
-    py_files = discover_py_files(config)
-    log_file_count(py_files, config)
-
-    for result in run_parallel(py_files, process_file_text, patterns, config=config):
+    def fold(result: Tuple) -> None:
+        nonlocal scanned, total_lines, dup_lines
         matches, skipped_file, file_lines = result
         if isinstance(skipped_file, str):
             skipped.append(skipped_file)
             logging.debug(f"Skipped file: {skipped_file}")
-        else:
+        elif matches is not None:  # None: not source content (rejected by the header sniff)
             scanned += 1
             total_lines += file_lines
             for matched, locs in matches.items():
                 all_matches[matched].extend(locs)
                 dup_lines += estimate_dup_lines(locs, True, config)
 
+    fold_cancellable(results, fold, lambda: (all_matches, skipped, scanned, total_lines, dup_lines), expected)
+
     if config.verbose:
         logging.info(f"Scanned {scanned} files, skipped {len(skipped)}, total lines: {total_lines}, estimated dup lines: {dup_lines}")
 
-    return all_matches, skipped, scanned, total_lines, dup_lines
\ No newline at end of file
+    return all_matches, skipped, scanned, total_lines, dup_lines
+
+
+def find_text_matches(config: Config, patterns: List[re.Pattern], tracker: Optional[PerformanceTracker] = None) -> Tuple[Dict[str, List[str]], List[str], int, int, int]:
+    """Find text matches across the project, optionally in parallel; return total_lines, dup_lines."""
+    apply_limits(config)
+    prestart_pool(config)  # Workers spawn while discovery runs
+    py_files = discover_py_files(config)
+    log_file_count(py_files, config)
+
+    return _fold_text_results(run_parallel(py_files, process_file_text, patterns, config=config, tracker=tracker), config, len(py_files))
@@ -2,7 +2,6 @@
 
 """Text file processor for regex pattern matching."""
 
-import fnmatch
 import logging
 import re
 from collections import defaultdict
@@ -11,33 +10,41 @@ from typing import List, Dict, Tuple
 
 from .config import Config
 from .utils import audit_log_event
+from .file_loader import SourceFile
+from .processor_utils import generated_reason, oversize_reason, skip_by_policy
 
 
-def process_file_text(py_file: Path, patterns: List[re.Pattern], config: Config) -> Tuple[Dict[str, List[str]], str | None, int]:
-    """Process a single Python file for text patterns; return total_lines."""
+def process_file_text(py_file: Path, patterns: List[re.Pattern], config: Config) -> Tuple[Dict[str, List[str]] | None, str | None, int]:
+    """Process a single file for text patterns; return total_lines ((None, None, 0) for non-Python .py content)."""
     str_py_file = str(py_file)
-    if any(fnmatch.fnmatch(py_file.name, pat) for pat in config.exclude_patterns):
-        if config.verbose:
-            logging.info(f"Skipping {str_py_file}: matches exclude pattern")
-        audit_log_event(config, "file_skipped", path=str_py_file, reason="exclude_pattern_match")
-        return {}, str_py_file, 0
-
     total_lines = 0
     try:
         # Audit: Log open attempt
         audit_log_event(config, "file_opened", path=str_py_file, action="text_open")
-        # Encoding-aware open
-        with open(py_file, "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-        bytes_read = sum(len(line) for line in lines)
-        total_lines = len(lines)
-        audit_log_event(config, "file_parsed", path=str_py_file, action="text_success", bytes_read=bytes_read, lines=total_lines)
-        
-        matches: Dict[str, List[str]] = defaultdict(list)
-        for lineno, line in enumerate(lines, 1):
-            for pat in patterns:
-                if pat.search(line):
-                    matches[pat.pattern].append(f"{str_py_file}:{lineno}")
+        # Encoding-aware single read
+        with SourceFile.load(py_file, max_bytes=config.max_file_bytes) as source:
+            if py_file.suffix == ".py" and not source.looks_like_python():
+                audit_log_event(config, "file_skipped", path=str_py_file, reason="No Python markers")
+                logging.info(f"Skipping non-Py content '{str_py_file}': No Python markers")
+                return None, None, 0
+            skip_reason = generated_reason(source, config)
+            oversize = oversize_reason(source, config) if skip_reason is None else None
+            if oversize and config.large_file_mode == "skip":
+                skip_reason = oversize
+            if skip_reason:
+                return skip_by_policy(str_py_file, skip_reason, config)
+
+            # Oversized files are matched line by line straight from the buffer
+            lines = source.iter_lines() if oversize else source.lines(errors="replace")
+            matches: Dict[str, List[str]] = defaultdict(list)
+            bytes_read = 0
+            for lineno, line in enumerate(lines, 1):
+                total_lines = lineno
+                bytes_read += len(line)
+                for pat in patterns:
+                    if pat.search(line):
+                        matches[pat.pattern].append(f"{str_py_file}:{lineno}")
+        audit_log_event(config, "file_parsed", path=str_py_file, action="text_stream" if oversize else "text_success", bytes_read=bytes_read, lines=total_lines)
         return matches, None, total_lines
     except UnicodeDecodeError as e:
         reason = f"encoding_error: {e}"
@@ -2,39 +2,70 @@
 
 """Token-based duplicate finder using similarity ratios."""
 
+import itertools
 import logging
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from .background import apply_limits
 from .config import Config
+from .distributed import Coordinator
+from .executor import prestart_pool
 from .processors import process_file_tokens
-from .utils import discover_py_files, run_parallel, log_file_count
+from .utils import PerformanceTracker, discover_py_files, fold_cancellable, run_parallel, log_file_count
 
 
-def find_token_duplicates(config: Config) -> Tuple[Dict[str, List[Tuple[str, str, float]]], List[str], int, int, int]:
-    """Find token-based duplicates across the project, optionally in parallel; return total_lines, dup_lines."""
+def _fold_token_results(results: Iterable[Tuple], config: Config, expected: Optional[int] = None) -> Tuple[Dict[str, List[Tuple[str, str, float]]], List[str], int, int, int]:
+    """Fold process_file_tokens results into (similarities, skipped, scanned, total_lines, dup_lines).
+
+    On KeyboardInterrupt, raises ScanCancelled with what was folded so far (expected is the file count).
+    """
     all_similarities: Dict[str, List[Tuple[str, str, float]]] = defaultdict(list)
     skipped: List[str] = []
     scanned = 0
     total_lines = 0
     dup_lines = 0  # Heuristic: refine with actual spans in future
 
-    py_files = discover_py_files(config)
-    log_file_count(py_files, config)
-
-    for result in run_parallel(py_files, process_file_tokens, config=config):
+    def fold(result: Tuple) -> None:
+        nonlocal scanned, total_lines, dup_lines
         similarities, skipped_file, file_lines = result
         if isinstance(skipped_file, str):
             skipped.append(skipped_file)
             logging.debug(f"Skipped file: {skipped_file}")
-        else:
+        elif similarities is not None:  # None: not source content (rejected by the header sniff)
             scanned += 1
             total_lines += file_lines
             for key, pairs in similarities.items():
                 all_similarities[key].extend(pairs)
                 dup_lines += len(pairs) * 20  # Avg block heuristic
 
+    fold_cancellable(results, fold, lambda: (all_similarities, skipped, scanned, total_lines, dup_lines), expected)
+
     if config.verbose:
         logging.info(f"Scanned {scanned} files, skipped {len(skipped)}, total lines: {total_lines}, estimated dup lines: {dup_lines}")
 
-    return all_similarities, skipped, scanned, total_lines, dup_lines
\ No newline at end of file
+    return all_similarities, skipped, scanned, total_lines, dup_lines
+
+
+def _find_token_duplicates_coordinated(config: Config, tracker: Optional[PerformanceTracker]) -> Tuple[Dict[str, List[Tuple[str, str, float]]], List[str], int, int, int]:
+    """find_token_duplicates with the tokenizing done by `duplifinder work` processes."""
+    coordinator = Coordinator(config, "tokens", tracker=tracker)
+    try:
+        py_files = discover_py_files(config)
+        log_file_count(py_files, config)
+        return _fold_token_results(itertools.chain.from_iterable(coordinator.run(py_files)), config, len(py_files))
+    finally:
+        coordinator.close()
+
+
+def find_token_duplicates(config: Config, tracker: Optional[PerformanceTracker] = None) -> Tuple[Dict[str, List[Tuple[str, str, float]]], List[str], int, int, int]:
+    """Find token-based duplicates across the project, optionally in parallel; return total_lines, dup_lines."""
+    apply_limits(config)
+    if config.coordinator_address:
+        return _find_token_duplicates_coordinated(config, tracker)
+
+    prestart_pool(config)  # Workers spawn while discovery runs
+    py_files = discover_py_files(config)
+    log_file_count(py_files, config)
+
+    return _fold_token_results(run_parallel(py_files, process_file_tokens, config=config, tracker=tracker), config, len(py_files))
@@ -3,7 +3,6 @@
 """Token file processor for similarity detection."""
 
 import difflib
-import fnmatch
 import io
 import logging
 import tokenize
@@ -15,6 +14,8 @@ import ast
 
 from .config import Config
 from .utils import audit_log_event
+from .file_loader import SourceFile
+from .processor_utils import generated_reason, oversize_reason, skip_by_policy
 
 
 def tokenize_block(text: str) -> List[str]:
@@ -29,22 +30,24 @@ def tokenize_block(text: str) -> List[str]:
     return tokens
 
 
-def process_file_tokens(py_file: Path, config: Config) -> Tuple[Dict[str, List[Tuple[str, str, float]]], str | None, int]:
-    """Process a single Python file for token-based duplicates; return total_lines."""
+def process_file_tokens(py_file: Path, config: Config) -> Tuple[Dict[str, List[Tuple[str, str, float]]] | None, str | None, int]:
+    """Process a single file for token-based duplicates; return total_lines ((None, None, 0) for non-Python .py content)."""
     str_py_file = str(py_file)
-    if any(fnmatch.fnmatch(py_file.name, pat) for pat in config.exclude_patterns):
-        if config.verbose:
-            logging.info(f"Skipping {str_py_file}: matches exclude pattern")
-        audit_log_event(config, "file_skipped", path=str_py_file, reason="exclude_pattern_match")
-        return {}, str_py_file, 0
-
     total_lines = 0
     try:
         # Audit: Log open attempt
         audit_log_event(config, "file_opened", path=str_py_file, action="token_open")
-        # Encoding-aware open
-        with open(py_file, "r", encoding="utf-8", errors="replace") as f:
-            text = f.read()
+        # Encoding-aware single read
+        with SourceFile.load(py_file, max_bytes=config.max_file_bytes) as source:
+            if py_file.suffix == ".py" and not source.looks_like_python():
+                audit_log_event(config, "file_skipped", path=str_py_file, reason="No Python markers")
+                logging.info(f"Skipping non-Py content '{str_py_file}': No Python markers")
+                return None, None, 0
+            # Block similarity needs whole definitions, so there is no streaming variant: oversized files are skipped
+            skip_reason = generated_reason(source, config) or oversize_reason(source, config)
+            if skip_reason:
+                return skip_by_policy(str_py_file, skip_reason, config)
+            text = source.text(errors="replace")
         bytes_read = len(text)
         total_lines = len(text.splitlines())
         audit_log_event(config, "file_parsed", path=str_py_file, action="token_success", bytes_read=bytes_read, lines=total_lines)
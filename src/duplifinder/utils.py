@@ -3,25 +3,39 @@
 """Shared utilities for file discovery and parallel execution."""
 
 import concurrent.futures
+import concurrent.futures.process
 import contextlib
-import fnmatch
+import itertools
 import json
 import logging
 import os
 import mimetypes
+import stat
 import threading
 import time
 import tracemalloc
+import zlib
+from collections import deque
 from pathlib import Path
-from typing import Callable, Generator, List, Any, Dict, Optional
+from typing import Callable, Deque, Generator, Iterable, Iterator, List, Any, Dict, Optional, Tuple, Union
 
 from tqdm import tqdm
 
 from .config import Config  # <-- Make sure this import is here
+from .exceptions import ScanCancelled
+from .audit import emit
+from .background import limited, throughput_summary
+from .cache import CacheManager, CacheSlice, CostHistory, DiscoveryCache
+from .executor import (
+    MemoryBudget, cancel_pool, choose_strategy, configured_strategy, discard_pool, free_threaded, get_pool, replace_pool, resolve_workers, with_strategy,
+    worker_config,
+)
+from .path_filter import EXCLUDE_PATTERN, PathFilter
+from .vcs import git_ls_files
 
 
 def audit_log_event(config: Config, event_type: str, **kwargs) -> None:
-    """Emit structured audit event to JSONL if enabled; thread/process-safe append."""
+    """Emit structured audit event to JSONL if enabled; queued for the batching writer (see audit)."""
     if not config.audit_enabled:
         return
     event = {
@@ -33,16 +47,14 @@ def audit_log_event(config: Config, event_type: str, **kwargs) -> None:
         **kwargs,
     }
     try:
-        with open(config.audit_log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(event) + "\n")
-            f.flush()  # Ensure visibility in parallel
+        emit(config.audit_log_path, config.audit_flush_interval, json.dumps(event) + "\n")
     except Exception as e:
         logging.warning(f"Audit log write failed: {e}")
 
 
 # FIXED: Added config: Config argument
 def _parse_gitignore(gitignore_path: Path, config: Config) -> List[str]:
-    """Simple stdlib parser for .gitignore: lines as fnmatch patterns (basic support for ! negation)."""
+    """Simple stdlib parser for .gitignore: raw pattern lines, compiled later by PathFilter."""
     patterns = []
     negate = False
     try:
@@ -68,73 +80,493 @@ def _parse_gitignore(gitignore_path: Path, config: Config) -> List[str]:
         return []
 
 
-# FIXED: Added config: Config argument
-def _matches_gitignore(path: Path, patterns: List[str], config: Config) -> bool:
-    """Check if path matches any .gitignore pattern (with negation support)."""
-    rel_path = path.relative_to(config.root).as_posix()
-    for pattern in patterns:
-        if pattern.startswith("!"):  # Negation: skip if matches
-            if fnmatch.fnmatch(rel_path, pattern[1:]):
-                return False  # Explicit include overrides
-        elif fnmatch.fnmatch(rel_path, pattern):
-            return True  # Exclude match
-    return False
+def _scan_dir(directory: str) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+    """List one directory with a single os.scandir call; return (subdirs, files) sorted by name."""
+    dirs: List[os.DirEntry] = []
+    files: List[os.DirEntry] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                # Symlinked dirs are not followed (avoids cycles); symlinked files are kept
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry)
+                elif entry.is_file():
+                    files.append(entry)
+            except OSError:
+                continue
+    dirs.sort(key=lambda e: e.name)
+    files.sort(key=lambda e: e.name)
+    return dirs, files
 
 
-def discover_py_files(config: Config) -> List[Path]:
-    """Discover files to scan, excluding ignored dirs and .gitignore patterns."""
-    gitignore_patterns: List[str] = []
-    gitignore_path = config.root / ".gitignore"
-    if config.respect_gitignore and gitignore_path.exists():
-        # FIXED: Pass config
-        gitignore_patterns = _parse_gitignore(gitignore_path, config)
-
-    # Build glob patterns from config extensions
-    glob_patterns = [f"*.{ext}" for ext in config.extensions]
-
-    candidates = []
-    for pattern in glob_patterns:
-        candidates.extend(
-            p for p in config.root.rglob(pattern)
-            if not any(part in config.ignore_dirs for part in p.parts)
-            # FIXED: Pass config
-            and not _matches_gitignore(p, gitignore_patterns, config)
+class _PathEntry:
+    """Minimal os.DirEntry stand-in for paths not produced by scandir (git index, cached listings)."""
+
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, path: str, stat_result: Optional[os.stat_result] = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._stat = stat_result
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+def _dir_mtime_ns(entry: Any) -> Optional[int]:
+    """Directory mtime from its (Dir)Entry, or None if it cannot be read."""
+    try:
+        return entry.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _list_dir(directory: str, mtime_ns: Optional[int], discovery_cache: Optional[DiscoveryCache]) -> Tuple[List[Any], List[Any]]:
+    """List a directory, reusing the cached listing when its mtime is unchanged."""
+    if discovery_cache is None or mtime_ns is None:
+        return _scan_dir(directory)
+    cached = discovery_cache.get_listing(directory, mtime_ns)
+    if cached is not None:
+        dir_names, file_names = cached
+        return (
+            [_PathEntry(os.path.join(directory, name)) for name in dir_names],
+            [_PathEntry(os.path.join(directory, name)) for name in file_names],
         )
+    dirs, files = _scan_dir(directory)
+    discovery_cache.set_listing(directory, mtime_ns, [e.name for e in dirs], [e.name for e in files])
+    return dirs, files
+
+
+# discovery_workers > 1: directory listings fetched ahead of the walk, per worker
+DISCOVERY_LOOKAHEAD_PER_WORKER = 4
+
+
+def _walk_files(config: Config, path_filter: PathFilter, discovery_cache: Optional[DiscoveryCache] = None) -> Iterator[Any]:
+    """Single-pass walk of config.root, pruning excluded dirs before descending; yield matching file entries.
+
+    Nested .gitignore files are compiled into path_filter as the walk reaches their directory.
+    With a discovery cache, directories whose mtime is unchanged are not re-listed.
+    With discovery_workers > 1, a thread pool lists (and stats) the next directories the
+    walk will enter, at most DISCOVERY_LOOKAHEAD_PER_WORKER per worker at a time, so remote
+    filesystems pay round-trip latency concurrently while memory stays flat however many
+    directories there are; this thread still applies every filter in walk order, so the
+    output is identical to the sequential walk.
+    """
+    extensions = set(config.extensions)
+    workers = config.discovery_workers
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="discovery") if workers > 1 else None
+    lookahead = workers * DISCOVERY_LOOKAHEAD_PER_WORKER
+    prefetched = 0
+
+    def list_dir(directory: str, mtime_ns: Optional[int]) -> Tuple[List[Any], List[Any], Optional[List[str]]]:
+        dirs, files = _list_dir(directory, mtime_ns, discovery_cache)
+        gitignore = None
+        if config.respect_gitignore:
+            for entry in files:
+                if entry.name == ".gitignore":
+                    gitignore = _parse_gitignore(Path(entry.path), config)
+                    break
+        if executor is not None:
+            # Warm the entries' cached stat results on this pool thread
+            for entry in files:
+                if entry.name.rpartition(".")[2] in extensions:
+                    with contextlib.suppress(OSError):
+                        entry.stat()
+            if discovery_cache is not None:
+                for entry in dirs:
+                    _dir_mtime_ns(entry)
+        return dirs, files, gitignore
+
+    def prefetch() -> None:
+        """Submit listings for the directories on top of the stack (walked next) until the lookahead is full."""
+        nonlocal prefetched
+        for item in reversed(stack):
+            if prefetched >= lookahead:
+                break
+            if item[3] is None:
+                item[3] = executor.submit(list_dir, item[0], item[2])
+                prefetched += 1
+
+    root_mtime = _dir_mtime_ns(_PathEntry(str(config.root))) if discovery_cache else None
+    # [directory, rel_dir, mtime_ns, future of its listing (once prefetched)]
+    stack: List[List[Any]] = [[str(config.root), "", root_mtime, None]]
+    try:
+        while stack:
+            if executor is not None:
+                prefetch()
+            directory, rel_dir, mtime_ns, future = stack.pop()
+            if future is not None:
+                prefetched -= 1
+            try:
+                dirs, files, gitignore = future.result() if future is not None else list_dir(directory, mtime_ns)
+            except OSError as e:
+                logging.warning(f"Cannot list directory '{directory}': {e}")
+                continue
+            if gitignore is not None:
+                path_filter.add_gitignore(rel_dir, gitignore)
+            for entry in files:
+                _, dot, ext = entry.name.rpartition(".")
+                if not dot or ext not in extensions:
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                reason = path_filter.exclusion_reason(rel_path)
+                if reason == EXCLUDE_PATTERN:
+                    if config.verbose:
+                        logging.info(f"Skipping {entry.path}: matches exclude pattern")
+                    audit_log_event(config, "file_skipped", path=entry.path, reason=reason)
+                if reason:
+                    continue
+                yield entry
+            subdirs = []
+            for entry in dirs:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if path_filter.exclusion_reason(rel_path, is_dir=True):
+                    continue
+                subdirs.append([entry.path, rel_path, _dir_mtime_ns(entry) if discovery_cache else None, None])
+            # Reverse so the stack pops subdirectories in name order
+            stack.extend(reversed(subdirs))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    py_files = []
-    for p in candidates:
-        # Audit: Log discovery attempt
+
+def _stat_or_none(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None  # Deleted in the work tree but still in the index
+
+
+def _git_index_files(config: Config, path_filter: PathFilter) -> Optional[List[_PathEntry]]:
+    """Candidate files from the git index (git applies .gitignore); None if git cannot be used."""
+    rel_paths = git_ls_files(config.root)
+    if rel_paths is None:
+        return None
+    extensions = set(config.extensions)
+    root = str(config.root)
+    paths = []
+    for rel_path in rel_paths:
+        _, dot, ext = rel_path.rpartition(".")
+        if not dot or ext not in extensions or "/" in ext:
+            continue
+        reason = path_filter.path_exclusion_reason(rel_path)
+        if reason:
+            if reason == EXCLUDE_PATTERN:
+                if config.verbose:
+                    logging.info(f"Skipping {rel_path}: matches exclude pattern")
+                audit_log_event(config, "file_skipped", path=os.path.join(root, rel_path), reason=reason)
+            continue
+        paths.append(os.path.join(root, rel_path))
+    if config.discovery_workers > 1 and len(paths) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.discovery_workers, thread_name_prefix="discovery") as executor:
+            stats = list(executor.map(_stat_or_none, paths))
+    else:
+        stats = [_stat_or_none(path) for path in paths]
+    return [_PathEntry(path, st) for path, st in zip(paths, stats) if st is not None and stat.S_ISREG(st.st_mode)]
+
+
+def _iter_root(config: Config, discovery_cache: Optional[DiscoveryCache]) -> Tuple[Iterator[Path], str]:
+    """Stream accepted files under config.root; return them with the source used ("git_index" or "walk")."""
+    path_filter = PathFilter.from_config(config)
+    entries: Optional[Iterable[Any]] = None
+    if config.respect_gitignore and config.use_git_index:
+        entries = _git_index_files(config, path_filter)
+    source = "git_index" if entries is not None else "walk"
+    if entries is None:
+        entries = _walk_files(config, path_filter, discovery_cache)
+    return _accept_entries(config, entries), source
+
+
+def shard_of(rel_path: str, count: int) -> int:
+    """1-based shard (of count) owning a file, from its POSIX path relative to the scan root.
+
+    CRC-32 rather than hash(): the assignment must agree across runners and interpreter runs.
+    """
+    return zlib.crc32(rel_path.encode("utf-8", "surrogateescape")) % count + 1
+
+
+def _shard_filter(config: Config) -> Optional[Callable[[str], bool]]:
+    """Predicate keeping the discovered paths in config.shard; None when the run is not sharded."""
+    if config.shard is None:
+        return None
+    index, count = config.shard
+    root = str(config.root)
+    prefix = root if root.endswith(os.sep) else root + os.sep
+
+    def keep(path: str) -> bool:
+        # Discovery joins paths onto the root, so slicing the prefix off is enough
+        rel_path = path[len(prefix):] if path.startswith(prefix) else os.path.relpath(path, root)
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        return shard_of(rel_path, count) == index
+
+    return keep
+
+
+def _accept_entries(config: Config, entries: Iterable[Any]) -> Iterator[Path]:
+    in_shard = _shard_filter(config)
+    for entry in entries:
+        if in_shard is not None and not in_shard(entry.path):
+            continue  # Another runner's file: not even stat'ed or audited here
+        p = Path(entry.path)
+        # Audit: Log discovery attempt (DirEntry caches its stat result)
         try:
-            stat = p.stat()
-            audit_log_event(config, "file_discovered", path=str(p), size=stat.st_size)
+            file_stat = entry.stat()
+            audit_log_event(config, "file_discovered", path=str(p), size=file_stat.st_size)
         except Exception:
             audit_log_event(config, "file_discovered", path=str(p), size=0, error="stat_failed")
+            continue  # Vanished or unreadable; nothing for a worker to open
 
-        # Only check Python files for Python markers
+        # MIME check only; the content sniff runs on the worker's single read (see file_loader)
         if p.suffix == ".py":
-            # Check MIME/content for non-Py masqueraders
             mime, _ = mimetypes.guess_type(str(p))
             if mime and mime != "text/x-python":
                 audit_log_event(config, "file_skipped", path=str(p), reason=f"MIME {mime}")
                 logging.info(f"Skipping non-Py file '{p}': MIME {mime}")
                 continue
 
-            # Quick content check (first 1024 bytes)
-            try:
-                with open(p, "rb") as f:
-                    header = f.read(1024)
-                    if not (header.startswith(b"#!") or b"def " in header or b"class " in header):
-                        audit_log_event(config, "file_skipped", path=str(p), reason="No Python markers")
-                        logging.info(f"Skipping non-Py content '{p}': No Python markers")
-                        continue
-            except Exception:
-                audit_log_event(config, "file_skipped", path=str(p), reason="header_read_failed")
-                continue
-
-        py_files.append(p)
         audit_log_event(config, "file_accepted", path=str(p))
+        yield p
+
+
+def _discover_root(config: Config, discovery_cache: Optional[DiscoveryCache]) -> Tuple[List[Path], str]:
+    """Discover files under config.root; return them with the source used ("git_index" or "walk")."""
+    files, source = _iter_root(config, discovery_cache)
+    return list(files), source
+
+
+def _root_configs(config: Config) -> List[Config]:
+    # Each root gets its own view of the config so relative paths and .gitignore rules anchor to it
+    roots = config.scan_roots
+    return [config if len(roots) == 1 else config.model_copy(update={"root": r, "roots": []}) for r in roots]
+
+
+def _discovered(config: Config, concurrent_roots: bool) -> Iterator[Path]:
+    """Yield the files of every root, in root order, without duplicates from overlapping roots.
+
+    With concurrent_roots, several roots are listed at once (threads) before the first file
+    is yielded; otherwise roots are walked one after another and files stream as found.
+    The discovery cache is saved and the discovery logged once the last file is yielded.
+    """
+    discovery_cache = DiscoveryCache(config.discovery_cache_path) if config.enable_cache else None
+    start = time.perf_counter()
+    roots = config.scan_roots
+    root_configs = _root_configs(config)
+    if concurrent_roots and len(root_configs) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(root_configs), os.cpu_count() or 1)) as executor:
+            per_root: Iterable[Tuple[Iterable[Path], str]] = list(executor.map(lambda c: _discover_root(c, discovery_cache), root_configs))
+    else:
+        per_root = (_iter_root(c, discovery_cache) for c in root_configs)
+
+    seen = set()
+    sources = set()
+    for files, source in per_root:
+        sources.add(source)
+        for p in files:
+            key = os.path.abspath(p)
+            if key not in seen:
+                seen.add(key)
+                yield p
+
+    if discovery_cache is not None:
+        discovery_cache.save()
+        if config.verbose:
+            logging.info(f"Discovery cache: {discovery_cache.hits} directory listings reused, {discovery_cache.misses} re-listed")
+
+    elapsed = time.perf_counter() - start
+    source = ",".join(sorted(sources))
+    if config.verbose:
+        roots_note = f" across {len(roots)} roots" if len(roots) > 1 else ""
+        logging.info(f"Discovered {len(seen)} files via {source}{roots_note} in {elapsed:.3f}s")
+    audit_log_event(config, "discovery_source", source=source, file_count=len(seen), duration_ms=elapsed * 1000)
+
+
+def iter_py_files(config: Config) -> Iterator[Path]:
+    """Stream the files discover_py_files would return, as the walk finds them.
 
-    return py_files
+    Roots are walked one after another, in order, without duplicates from overlapping roots.
+    """
+    return _discovered(config, concurrent_roots=False)
+
+
+def discover_py_files(config: Config) -> List[Path]:
+    """Discover files to scan; every exclusion (ignore_dirs, .gitignore, exclude_patterns) is decided here.
+
+    Uses the git index when a root is in a git work tree (and .gitignore is respected),
+    falling back to the scandir walker otherwise. Multiple roots are discovered
+    concurrently and merged in root order, without duplicates from overlapping roots.
+    """
+    return list(_discovered(config, concurrent_roots=True))
+
+
+# Adaptive chunking for process pools: aim for a few chunks per worker (load balance) while
+# capping files and bytes per chunk (memory per task, responsiveness of progress reporting)
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_FILES = 64
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+# Default submission window: enough queued work to keep every worker busy, without queuing the whole repo
+IN_FLIGHT_PER_WORKER = 2
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0  # The worker will report it
+
+
+def schedule_longest_first(py_files: List[Path], sizes: Dict[str, int], history: Optional[CostHistory] = None) -> List[Path]:
+    """Order files by expected cost, largest first, so big files do not start last and leave a lone straggler.
+
+    Expected cost is the recorded time from previous runs, else the file size scaled by
+    the throughput seen in the history. Ties keep discovery order.
+    """
+    if history is None:
+        return sorted(py_files, key=lambda p: sizes.get(str(p), 0), reverse=True)
+    rate = history.seconds_per_byte(sizes)
+    return sorted(py_files, key=lambda p: history.expected(str(p), sizes.get(str(p), 0), rate), reverse=True)
+
+
+def make_chunks(py_files: List[Path], workers: int, chunk_size: Optional[int] = None, sizes: Optional[Dict[str, int]] = None) -> List[List[Path]]:
+    """Split files into task batches bounded by file count and bytes.
+
+    Adaptive by default (about CHUNKS_PER_WORKER chunks per worker, balanced by bytes);
+    an explicit chunk_size fixes the file count and keeps only the MAX_CHUNK_BYTES cap.
+    Files at or over the byte budget get a chunk of their own.
+    """
+    if not py_files:
+        return []
+    file_sizes = [sizes[str(p)] if sizes is not None and str(p) in sizes else _file_size(p) for p in py_files]
+    target_chunks = max(1, workers * CHUNKS_PER_WORKER)
+    if chunk_size:
+        max_files, max_bytes = chunk_size, MAX_CHUNK_BYTES
+    else:
+        max_files = min(MAX_CHUNK_FILES, -(-len(py_files) // target_chunks))
+        max_bytes = min(MAX_CHUNK_BYTES, max(1, sum(file_sizes) // target_chunks))
+    chunks: List[List[Path]] = []
+    current: List[Path] = []
+    current_bytes = 0
+    for path, size in zip(py_files, file_sizes):
+        if current and (len(current) >= max_files or current_bytes >= max_bytes or size >= max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(path)
+        current_bytes += size
+    chunks.append(current)
+    return chunks
+
+
+def _timed_call(process_fn: Callable, path: Path, args: Tuple, kwargs: Dict[str, Any], config: Config) -> Tuple[Any, float]:
+    """Run process_fn on one file; return (result, seconds) for the cost history."""
+    start = time.perf_counter()
+    result = process_fn(path, *args, config=config, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _run_chunk(
+    process_fn: Callable,
+    chunk: List[Path],
+    args: Tuple,
+    kwargs: Dict[str, Any],
+    config: Optional[Config] = None,
+    combine: Optional[Callable] = None,
+    cache: Optional[CacheSlice] = None,
+) -> Tuple[List[Any], List[float], Dict[str, Any]]:
+    """Worker-side loop over one batch of files (one pickled task instead of one per file).
+
+    Without an explicit config, uses the one the pool initializer shipped to this worker.
+    cache (the chunk's cache entries) is passed to process_fn as cache_manager.
+    Returns the results, combined into one partial with combine, each file's processing
+    time, and the cache entries process_fn set (for the parent's CacheManager).
+    """
+    config = config if config is not None else worker_config()
+    if cache is not None:
+        kwargs = {**kwargs, "cache_manager": cache}
+    timed = [_timed_call(process_fn, p, args, kwargs, config) for p in chunk]
+    results = [result for result, _ in timed]
+    if combine is not None:
+        results = [combine(chunk, results, config)]
+    return results, [seconds for _, seconds in timed], cache.updates if cache is not None else {}
+
+
+class _RequeueableTasks:
+    """Task iterator that serves re-queued tasks ahead of the remaining ones (and keeps serving after running dry)."""
+
+    def __init__(self, tasks: Iterable[Any]):
+        self._tasks = iter(tasks)
+        self._requeued: Deque[Any] = deque()
+
+    def requeue(self, task: Any) -> None:
+        self._requeued.append(task)
+
+    def __iter__(self) -> "_RequeueableTasks":
+        return self
+
+    def __next__(self) -> Any:
+        if self._requeued:
+            return self._requeued.popleft()
+        return next(self._tasks)
+
+
+def _bounded_submit(
+    submit: Callable[[Any], concurrent.futures.Future],
+    tasks: Iterable[Any],
+    window: Union[int, Callable[[], int]],
+    timeout_for: Optional[Callable[[Any], float]] = None,
+) -> Iterator[Tuple[Any, concurrent.futures.Future]]:
+    """Keep at most `window` tasks in flight; yield (task, future) as each completes.
+
+    window may be a callable, asked again at every refill (e.g. MemoryBudget.window).
+
+    The window is refilled before completed results are handed on, so workers stay busy
+    while the caller aggregates, and again afterwards to pick up tasks the caller
+    re-queued. With timeout_for, a task still running timeout_for(task) seconds after
+    submission is yielded anyway with its future not done. Pending tasks are cancelled
+    if the caller stops early.
+    """
+    task_iter = iter(tasks)
+    pending: Dict[concurrent.futures.Future, Any] = {}
+    deadlines: Dict[concurrent.futures.Future, float] = {}
+
+    def refill() -> None:
+        limit = window() if callable(window) else window
+        for task in itertools.islice(task_iter, max(limit - len(pending), 0)):
+            future = submit(task)
+            pending[future] = task
+            if timeout_for is not None:
+                deadlines[future] = time.monotonic() + timeout_for(task)
+
+    refill()
+    try:
+        while pending:
+            timeout = max(0.0, min(deadlines.values()) - time.monotonic()) if deadlines else None
+            done, _ = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            now = time.monotonic()
+            expired = [future for future, deadline in deadlines.items() if deadline <= now and future not in done]
+            completed = [(pending.pop(future), future) for future in (*done, *expired)]
+            for _, future in completed:
+                deadlines.pop(future, None)
+            refill()
+            yield from completed
+            refill()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def timeout_skip_entry(path: Path, seconds: float) -> str:
+    """Skipped-list entry for a file abandoned after exceeding its time budget."""
+    return f"{path} (timed out after {seconds:g}s)"
+
+
+def _timed_out(path: Path, seconds: float, config: Config, combine: Optional[Callable]) -> Any:
+    """Audit/log a file timeout and return the processor-shaped result (or combined partial) that reports it."""
+    audit_log_event(config, "file_skipped", path=str(path), reason="timeout", timeout=seconds)
+    logging.warning(f"Skipping {path}: no result after {seconds:g}s")
+    result = ({}, timeout_skip_entry(path, seconds), 0)
+    return combine([path], [result], config) if combine is not None else result
 
 
 def run_parallel(
@@ -142,32 +574,207 @@ def run_parallel(
     process_fn: Callable,
     *args,
     config: Config,
+    tracker: Optional["PerformanceTracker"] = None,
+    combine: Optional[Callable[[List[Path], List[Any], Config], Any]] = None,
+    cache: Optional[CacheManager] = None,
     **kwargs
 ) -> Generator[Any, None, None]:
-    """Shared parallel execution logic (generator)."""
-    if config.max_workers is None:
-        config.max_workers = os.cpu_count() or 4
-    executor_cls = concurrent.futures.ProcessPoolExecutor if config.use_multiprocessing else concurrent.futures.ThreadPoolExecutor
-    with executor_cls(max_workers=config.max_workers) if config.parallel else contextlib.nullcontext() as executor:
-        if config.parallel:
-            futures = []
-            for idx, p in enumerate(py_files):
-                future = executor.submit(process_fn, p, *args, config=config, **kwargs)
-                # Audit: Log task dispatch
-                audit_log_event(config, "task_submitted", file_path=str(p), future_id=id(future), index=idx)
-                futures.append(future)
-            for future in tqdm(concurrent.futures.as_completed(futures), total=len(py_files), disable=not config.verbose, desc="Processing files"):
-                result = future.result()
-                # Audit: Log completion (basic; detailed in processors)
-                audit_log_event(config, "task_completed", future_id=id(future), success=True, error=None)
-                yield result
-        else:
-            for py_file in tqdm(py_files, disable=not config.verbose, desc="Processing files"):
-                # Audit: Log sequential dispatch
-                audit_log_event(config, "task_submitted", file_path=str(py_file), future_id=None, index=None)
-                result = process_fn(py_file, *args, config=config, **kwargs)
-                audit_log_event(config, "task_completed", file_path=str(py_file), success=True, error=None)
-                yield result
+    """Shared parallel execution logic (generator).
+
+    The strategy comes from config.executor ("auto" is resolved here, once the files and
+    their sizes are known) or from the parallel/use_multiprocessing flags.
+    Parallel runs use a long-lived pool shared across scans (see executor). Process pools
+    receive files in chunks (see make_chunks) and get the config once, through the pool
+    initializer; thread pools share memory and keep one task per file. At most
+    max_in_flight tasks are pending at a time, and each result is yielded as soon as it
+    completes, so memory stays flat regardless of the number of files.
+
+    With combine, each task's results are folded into one partial by
+    combine(paths, results, config) before they are yielded; process workers do this
+    before pickling, so the parent merges a partial per chunk instead of a result per file.
+
+    cache is passed to process_fn as cache_manager. Process chunks get only their files'
+    entries (CacheManager.slice), not the whole cache, and the entries they set are
+    merged back into cache as each chunk completes.
+
+    With config.task_timeout, a file still running after its budget is abandoned, its
+    worker replaced (process chunks are first retried file by file), and a processor
+    result reporting it as skipped yielded in its place. Only process workers are actually
+    stopped; an abandoned thread runs on, and holds up interpreter exit, until its file is done.
+
+    Cancellation is cooperative: on KeyboardInterrupt, or when the caller closes the
+    generator, queued tasks are cancelled and process workers stopped. Everything yielded
+    before that is the caller's to keep.
+    """
+    if config.max_workers is None or config.max_memory is not None:
+        config.max_workers = resolve_workers(config)
+    window = config.max_in_flight or config.max_workers * IN_FLIGHT_PER_WORKER
+    strategy = configured_strategy(config)
+    shared_kwargs = {**kwargs, "cache_manager": cache} if cache is not None else kwargs
+    metered = limited(config)
+    started = time.perf_counter()
+    sizes = {str(p): _file_size(p) for p in py_files} if strategy != "sequential" or metered else {}
+    if strategy == "auto":
+        strategy = choose_strategy(config, len(py_files), sum(sizes.values()))
+        logging.info(
+            f"Executor: {strategy} for {len(py_files)} files ({sum(sizes.values()) / 1048576:.1f} MiB, "
+            f"{config.max_workers} workers, {'free-threaded' if free_threaded() else 'GIL'} build)"
+        )
+    else:
+        logging.debug(f"Executor: {strategy}")
+    if tracker is not None:
+        tracker.record("Executor", strategy)
+    config = with_strategy(config, strategy)
+    if config.parallel:
+        # Longest job first: big files start early instead of running alone at the end
+        history = CostHistory(config.cost_history_path, getattr(process_fn, "__name__", "default")) if config.enable_cache else None
+        py_files = schedule_longest_first(py_files, sizes, history)
+    budget = config.task_timeout if config.parallel else None
+    if budget and not config.use_multiprocessing:
+        logging.warning(
+            "--task-timeout cannot stop a thread: a file over budget is reported as skipped, but its thread "
+            "keeps running and the process waits for it at exit. Use --executor processes to enforce the budget."
+        )
+    if budget:
+        # Budgets run from submission, so only submit what a worker can start right away
+        window = min(window, config.max_workers)
+    timed_out = 0
+    if config.parallel and config.use_multiprocessing:
+        executor = get_pool(config)
+        chunks = make_chunks(py_files, config.max_workers, config.chunk_size, sizes)
+        if tracker is not None:
+            tracker.record("Task chunks", len(chunks))
+            tracker.record("Files per chunk", f"{len(py_files) / len(chunks):.1f} avg, {max(map(len, chunks))} max" if chunks else "0")
+            tracker.record("Max tasks in flight", window)
+        tasks = _RequeueableTasks(enumerate(chunks))
+        memory = MemoryBudget(config, executor) if config.max_memory is not None else None
+        # Bumped when a timeout replaces the pool; tasks lost with the old pool are retried
+        generation = 0
+        submitted_in: Dict[concurrent.futures.Future, int] = {}
+
+        def submit_chunk(indexed_chunk: Tuple[int, List[Path]]) -> concurrent.futures.Future:
+            idx, chunk = indexed_chunk
+            chunk_cache = cache.slice(chunk) if cache is not None else None
+            future = executor.submit(_run_chunk, process_fn, chunk, args, kwargs, combine=combine, cache=chunk_cache)
+            submitted_in[future] = generation
+            audit_log_event(config, "task_submitted", file_path=str(chunk[0]), file_count=len(chunk), future_id=id(future), index=idx)
+            return future
+
+        chunk_budget = (lambda indexed_chunk: budget * len(indexed_chunk[1])) if budget else None
+        try:
+            with tqdm(total=len(py_files), disable=not config.verbose, desc="Processing files") as progress:
+                in_flight = (lambda: memory.window(window)) if memory is not None else window
+                for (idx, chunk), future in _bounded_submit(submit_chunk, tasks, in_flight, chunk_budget):
+                    stale = submitted_in.pop(future) < generation
+                    if not future.done():
+                        # Over budget: kill the workers and isolate the straggler
+                        executor = replace_pool(config)
+                        generation += 1
+                        if memory is not None:
+                            memory.pool = executor
+                        if len(chunk) > 1:
+                            logging.warning(f"A task of {len(chunk)} files ran over {budget * len(chunk):g}s; retrying its files one at a time")
+                            for p in chunk:
+                                tasks.requeue((idx, [p]))
+                        else:
+                            timed_out += 1
+                            progress.update(1)
+                            yield _timed_out(chunk[0], budget, config, combine)
+                        continue
+                    try:
+                        results, durations, cache_updates = future.result()
+                    except (concurrent.futures.process.BrokenProcessPool, concurrent.futures.CancelledError):
+                        if not stale:
+                            raise
+                        tasks.requeue((idx, chunk))  # Lost when a timeout replaced the pool
+                        continue
+                    audit_log_event(config, "task_completed", future_id=id(future), file_count=len(results), success=True, error=None)
+                    if cache is not None:
+                        cache.update(cache_updates)
+                    if history is not None:
+                        for p, seconds in zip(chunk, durations):
+                            history.record(str(p), seconds)
+                    progress.update(len(chunk))
+                    yield from results
+        except concurrent.futures.process.BrokenProcessPool:
+            discard_pool(config)  # A worker died; the next scan starts a fresh pool
+            raise
+        except (KeyboardInterrupt, GeneratorExit):
+            cancel_pool(config)  # Cancelled scan: stop the chunks still running, not just the queued ones
+            raise
+        finally:
+            if history is not None:
+                history.save()
+            if tracker is not None and memory is not None:
+                tracker.record("Memory budget", memory.summary())
+            if tracker is not None and timed_out:
+                tracker.record("Timed out files", timed_out)
+    elif config.parallel:
+        executor = get_pool(config)
+        if tracker is not None:
+            tracker.record("Max tasks in flight", window)
+
+        def submit_file(indexed_file: Tuple[int, Path]) -> concurrent.futures.Future:
+            idx, p = indexed_file
+            future = executor.submit(_timed_call, process_fn, p, args, shared_kwargs, config)
+            # Audit: Log task dispatch
+            audit_log_event(config, "task_submitted", file_path=str(p), future_id=id(future), index=idx)
+            return future
+
+        file_budget = (lambda _: budget) if budget else None
+        try:
+            with tqdm(total=len(py_files), disable=not config.verbose, desc="Processing files") as progress:
+                for (_, p), future in _bounded_submit(submit_file, enumerate(py_files), window, file_budget):
+                    if not future.done():
+                        # The stuck thread cannot be stopped; abandon it and restore pool capacity
+                        executor = replace_pool(config)
+                        timed_out += 1
+                        progress.update(1)
+                        yield _timed_out(p, budget, config, combine)
+                        continue
+                    result, seconds = future.result()
+                    # Audit: Log completion (basic; detailed in processors)
+                    audit_log_event(config, "task_completed", future_id=id(future), success=True, error=None)
+                    if history is not None:
+                        history.record(str(p), seconds)
+                    progress.update(1)
+                    yield combine([p], [result], config) if combine is not None else result
+        except (KeyboardInterrupt, GeneratorExit):
+            cancel_pool(config)  # Cancelled scan: drop the queued files
+            raise
+        finally:
+            if history is not None:
+                history.save()
+            if tracker is not None and timed_out:
+                tracker.record("Timed out files", timed_out)
+    else:
+        for py_file in tqdm(py_files, disable=not config.verbose, desc="Processing files"):
+            # Audit: Log sequential dispatch
+            audit_log_event(config, "task_submitted", file_path=str(py_file), future_id=None, index=None)
+            result = process_fn(py_file, *args, config=config, **shared_kwargs)
+            audit_log_event(config, "task_completed", file_path=str(py_file), success=True, error=None)
+            yield combine([py_file], [result], config) if combine is not None else result
+    if metered:
+        summary = throughput_summary(config, len(py_files), sum(sizes.values()), time.perf_counter() - started)
+        logging.info(f"Background throughput: {summary}")
+        if tracker is not None:
+            tracker.record("Background throughput", summary)
+
+
+def fold_cancellable(results: Iterable[Any], fold: Callable[[Any], None], snapshot: Callable[[], tuple], expected: Optional[int] = None) -> None:
+    """Pass each of results to fold; on KeyboardInterrupt, cancel the work still queued and
+    raise ScanCancelled with snapshot() (what was folded so far) and the files left of expected."""
+    folded = 0
+    try:
+        for result in results:
+            folded += 1
+            fold(result)
+    except KeyboardInterrupt:
+        close = getattr(results, "close", None)
+        if close is not None:
+            close()  # Interrupted between results: cancel the queued work too
+        not_processed = None if expected is None else max(expected - folded, 0)
+        raise ScanCancelled(snapshot(), not_processed) from None
 
 
 def log_file_count(py_files: List[Path], config: Config, context: str = "process") -> None:
@@ -189,6 +796,11 @@ class PerformanceTracker:
         self.phases: Dict[str, float] = {}
         self.peak_memory = 0
         self._phase_start = 0.0
+        self.metrics: Dict[str, Any] = {}
+
+    def record(self, name: str, value: Any):
+        """Record a named run metric (e.g. task chunking) for the metrics table."""
+        self.metrics[name] = value
 
     def start(self):
         """Start tracking."""
@@ -205,6 +817,7 @@ class PerformanceTracker:
         self.phases = {}
         self.peak_memory = 0
         self._phase_start = 0.0
+        self.metrics = {}
         if tracemalloc.is_tracing():
             tracemalloc.stop()
 
@@ -244,6 +857,8 @@ class PerformanceTracker:
             # Add general metrics
             table.add_row("Total Time", f"{self.timings.get('total', 0):.4f}s")
             table.add_row("Peak Memory", f"{self.peak_memory / 1024 / 1024:.2f} MB")
+            for name, value in self.metrics.items():
+                table.add_row(name, str(value))
 
             console.print(table)
 
@@ -0,0 +1,88 @@
+# src/duplifinder/vcs.py
+
+"""Git helpers for fast discovery (stdlib subprocess; git itself is optional)."""
+
+import logging
+import os
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+GIT_TIMEOUT_SECONDS = 120
+
+
+def in_git_work_tree(root: Path) -> bool:
+    """Cheap check (no subprocess) for a .git entry in root or any of its parents."""
+    try:
+        current = root.resolve()
+    except OSError:
+        return False
+    for candidate in (current, *current.parents):
+        if os.path.exists(os.path.join(candidate, ".git")):
+            return True
+    return False
+
+
+def _run_git(root: Path, *args: str) -> Optional[bytes]:
+    """Run a git command in root; return stdout, or None if git is missing or the command fails."""
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(root), *args],
+            capture_output=True,
+            check=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+        )
+    except FileNotFoundError:
+        logging.info("git executable not found; falling back to filesystem walk")
+        return None
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        stderr = getattr(e, "stderr", None) or b""
+        logging.info(f"git {' '.join(args[:1])} failed in '{root}': {os.fsdecode(stderr).strip() or e}")
+        return None
+    return proc.stdout
+
+
+def _split_z(output: bytes) -> List[str]:
+    """Decode NUL-separated git output into unique paths, preserving order."""
+    seen = set()
+    paths = []
+    for raw in output.split(b"\0"):
+        if raw and raw not in seen:  # Unmerged entries are listed once per stage
+            seen.add(raw)
+            paths.append(os.fsdecode(raw))
+    return paths
+
+
+def git_ls_files(root: Path) -> Optional[List[str]]:
+    """List tracked and untracked-but-not-ignored files under root, relative to root.
+
+    Git applies every ignore source (.gitignore at any depth, .git/info/exclude,
+    core.excludesFile). Returns None when root is not in a work tree or git is unavailable.
+    """
+    if not in_git_work_tree(root):
+        return None
+    output = _run_git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+    if output is None:
+        return None
+    return _split_z(output)
+
+
+def git_rev_parse(root: Path, ref: str) -> Optional[str]:
+    """Resolve ref to a commit SHA, or None if it does not exist (or git is unavailable)."""
+    if not in_git_work_tree(root):
+        return None
+    output = _run_git(root, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+    if not output:
+        return None
+    return os.fsdecode(output).strip() or None
+
+
+def git_changed_files(root: Path, ref: str) -> Optional[List[str]]:
+    """Files under root that differ from ref in the work tree (staged, unstaged or untracked), relative to root."""
+    if not in_git_work_tree(root):
+        return None
+    diff = _run_git(root, "diff", "--name-only", "-z", "--relative", ref, "--")
+    if diff is None:
+        return None
+    untracked = _run_git(root, "ls-files", "-z", "--others", "--exclude-standard") or b""
+    return _split_z(diff + b"\0" + untracked)
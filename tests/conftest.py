@@ -8,9 +8,17 @@ from unittest.mock import Mock, patch
 
 import pytest
 from duplifinder.config import Config
+from duplifinder.executor import shutdown_pools
 from duplifinder.utils import discover_py_files
 
 
+@pytest.fixture(autouse=True)
+def _isolated_worker_pools():
+    """Fixture: Shared worker pools (possibly mocked) do not leak between tests."""
+    yield
+    shutdown_pools(wait=False)
+
+
 @pytest.fixture
 def sample_py_file(tmp_path: Path):
     """Fixture: Sample Python file with defs."""
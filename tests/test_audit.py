@@ -0,0 +1,151 @@
+# tests/test_audit.py
+
+"""Tests for the buffered audit log: batching writer thread, interval flush and process-pool workers."""
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from duplifinder import audit
+from duplifinder.audit import AuditListener, AuditWriter, flush_audit_log
+from duplifinder.cli import build_config, create_parser
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.executor import cancel_pool, with_strategy
+from duplifinder.utils import audit_log_event
+
+
+def _events(path: Path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_events_from_many_threads_reach_one_file(tmp_path: Path):
+    config = Config(root=tmp_path, audit_enabled=True, audit_log_path=tmp_path / "audit.jsonl")
+
+    def emit(n):
+        for i in range(50):
+            audit_log_event(config, "test_event", thread=n, i=i)
+
+    threads = [threading.Thread(target=emit, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flush_audit_log()
+
+    events = _events(config.audit_log_path)
+    assert len(events) == 200
+    assert sorted((e["thread"], e["i"]) for e in events) == [(n, i) for n in range(4) for i in range(50)]
+
+
+def test_writer_flushes_on_its_interval(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    writer = AuditWriter(path, flush_interval=0.05)
+    try:
+        writer.write('{"event_type": "a"}\n')
+        deadline = time.monotonic() + 5
+        while not path.read_text() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert path.read_text() == '{"event_type": "a"}\n'
+    finally:
+        writer.close()
+
+
+def test_process_workers_send_events_to_the_parent(tmp_path: Path):
+    for i in range(4):
+        (tmp_path / f"mod{i}.py").write_text(f"def only_{i}():\n    return {i}\n")
+    log = tmp_path / "logs" / "audit.jsonl"
+    log.parent.mkdir()
+    config = Config(root=tmp_path, respect_gitignore=False, executor="processes", max_workers=2, audit_enabled=True, audit_log_path=log)
+
+    find_definitions(config)
+    flush_audit_log()
+
+    parsed = [e for e in _events(log) if e["event_type"] == "file_parsed"]
+    assert sorted(Path(e["path"]).name for e in parsed) == [f"mod{i}.py" for i in range(4)]
+    assert all(e["worker_id"] != os.getpid() for e in parsed)
+
+
+def _unpickle_fails():
+    raise ValueError("corrupt event")
+
+
+class _Unreadable:
+    """Pickles fine, fails to unpickle: stands in for a garbled message."""
+
+    def __reduce__(self):
+        return _unpickle_fails, ()
+
+
+def test_listener_skips_unreadable_messages(tmp_path: Path, caplog):
+    log = tmp_path / "audit.jsonl"
+    listener = AuditListener(multiprocessing.get_context())
+    try:
+        listener.events.put(_Unreadable())
+        listener.events.put((log, 1.0, '{"event_type": "after"}\n'))
+        assert listener.flush()
+        flush_audit_log()
+        assert _events(log) == [{"event_type": "after"}]
+        assert "unreadable audit event" in caplog.text
+    finally:
+        listener.retire()
+
+
+def test_retired_listener_delivers_until_workers_exit(tmp_path: Path):
+    log = tmp_path / "audit.jsonl"
+    worker = type("Worker", (), {"alive": True, "is_alive": lambda self: self.alive})()
+    listener = AuditListener(multiprocessing.get_context())
+    listener.retire([worker])
+    listener.events.put((log, 1.0, '{"event_type": "late"}\n'))  # Sent by a worker still shutting down
+    assert listener._thread.is_alive()
+    worker.alive = False
+    assert listener.flush()
+    flush_audit_log()
+    assert _events(log) == [{"event_type": "late"}]
+    assert listener not in audit._listeners
+
+
+def test_each_pool_has_its_own_queue_retired_with_it(tmp_path: Path):
+    for i in range(4):
+        (tmp_path / f"mod{i}.py").write_text(f"def only_{i}():\n    return {i}\n")
+    log = tmp_path / "audit.jsonl"
+    config = Config(root=tmp_path, respect_gitignore=False, executor="processes", max_workers=2, audit_enabled=True, audit_log_path=log)
+
+    find_definitions(config)
+    first = list(audit._listeners)
+    cancel_pool(with_strategy(config, "processes"))  # Terminates the workers, as a timeout or Ctrl+C does
+    for listener in first:
+        assert listener.flush()  # Drains and stops once the terminated workers are gone
+    assert not set(first) & set(audit._listeners)
+
+    find_definitions(config)  # A fresh pool with a fresh queue
+    assert len(audit._listeners) == 1 and audit._listeners[0] not in first
+    flush_audit_log()
+    parsed = [e for e in _events(log) if e["event_type"] == "file_parsed"]
+    assert len(parsed) == 8
+
+
+def test_pending_events_are_written_at_exit(tmp_path: Path):
+    log = tmp_path / "audit.jsonl"
+    src = Path(__file__).resolve().parents[1] / "src"
+    script = (
+        "from pathlib import Path\n"
+        "from duplifinder.config import Config\n"
+        "from duplifinder.utils import audit_log_event\n"
+        f"config = Config(audit_enabled=True, audit_log_path=Path({str(log)!r}), audit_flush_interval=60)\n"
+        "for i in range(100):\n"
+        "    audit_log_event(config, 'test_event', i=i)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], env={**os.environ, "PYTHONPATH": str(src)}, check=True, timeout=60)
+    assert [e["i"] for e in _events(log)] == list(range(100))
+
+
+def test_cli_audit_flush_interval():
+    config = build_config(create_parser().parse_args([".", "--audit", "--audit-flush-interval", "0.25"]))
+    assert config.audit_flush_interval == 0.25
+    assert build_config(create_parser().parse_args(["."])).audit_flush_interval == 1.0
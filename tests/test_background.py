@@ -0,0 +1,89 @@
+# tests/test_background.py
+
+"""Tests for --background / --io-rate: lowered priority, capped workers and rate-limited reads."""
+
+from pathlib import Path
+
+import pytest
+from duplifinder import background
+from duplifinder.background import BACKGROUND_IO_RATE, BACKGROUND_NICENESS, ReadThrottle, apply_limits
+from duplifinder.cli import build_config, create_parser
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.executor import resolve_workers
+from duplifinder.utils import PerformanceTracker
+
+
+@pytest.fixture(autouse=True)
+def fake_nice(monkeypatch):
+    """Record os.nice calls instead of lowering the test process's priority."""
+    state = {"niceness": 0, "calls": []}
+
+    def nice(increment):
+        state["calls"].append(increment)
+        state["niceness"] += increment
+        return state["niceness"]
+
+    monkeypatch.setattr(background.os, "nice", nice)
+    yield state
+    background._throttle = None
+
+
+def test_read_throttle_sleeps_off_overdrawn_reads(monkeypatch):
+    slept = []
+    monkeypatch.setattr(background.time, "sleep", slept.append)
+    throttle = ReadThrottle(1000)
+
+    assert throttle.consume(1000) == 0.0  # One second of burst
+    assert throttle.consume(500) == pytest.approx(0.5, abs=0.05)
+    assert throttle.consume(500) == pytest.approx(1.0, abs=0.05)  # Queued behind the first debt
+    assert slept == pytest.approx([0.5, 1.0], abs=0.05)
+    assert throttle.bytes == 2000
+
+
+def test_apply_limits(fake_nice):
+    apply_limits(Config(background=True), share=4)
+    assert fake_nice["niceness"] == BACKGROUND_NICENESS
+    assert background._throttle.rate == BACKGROUND_IO_RATE // 4
+
+    apply_limits(Config(background=True))  # Already niced: priority is not lowered again
+    assert fake_nice["calls"] == [0, BACKGROUND_NICENESS, 0]
+    assert background._throttle.rate == BACKGROUND_IO_RATE
+
+    apply_limits(Config(io_rate=4096))
+    assert background._throttle.rate == 4096
+    apply_limits(Config())
+    assert background._throttle is None
+
+
+def test_background_caps_default_workers(monkeypatch):
+    monkeypatch.setattr(background.os, "cpu_count", lambda: 16)
+    assert resolve_workers(Config(background=True)) == 4
+    assert resolve_workers(Config(background=True, max_workers=8)) == 8
+    monkeypatch.setattr(background.os, "cpu_count", lambda: 2)
+    assert resolve_workers(Config(background=True)) == 1
+
+
+def test_cli_background_flags():
+    args = create_parser().parse_args([".", "--background", "--io-rate", "2M"])
+    config = build_config(args)
+    assert config.background is True
+    assert config.io_rate == 2 * 1024 * 1024
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_background_scan_reports_throughput(tmp_path: Path, fake_nice, pipeline):
+    for i in range(6):
+        (tmp_path / f"mod{i}.py").write_text(f"class Shared:\n    pass\n\ndef only_{i}():\n    return {i}\n")
+    expected = find_definitions(Config(root=tmp_path, respect_gitignore=False))
+    tracker = PerformanceTracker(verbose=False)
+
+    config = Config(root=tmp_path, respect_gitignore=False, background=True, io_rate=1024 * 1024, executor="threads", pipeline=pipeline)
+    definitions, *rest = find_definitions(config, tracker=tracker)
+
+    assert {n: sorted(locs) for n, locs in definitions["class"].items()} == {n: sorted(locs) for n, locs in expected[0]["class"].items()}
+    assert rest == list(expected[1:])
+    assert "files/s" in tracker.metrics["Background throughput"]
+    assert "cap 1.0 MiB/s" in tracker.metrics["Background throughput"]
+    assert fake_nice["niceness"] == BACKGROUND_NICENESS
+    assert background._throttle.bytes > 0
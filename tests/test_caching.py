@@ -1,13 +1,19 @@
+import concurrent.futures
 import json
+import os
+import shutil
+import subprocess
 import tempfile
 import time
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from duplifinder.cache import CacheManager
+from duplifinder.cache import CacheManager, CacheSlice, CostHistory, DiscoveryCache
 from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.utils import discover_py_files, run_parallel
 
 @pytest.fixture
 def temp_cache_dir():
@@ -54,3 +60,149 @@ def test_file_hashing(temp_cache_dir):
     f.write_text("content2", encoding="utf-8")
     h2 = CacheManager.compute_hash(f)
     assert h != h2
+
+
+def _age(path: Path, seconds: int = 60):
+    """Push a path's mtime into the past so it is outside the racy window."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 1_000_000_000))
+
+
+def test_cost_history_roundtrip(temp_cache_dir):
+    """Test costs are smoothed, kept per section and persisted."""
+    path = Path(temp_cache_dir) / "costs.json"
+    history = CostHistory(path, "ast")
+    history.record("a.py", 2.0)
+    history.record("a.py", 4.0)
+    assert history.costs["a.py"] == pytest.approx(3.0)
+    history.save()
+
+    reloaded = CostHistory(path, "ast")
+    assert reloaded.costs == {"a.py": pytest.approx(3.0)}
+    assert CostHistory(path, "text").costs == {}
+    assert reloaded.seconds_per_byte({"a.py": 300}) == pytest.approx(0.01)
+    assert reloaded.expected("b.py", 100, 0.01) == pytest.approx(1.0)
+
+
+def test_discovery_cache_listing_roundtrip(temp_cache_dir):
+    cache_path = temp_cache_dir / "discovery.json"
+    cache = DiscoveryCache(cache_path)
+    old_mtime = time.time_ns() - 10_000_000_000
+    cache.set_listing("/src", old_mtime, ["pkg"], ["a.py"])
+    cache.save()
+
+    reloaded = DiscoveryCache(cache_path)
+    assert reloaded.get_listing("/src", old_mtime) == (["pkg"], ["a.py"])
+    assert reloaded.get_listing("/src", old_mtime + 1) is None  # Directory changed
+
+
+def test_discovery_cache_skips_racy_listing(temp_cache_dir):
+    cache = DiscoveryCache(temp_cache_dir / "discovery.json")
+    cache.set_listing("/src", time.time_ns(), [], ["a.py"])
+    assert cache.get_listing("/src", time.time_ns()) is None
+
+
+def test_discover_reuses_listings(tmp_path):
+    root = tmp_path / "proj"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "mod.py").write_text("def f(): pass")
+    for d in (root / "pkg", root):
+        _age(d)
+    config = Config(root=root, enable_cache=True, use_git_index=False,
+                    discovery_cache_path=tmp_path / "discovery.json")
+
+    first = discover_py_files(config)
+    with patch("duplifinder.utils._scan_dir", side_effect=AssertionError("re-listed")):
+        second = discover_py_files(config)
+    assert first == second == [root / "pkg" / "mod.py"]
+
+    # A new file changes the directory mtime, so only that directory is listed again
+    (root / "pkg" / "new.py").write_text("class New: pass")
+    third = discover_py_files(config)
+    assert sorted(p.name for p in third) == ["mod.py", "new.py"]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_find_definitions_since_reuses_unchanged(tmp_path):
+    root = tmp_path / "proj"
+    root.mkdir()
+    (root / "a.py").write_text("def shared(): pass\n")
+    (root / "b.py").write_text("def other(): pass\n")
+    git = ["git", "-C", str(root), "-c", "user.name=t", "-c", "user.email=t@example.com"]
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+    config = Config(root=root, cache_path=tmp_path / "index.json", since_ref="HEAD")
+
+    find_definitions(config)  # No stored index yet: every file is processed
+    (root / "b.py").write_text("def shared():\n    return 1\n")
+    with patch("duplifinder.definition_finder.run_parallel", wraps=run_parallel) as spy:
+        defs, skipped, scanned, _, _ = find_definitions(config)
+
+    assert [p.name for p in spy.call_args.args[0]] == ["b.py"]
+    assert scanned == 2
+    assert len(defs["def"]["shared"]) == 2
+
+
+def test_find_definitions_since_without_git_scans_all(tmp_path, caplog):
+    (tmp_path / "a.py").write_text("def a(): pass\n")
+    config = Config(root=tmp_path, cache_path=tmp_path / "index.json", since_ref="main", use_git_index=False)
+    with patch("duplifinder.definition_finder.git_changed_files", return_value=None):
+        _, _, scanned, _, _ = find_definitions(config)
+    assert scanned == 1
+    assert "scanning all files" in caplog.text
+
+
+def test_process_chunks_ship_only_their_cache_entries(temp_cache_dir):
+    """Process-pool tasks carry a slice of the cache, not the whole CacheManager."""
+    manager = CacheManager(temp_cache_dir / "cache.json")
+    for name in ("a.py", "b.py", "c.py"):
+        manager.set(name, "h-" + name, {"result": name})
+    config = Config(root=temp_cache_dir, executor="processes", max_workers=2, chunk_size=1)
+    submitted = []
+
+    def submit(fn, process_fn, chunk, args, kwargs, **options):
+        submitted.append((chunk, kwargs, options["cache"]))
+        done = concurrent.futures.Future()
+        done.set_result(([None], [0.0], {}))
+        return done
+
+    with patch("duplifinder.utils.get_pool") as get_pool:
+        get_pool.return_value.submit.side_effect = submit
+        list(run_parallel([Path("a.py"), Path("b.py")], MagicMock(), config=config, cache=manager))
+
+    slices = {str(chunk[0]): cache for chunk, _, cache in submitted}
+    assert {path: list(cache.entries) for path, cache in slices.items()} == {"a.py": ["a.py"], "b.py": ["b.py"]}
+    assert slices["a.py"].get("a.py", "h-a.py") == {"result": "a.py"}
+    assert all("cache_manager" not in kwargs for _, kwargs, _ in submitted)
+
+
+def test_cache_slice_records_updates():
+    entries = {"a.py": {"hash": "1", "timestamp": 0, "data": "old"}}
+    cache = CacheSlice(dict(entries))
+    assert cache.get("a.py", "1") == "old"
+    assert cache.get("a.py", "2") is None
+    cache.set("b.py", "3", "new")
+    assert cache.get("b.py", "3") == "new"
+    assert list(cache.updates) == ["b.py"]
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_process_pool_scan_stores_per_file_entries(tmp_path, pipeline):
+    """Entries set in process workers reach the saved cache (and so the --since index)."""
+    root = tmp_path / "proj"
+    root.mkdir()
+    for i in range(4):
+        (root / f"mod{i}.py").write_text(f"def only_{i}():\n    return {i}\n")
+    cache_path = tmp_path / "index.json"
+    config = Config(root=root, respect_gitignore=False, enable_cache=True, cache_path=cache_path,
+                    cost_history_path=tmp_path / "costs.json", discovery_cache_path=tmp_path / "discovery.json",
+                    executor="processes", max_workers=2, pipeline=pipeline)
+
+    find_definitions(config)
+
+    stored = CacheManager(cache_path, config=config)
+    for i in range(4):
+        entry = stored.get_stored(str(root / f"mod{i}.py"))
+        assert entry is not None
+        assert f"only_{i}" in entry["definitions"]["def"]
@@ -0,0 +1,226 @@
+# tests/test_cancellation.py
+
+"""Tests for cooperative cancellation: partial results survive Ctrl+C/SIGTERM and are reported as incomplete."""
+
+import json
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.exceptions import ScanCancelled
+from duplifinder.main import main
+from duplifinder.search_finder import find_search_matches
+from duplifinder.text_finder import find_text_matches
+from duplifinder.token_finder import find_token_duplicates
+from duplifinder.utils import run_parallel
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    for i in range(8):
+        (tmp_path / f"mod{i}.py").write_text(f"class Shared:\n    pass\n\ndef only_{i}():\n    return {i}\n")
+    return tmp_path
+
+
+def _interrupt_at(n: int, process_fn):
+    """process_fn that raises KeyboardInterrupt on its n-th call (1-based), as Ctrl+C would mid-scan."""
+    calls = []
+
+    def wrapped(py_file, *args, **kwargs):
+        calls.append(py_file)
+        if len(calls) == n:
+            raise KeyboardInterrupt
+        return process_fn(py_file, *args, **kwargs)
+
+    return wrapped
+
+
+def test_find_definitions_keeps_partial_results(tree):
+    config = Config(root=tree, respect_gitignore=False)
+    with patch("duplifinder.definition_finder.process_file_ast", _interrupt_at(4, process_file_ast)):
+        with pytest.raises(ScanCancelled) as exc:
+            find_definitions(config)
+
+    definitions, skipped, scanned, total_lines, _ = exc.value.results
+    assert scanned == 3
+    assert len(definitions["class"]["Shared"]) == 3
+    assert exc.value.not_processed == 5
+
+
+def test_find_token_duplicates_keeps_partial_results(tree):
+    from duplifinder.token_processor import process_file_tokens
+
+    config = Config(root=tree, respect_gitignore=False, token_mode=True)
+    with patch("duplifinder.token_finder.process_file_tokens", _interrupt_at(3, process_file_tokens)):
+        with pytest.raises(ScanCancelled) as exc:
+            find_token_duplicates(config)
+    assert exc.value.results[2] == 2
+    assert exc.value.not_processed == 6
+
+
+def test_find_search_matches_keeps_partial_results(tree):
+    config = Config(root=tree, respect_gitignore=False, search_mode=True, search_specs=["class Shared"])
+    with patch("duplifinder.search_finder.process_file_ast", _interrupt_at(4, process_file_ast)):
+        with pytest.raises(ScanCancelled) as exc:
+            find_search_matches(config)
+
+    matches, skipped, scanned = exc.value.results
+    assert scanned == 3
+    assert len(matches["class Shared"]) == 3
+    assert exc.value.not_processed == 5
+
+
+def test_find_text_matches_keeps_partial_results(tree):
+    import re
+
+    from duplifinder.text_processor import process_file_text
+
+    config = Config(root=tree, respect_gitignore=False, pattern_regexes=["class Shared"])
+    with patch("duplifinder.text_finder.process_file_text", _interrupt_at(3, process_file_text)):
+        with pytest.raises(ScanCancelled) as exc:
+            find_text_matches(config, [re.compile("class Shared")])
+
+    matches, skipped, scanned, total_lines, _ = exc.value.results
+    assert scanned == 2
+    assert len(matches["class Shared"]) == 2
+    assert exc.value.not_processed == 6
+
+
+@pytest.mark.parametrize("mode_args, patched", [
+    (["-s", "class Shared"], "duplifinder.search_finder.process_file_ast"),
+    (["--pattern-regex", "class Shared"], "duplifinder.text_finder.process_file_text"),
+])
+def test_sigterm_cancels_search_and_pattern_modes(tree, monkeypatch, capsys, mode_args, patched):
+    import importlib
+    import os
+    import signal
+
+    module, name = patched.rsplit(".", 1)
+    process_fn = getattr(importlib.import_module(module), name)
+    monkeypatch.setattr(sys, "argv", ["duplifinder", str(tree), "--no-gitignore", "--json", *mode_args])
+    monkeypatch.setattr("duplifinder.main.print_logo", lambda: None)
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def terminate_midway(py_file, *args, **kwargs):
+        if py_file.name == "mod2.py":
+            os.kill(os.getpid(), signal.SIGTERM)
+        return process_fn(py_file, *args, **kwargs)
+
+    try:
+        with patch(patched, terminate_midway):
+            with pytest.raises(SystemExit) as exc:
+                main()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    assert exc.value.code == 130
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["incomplete"] is True
+    assert "files not processed" in captured.err
+
+
+def test_closing_run_parallel_cancels_queued_files(tree):
+    config = Config(root=tree, executor="threads", max_workers=1, max_in_flight=4)
+    started = []
+
+    def slow(py_file, config):
+        started.append(py_file)
+        time.sleep(0.05)
+        return ({}, None, 1)
+
+    results = run_parallel(sorted(tree.glob("*.py")), slow, config=config)
+    next(results)
+    results.close()  # What a consumer interrupted between results does
+    time.sleep(0.2)
+    assert len(started) < 8
+
+
+def test_cancelled_scan_renders_incomplete_report(tree, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["duplifinder", str(tree), "--no-gitignore", "--json"])
+    monkeypatch.setattr("duplifinder.main.print_logo", lambda: None)
+    partial = ({"class": {"Shared": [("a.py:1", ""), ("b.py:1", "")]}, "def": {}, "async_def": {}}, [], 2, 10, 0)
+    with patch("duplifinder.application.find_definitions", side_effect=ScanCancelled(partial, not_processed=6)):
+        with pytest.raises(SystemExit) as exc:
+            main()
+    assert exc.value.code == 130
+    captured = capsys.readouterr()
+    report = json.loads(captured.out)
+    assert report["incomplete"] is True
+    assert report["files_not_processed"] == 6
+    assert report["duplicate_count"] == 1
+    assert "6 files not processed" in captured.err
+
+
+def test_cancelled_scan_skips_thresholds(tree, monkeypatch, capsys):
+    # Mostly failed files so far: a complete scan would exit 3, a cancelled one still exits 130
+    monkeypatch.setattr(sys, "argv", ["duplifinder", str(tree), "--no-gitignore", "--json"])
+    monkeypatch.setattr("duplifinder.main.print_logo", lambda: None)
+    partial = ({"class": {}, "def": {}, "async_def": {}}, ["a.py (SyntaxError)", "b.py (SyntaxError)"], 1, 5, 0)
+    with patch("duplifinder.application.find_definitions", side_effect=ScanCancelled(partial, not_processed=5)):
+        with pytest.raises(SystemExit) as exc:
+            main()
+    assert exc.value.code == 130
+    captured = capsys.readouterr()
+    assert "SCAN FAIL" not in captured.err
+    assert json.loads(captured.out)["incomplete"] is True
+
+
+def test_sigterm_cancels_like_ctrl_c(tree, monkeypatch, capsys):
+    import os
+    import signal
+
+    monkeypatch.setattr(sys, "argv", ["duplifinder", str(tree), "--no-gitignore", "--json"])
+    monkeypatch.setattr("duplifinder.main.print_logo", lambda: None)
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def terminate_midway(py_file, *args, **kwargs):
+        if py_file.name == "mod2.py":
+            os.kill(os.getpid(), signal.SIGTERM)
+        return process_file_ast(py_file, *args, **kwargs)
+
+    try:
+        with patch("duplifinder.definition_finder.process_file_ast", terminate_midway):
+            with pytest.raises(SystemExit) as exc:
+                main()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    assert exc.value.code == 130
+    assert json.loads(capsys.readouterr().out)["incomplete"] is True
+
+
+_STALLED_PROCESS_SCAN = """
+import os, signal, sys, threading, time
+from duplifinder.index import DefinitionIndex
+from duplifinder.main import main
+
+merge = DefinitionIndex.merge
+
+def stalled_merge(self, partial):
+    time.sleep(30)  # The parent stalls on its first result; the worker runs dry and waits for tasks
+    merge(self, partial)
+
+DefinitionIndex.merge = stalled_merge
+threading.Timer(1.5, os.kill, (os.getpid(), signal.SIGTERM)).start()
+sys.argv = ["duplifinder", sys.argv[1], "--no-gitignore", "--parallel", "--use-multiprocessing", "--max-workers", "1", "--chunk-size", "1"]
+main()
+"""
+
+
+def test_sigterm_cancels_process_pool_scan_cleanly(tmp_path):
+    import os
+    import subprocess
+
+    for i in range(30):
+        (tmp_path / f"mod{i}.py").write_text(f"class Shared:\n    pass\n\ndef only_{i}():\n    return {i}\n")
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": str(src)}
+    started = time.monotonic()
+    scan = subprocess.run([sys.executable, "-c", _STALLED_PROCESS_SCAN, str(tmp_path)], env=env, capture_output=True, text=True, timeout=30)
+    assert scan.returncode == 130, scan.stderr
+    assert "files not processed" in scan.stderr
+    assert "Traceback" not in scan.stderr  # Terminated workers die quietly instead of raising KeyboardInterrupt
+    assert time.monotonic() - started < 15
@@ -209,3 +209,99 @@ def test_build_config_find_processing():
         config = build_config(mock_args)
     assert "class" in config.types_to_search
     assert "MyDef" in config.filter_names
+
+
+def test_build_config_cache_and_git_index_flags():
+    """Test --cache and --no-git-index map onto the config."""
+    args = create_parser().parse_args([".", "--cache", "--no-git-index", "--discovery-workers", "16", "--chunk-size", "32", "--max-in-flight", "8"])
+    config = build_config(args)
+    assert config.enable_cache is True
+    assert config.use_git_index is False
+    assert config.discovery_workers == 16
+    assert config.chunk_size == 32
+    assert config.max_in_flight == 8
+
+    config = build_config(create_parser().parse_args(["."]))
+    assert config.enable_cache is False
+    assert config.use_git_index is True
+    assert config.discovery_workers == 1
+    assert config.executor is None
+
+
+def test_build_config_executor():
+    """Test --executor and --task-timeout map onto the config; unknown strategies are rejected."""
+    assert build_config(create_parser().parse_args([".", "--executor", "auto"])).executor == "auto"
+    assert build_config(create_parser().parse_args([".", "--task-timeout", "2.5"])).task_timeout == 2.5
+    assert build_config(create_parser().parse_args([".", "--pipeline"])).pipeline is True
+    with pytest.raises(SystemExit):
+        create_parser().parse_args([".", "--executor", "gpu"])
+
+
+def test_build_config_max_memory():
+    """Test --max-memory accepts binary size suffixes."""
+    assert build_config(create_parser().parse_args([".", "--max-memory", "8G"])).max_memory == 8 * 1024 ** 3
+    assert build_config(create_parser().parse_args([".", "--max-memory", "512MiB"])).max_memory == 512 * 1024 ** 2
+    assert build_config(create_parser().parse_args(["."])).max_memory is None
+    for bad in ("lots", "0", "-1G"):
+        with pytest.raises(SystemExit):
+            create_parser().parse_args([".", "--max-memory", bad])
+
+
+def test_build_config_shard():
+    """Test --shard K/N and --shard-output map onto the config; malformed shards are rejected."""
+    config = build_config(create_parser().parse_args([".", "--shard", "2/8", "--shard-output", "part.json"]))
+    assert config.shard == (2, 8)
+    assert str(config.shard_output) == "part.json"
+    assert build_config(create_parser().parse_args(["."])).shard is None
+    for bad in ("2", "0/4", "5/4", "a/b"):
+        with pytest.raises(SystemExit):
+            create_parser().parse_args([".", "--shard", bad])
+
+
+def test_build_config_coordinate():
+    """Test the coordinate parser requires --listen and maps the coordinator options onto the config."""
+    from duplifinder.cli import create_coordinate_parser
+
+    config = build_config(create_coordinate_parser().parse_args([".", "--listen", "127.0.0.1:0", "--authkey", "s3cr3t-key", "--batch-files", "8"]))
+    assert (config.coordinator_address, config.coordinator_authkey, config.coordinator_batch_files) == ("127.0.0.1:0", "s3cr3t-key", 8)
+    assert "s3cr3t-key" not in repr(config)
+    assert build_config(create_parser().parse_args(["."])).coordinator_address is None
+    with pytest.raises(SystemExit):
+        create_coordinate_parser().parse_args(["."])
+
+
+def test_build_config_since_and_dedupe():
+    """Test --since and --no-dedupe-files map onto the config."""
+    config = build_config(create_parser().parse_args([".", "--since", "origin/main", "--no-dedupe-files"]))
+    assert config.since_ref == "origin/main"
+    assert config.dedupe_files is False
+    assert build_config(create_parser().parse_args(["."])).since_ref is None
+
+
+def test_build_config_multiple_roots(tmp_path):
+    """Test that every existing directory becomes a root and the rest are find arguments."""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    config = build_config(create_parser().parse_args([str(tmp_path / "a"), str(tmp_path / "b"), "class"]))
+    assert config.root == tmp_path / "a"
+    assert config.scan_roots == [tmp_path / "a", tmp_path / "b"]
+    assert config.types_to_search == {"class"}
+
+    single = build_config(create_parser().parse_args([str(tmp_path / "a")]))
+    assert single.scan_roots == [tmp_path / "a"]
+
+
+def test_build_config_large_file_policy():
+    """Test the large/generated file flags, with 0 disabling a limit."""
+    config = build_config(create_parser().parse_args(["."]))
+    assert config.max_file_bytes == 10 * 1024 * 1024
+    assert config.max_file_lines == 100_000
+    assert config.large_file_mode == "skip"
+    assert config.skip_generated is True
+
+    args = create_parser().parse_args([".", "--max-file-bytes", "0", "--max-file-lines", "500", "--large-file-mode", "stream", "--include-generated"])
+    config = build_config(args)
+    assert config.max_file_bytes is None
+    assert config.max_file_lines == 500
+    assert config.large_file_mode == "stream"
+    assert config.skip_generated is False
@@ -0,0 +1,87 @@
+# tests/test_dedupe.py
+
+"""Tests for whole-file deduplication."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from duplifinder.config import Config
+from duplifinder.dedupe import group_identical_files
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.definition_finder import find_definitions
+
+
+def test_group_identical_files_by_content(tmp_path: Path):
+    a = tmp_path / "a.py"
+    b = tmp_path / "b.py"
+    c = tmp_path / "c.py"
+    a.write_text("def f(): pass\n")
+    b.write_text("def f(): pass\n")
+    c.write_text("def g(): pass\n")  # Same size, different content
+
+    unique, clones = group_identical_files([a, b, c])
+
+    assert unique == [a, c]
+    assert clones == {a: [b]}
+
+
+def test_group_identical_files_only_hashes_size_collisions(tmp_path: Path):
+    a = tmp_path / "a.py"
+    b = tmp_path / "b.py"
+    a.write_text("def f(): pass\n")
+    b.write_text("class LongerName: pass\n")
+    with patch("duplifinder.dedupe.CacheManager.compute_hash", side_effect=AssertionError("hashed")):
+        unique, clones = group_identical_files([a, b])
+    assert unique == [a, b]
+    assert clones == {}
+
+
+@pytest.mark.skipif(not hasattr(os, "link"), reason="hardlinks unsupported")
+def test_group_identical_files_by_inode(tmp_path: Path):
+    a = tmp_path / "a.py"
+    a.write_text("def f(): pass\n")
+    linked = tmp_path / "linked.py"
+    os.link(a, linked)
+    alias = tmp_path / "alias.py"
+    alias.symlink_to(a)
+    copy = tmp_path / "copy.py"
+    copy.write_text("def f(): pass\n")
+
+    unique, clones = group_identical_files([a, linked, alias, copy])
+
+    assert unique == [a]
+    assert sorted(clones[a]) == sorted([linked, alias, copy])
+
+
+def test_group_identical_files_ignores_empty_files(tmp_path: Path):
+    files = [tmp_path / "a" / "__init__.py", tmp_path / "b" / "__init__.py"]
+    for f in files:
+        f.parent.mkdir()
+        f.write_text("")
+    assert group_identical_files(files) == (files, {})
+
+
+def test_find_definitions_reports_file_clone_group(tmp_path: Path):
+    source = "class Vendored:\n    pass\n"
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "lib.py").write_text(source)
+    config = Config(root=tmp_path, use_git_index=False)
+
+    with patch("duplifinder.definition_finder.process_file_ast", wraps=process_file_ast) as spy:
+        results, skipped, scanned, total_lines, _ = find_definitions(config)
+
+    assert spy.call_count == 1
+    assert scanned == 3
+    assert total_lines == 6
+    assert len(results["class"]["Vendored"]) == 1
+    group = results["file"][str(tmp_path / "a" / "lib.py")]
+    assert [loc for loc, _ in group] == [f"{tmp_path / d / 'lib.py'}:1" for d in ("a", "b", "c")]
+
+    config.dedupe_files = False
+    results, _, scanned, _, _ = find_definitions(config)
+    assert scanned == 3
+    assert "file" not in results
+    assert len(results["class"]["Vendored"]) == 3
@@ -0,0 +1,164 @@
+# tests/test_distributed.py
+
+"""Tests for coordinated scans: a coordinator and its workers, all on localhost."""
+
+import os
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Client
+from pathlib import Path
+
+import pytest
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.distributed import Coordinator, parse_address, run_worker
+from duplifinder.index import DefinitionIndex
+from duplifinder.token_finder import find_token_duplicates
+
+AUTHKEY = "test-secret"
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    root = tmp_path / "src"
+    root.mkdir()
+    for i in range(10):
+        (root / f"mod{i}.py").write_text(f"class Shared:\n    pass\n\ndef helper():\n    return {i}\n")
+    (root / "copy.py").write_text((root / "mod0.py").read_text())
+    return root
+
+
+def _config(root: Path, **kwargs) -> Config:
+    return Config(root=root, respect_gitignore=False, coordinator_authkey=AUTHKEY, coordinator_batch_files=3, **kwargs)
+
+
+def _start_workers(address, count=2):
+    threads = [threading.Thread(target=run_worker, args=(address, AUTHKEY.encode(), "sequential"), daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _normalized(definitions):
+    return {t: {n: sorted(locs) for n, locs in m.items()} for t, m in definitions.items()}
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:7000") == ("127.0.0.1", 7000)
+    assert parse_address("/tmp/duplifinder.sock") == "/tmp/duplifinder.sock"
+
+
+def test_coordinated_definitions_match_local_scan(tree, tmp_path):
+    local = find_definitions(_config(tree))
+    address = str(tmp_path / "coord.sock")
+    workers = _start_workers(address)  # Before the coordinator: workers retry until it listens
+
+    remote = find_definitions(_config(tree, coordinator_address=address))
+
+    for worker in workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+    assert _normalized(remote[0]) == _normalized(local[0])
+    assert remote[1:] == local[1:]
+    assert "file" in remote[0]  # Identical files are still grouped by the coordinator
+
+
+def test_coordinated_token_scan(tree, tmp_path):
+    local = find_token_duplicates(_config(tree, token_mode=True))
+    address = str(tmp_path / "coord.sock")
+    _start_workers(address, count=1)
+
+    remote = find_token_duplicates(_config(tree, token_mode=True, coordinator_address=address))
+
+    assert remote[2:] == local[2:]
+
+
+def test_lost_worker_batch_is_requeued(tree):
+    config = _config(tree, coordinator_address="127.0.0.1:0")
+    coordinator = Coordinator(config, "definitions")
+    files = sorted(tree.glob("mod*.py"))
+    results = coordinator.run(files)
+
+    # A worker that takes a batch and disconnects without answering
+    conn = Client(coordinator.address, authkey=AUTHKEY.encode())
+    conn.send(("hello", "flaky", 0))
+    assert conn.recv()[0] == "config"
+    first = threading.Thread(target=lambda: partials.append(next(results)), daemon=True)
+    partials = []
+    first.start()  # Starts run(), which queues the batches
+    assert conn.recv()[0] == "batch"
+    conn.close()
+
+    _start_workers(coordinator.address, count=1)
+    first.join(timeout=5)
+    partials.extend(results)
+    index = DefinitionIndex()
+    for partial in partials:
+        index.merge(partial)
+    assert index.scanned == len(files)
+    assert coordinator.requeued == 1
+
+
+def test_work_command_subprocess(tree, tmp_path):
+    address = str(tmp_path / "coord.sock")
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": str(src), "DUPLIFINDER_AUTHKEY": AUTHKEY}
+    worker = subprocess.Popen([sys.executable, "-m", "duplifinder.main", "work", "--connect", address, "--executor", "sequential"], env=env, stderr=subprocess.PIPE, text=True)
+    try:
+        definitions, skipped, scanned, _, _ = find_definitions(_config(tree, coordinator_address=address))
+        _, err = worker.communicate(timeout=30)
+    finally:
+        worker.kill()
+    assert worker.returncode == 0, err
+    assert scanned == 11 and not skipped
+    assert len(definitions["class"]["Shared"]) == 10
+
+
+def test_malformed_result_is_requeued(tree):
+    config = _config(tree, coordinator_address="127.0.0.1:0")
+    coordinator = Coordinator(config, "definitions")
+    files = sorted(tree.glob("mod*.py"))
+    results = coordinator.run(files)
+    partials = []
+    first = threading.Thread(target=lambda: partials.append(next(results)), daemon=True)
+    first.start()
+
+    conn = Client(coordinator.address, authkey=AUTHKEY.encode())
+    conn.send(("hello", "broken", 0))
+    assert conn.recv()[0] == "config"
+    assert conn.recv()[0] == "batch"
+    conn.send(("result",))  # Not a (kind, batch_id, payload) triple
+    _start_workers(coordinator.address, count=1)
+    first.join(timeout=5)
+    partials.extend(results)
+    conn.close()
+
+    index = DefinitionIndex()
+    for partial in partials:
+        index.merge(partial)
+    assert index.scanned == len(files)
+    assert coordinator.requeued == 1
+
+
+def test_coordinate_command_subprocess_releases_workers(tree, tmp_path):
+    # The coordinator process exits right after its report: its workers must still be told the scan is done
+    address = str(tmp_path / "coord.sock")
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": str(src), "DUPLIFINDER_AUTHKEY": AUTHKEY}
+    command = [sys.executable, "-m", "duplifinder.main"]
+    coordinator = subprocess.Popen(
+        command + ["coordinate", str(tree), "--listen", address, "--batch-files", "2", "--no-gitignore"], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    # A single worker: the scan cannot finish before it connects, so it is always served
+    worker = subprocess.Popen(command + ["work", "--connect", address, "--executor", "sequential"], env=env, stderr=subprocess.PIPE, text=True)
+    try:
+        out, coordinator_err = coordinator.communicate(timeout=60)
+        _, err = worker.communicate(timeout=30)
+    finally:
+        coordinator.kill()
+        worker.kill()
+    assert coordinator.returncode == 0, coordinator_err
+    assert "Shared" in out
+    assert worker.returncode == 0, err
+    assert "Processed 5 batches." in err  # copy.py is grouped with mod0.py, not parsed
@@ -0,0 +1,228 @@
+# tests/test_executor.py
+
+"""Tests for the shared long-lived worker pools."""
+
+import time
+from pathlib import Path
+
+from duplifinder import executor
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.config import Config
+from duplifinder.utils import PerformanceTracker, run_parallel
+
+
+def _slow_on_request(path: Path, config: Config, delay: float = 30.0):
+    """Processor stand-in that hangs on files named slow*.py."""
+    if path.name.startswith("slow"):
+        time.sleep(delay)
+    return {}, None, 1
+
+
+def _process_config(**overrides) -> Config:
+    return Config(parallel=True, use_multiprocessing=True, max_workers=2, **overrides)
+
+
+def test_get_pool_reuses_pool_for_same_config():
+    config = _process_config()
+    pool = executor.get_pool(config)
+    assert executor.get_pool(_process_config()) is pool
+
+    # Workers hold the shipped config, so a config that changes results gets a new pool
+    replaced = executor.get_pool(_process_config(types_to_search={"class"}))
+    assert replaced is not pool
+
+
+def test_process_workers_receive_config_once():
+    config = _process_config(exclude_names={"^_"})
+    pool = executor.get_pool(config)
+    shipped = pool.submit(executor.worker_config).result()
+    assert shipped == config
+    assert executor.worker_config() is None  # Only set inside workers
+
+
+def test_prestart_pool_spawns_workers():
+    config = _process_config()
+    executor.prestart_pool(config)
+    pool = executor.get_pool(config)
+    pids = {pool.submit(executor._warmup).result() for _ in range(8)}
+    assert 1 <= len(pids) <= 2
+
+    thread_config = Config(parallel=True, max_workers=2)
+    executor.prestart_pool(thread_config)  # No-op for threads
+    assert ("thread", 2) not in executor._pools
+
+
+def test_repeated_scans_share_pool(tmp_path: Path):
+    files = []
+    for i in range(4):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(f"def f{i}(): pass\n")
+        files.append(f)
+    config = _process_config()
+
+    first = list(run_parallel(files, process_file_ast, config=config))
+    pool = executor.get_pool(config)
+    second = list(run_parallel(files, process_file_ast, config=config))
+
+    assert executor.get_pool(config) is pool
+    assert sorted(r[2] for r in first) == sorted(r[2] for r in second) == [1, 1, 1, 1]
+
+
+def test_choose_strategy_auto(monkeypatch):
+    config = Config(executor="auto", max_workers=4)
+    monkeypatch.setattr(executor, "free_threaded", lambda: False)
+    assert executor.choose_strategy(config, 10, 50_000) == "sequential"
+    assert executor.choose_strategy(config, 500, 4 * 1024 * 1024) == "threads"
+    assert executor.choose_strategy(config, 5000, 64 * 1024 * 1024) == "processes"
+    # Tokenizing costs more per byte, so processes pay off sooner
+    assert executor.choose_strategy(config.model_copy(update={"token_mode": True}), 500, 4 * 1024 * 1024) == "processes"
+    assert executor.choose_strategy(Config(executor="auto", max_workers=1), 5000, 64 * 1024 * 1024) == "sequential"
+
+    monkeypatch.setattr(executor, "free_threaded", lambda: True)
+    assert executor.choose_strategy(config, 5000, 64 * 1024 * 1024) == "threads"
+
+
+def test_explicit_strategy_overrides_flags():
+    assert executor.choose_strategy(Config(executor="threads", parallel=False), 1, 1) == "threads"
+    assert executor.configured_strategy(Config(parallel=True, use_multiprocessing=True)) == "processes"
+    assert executor.configured_strategy(Config()) == "sequential"
+
+    config = Config(executor="processes")
+    applied = executor.with_strategy(config, "processes")
+    assert applied.parallel and applied.use_multiprocessing
+    assert executor.with_strategy(applied, "processes") is applied
+
+
+def test_run_parallel_auto_records_strategy(tmp_path: Path):
+    f = tmp_path / "a.py"
+    f.write_text("def a(): pass\n")
+    tracker = PerformanceTracker(verbose=False)
+    results = list(run_parallel([f], process_file_ast, config=Config(executor="auto"), tracker=tracker))
+    assert len(results) == 1
+    assert tracker.metrics["Executor"] == "sequential"
+    assert not executor._pools  # Small scans never start a pool
+
+
+def test_process_timeout_isolates_straggler(tmp_path: Path):
+    files = [tmp_path / name for name in ("a.py", "slow.py", "b.py", "c.py")]
+    for f in files:
+        f.write_text("x = 1\n")
+    config = _process_config(chunk_size=4, task_timeout=0.3)
+    tracker = PerformanceTracker(verbose=False)
+    pool = executor.get_pool(config)
+
+    results = list(run_parallel(files, _slow_on_request, config=config, tracker=tracker))
+
+    skipped = [r[1] for r in results if r[1]]
+    assert skipped == [f"{tmp_path / 'slow.py'} (timed out after 0.3s)"]
+    assert sum(r[2] for r in results) == 3  # The chunk was retried file by file
+    assert tracker.metrics["Timed out files"] == 1
+    assert executor.get_pool(config) is not pool  # Workers were replaced
+
+
+def test_thread_timeout_abandons_file(tmp_path: Path, caplog):
+    files = [tmp_path / name for name in ("a.py", "slow.py", "b.py")]
+    for f in files:
+        f.write_text("x = 1\n")
+    config = Config(parallel=True, max_workers=2, task_timeout=0.2)
+
+    results = list(run_parallel(files, _slow_on_request, config=config, delay=1.0))
+
+    assert [r[1] for r in results if r[1]] == [f"{tmp_path / 'slow.py'} (timed out after 0.2s)"]
+    assert sum(r[2] for r in results) == 2
+    assert "cannot stop a thread" in caplog.text
+
+
+def test_auto_strategy_uses_processes_with_task_timeout(monkeypatch):
+    monkeypatch.setattr(executor, "free_threaded", lambda: True)
+    config = Config(executor="auto", max_workers=4)
+    assert executor.choose_strategy(config, 1000, 1024 * 1024) == "threads"
+    config.task_timeout = 5.0
+    assert executor.choose_strategy(config, 1000, 1024 * 1024) == "processes"
+    assert executor.choose_strategy(config, 1, 10) == "sequential"
+
+
+def test_max_memory_caps_workers():
+    budget = 3 * executor.WORKER_RSS_ESTIMATE
+    assert executor.resolve_workers(Config(max_workers=16, max_memory=budget)) == 3
+    assert executor.resolve_workers(Config(max_workers=2, max_memory=budget)) == 2
+    assert executor.resolve_workers(Config(max_workers=16, max_memory=1)) == 1
+
+
+def test_memory_budget_throttles_on_measured_rss(monkeypatch):
+    mib = 1024 * 1024
+    pool = type("Pool", (), {"_processes": {1: type("P", (), {"pid": 101})(), 2: type("P", (), {"pid": 102})()}})()
+    sizes = {None: 100 * mib, 101: 50 * mib, 102: 60 * mib}
+    monkeypatch.setattr(executor, "process_rss", lambda pid=None: sizes[pid])
+    monkeypatch.setattr(executor, "MEMORY_SAMPLE_SECONDS", 0.0)
+    budget = executor.MemoryBudget(Config(max_workers=4, max_memory=1024 * mib), pool)
+    assert budget.workers == 4 and budget.window(8) == 8  # (1024 - 100) / 60 leaves room for all four
+
+    sizes[102] = 400 * mib  # A worker grew
+    assert budget.limit() == 2
+    assert budget.window(8) == 2  # No queue-ahead while capped
+    assert "as few as 2 busy" in budget.summary()
+
+
+def test_memory_budget_without_worker_processes_uses_estimate(monkeypatch, caplog):
+    estimate = executor.WORKER_RSS_ESTIMATE
+    monkeypatch.setattr(executor, "process_rss", lambda pid=None: 2 * estimate)  # The parent uses half the budget
+    monkeypatch.setattr(executor, "MEMORY_SAMPLE_SECONDS", 0.0)
+    pool = object()  # A pool that does not expose its processes
+    budget = executor.MemoryBudget(Config(max_workers=4, max_memory=4 * estimate), pool)
+    assert budget.workers == 4
+    assert budget.limit() == 2
+    assert budget.limit() == 2
+    assert caplog.text.count("cannot measure worker RSS") == 1
+
+
+def test_run_parallel_with_memory_budget_recycles_workers(tmp_path: Path):
+    for i in range(6):
+        (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n    pass\n")
+    files = sorted(tmp_path.glob("*.py"))
+    config = _process_config(max_memory=1024 ** 3, chunk_size=1)
+    tracker = PerformanceTracker(verbose=False)
+    results = list(run_parallel(files, process_file_ast, config=config, tracker=tracker))
+
+    assert sorted(name for defs, _, _ in results for name in defs["def"]) == [f"f{i}" for i in range(6)]
+    assert executor.get_pool(config)._max_tasks_per_child == executor.WORKER_RECYCLE_TASKS
+    assert "Memory budget" in tracker.metrics
+
+
+_TIMEOUT_SCAN = """
+import sys, time
+from duplifinder import definition_finder
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.main import main
+
+def hang_on_slow(py_file, *args, **kwargs):
+    if py_file.name.startswith("slow"):
+        time.sleep(30)
+    return process_file_ast(py_file, *args, **kwargs)
+
+definition_finder.process_file_ast = hang_on_slow
+sys.argv = ["duplifinder", sys.argv[1], "--no-gitignore", "--parallel", "--use-multiprocessing", "--max-workers", "2", "--chunk-size", "1", "--task-timeout", "0.5", "--json"]
+main()
+"""
+
+
+def test_task_timeout_through_cli(tmp_path: Path):
+    # main() installs its cancel-on-SIGTERM handler: replacing a stuck worker must still just kill it
+    import json
+    import os
+    import subprocess
+    import sys
+
+    for i in range(20):
+        (tmp_path / f"mod{i}.py").write_text(f"def only_{i}():\n    return {i}\n")
+    (tmp_path / "slow.py").write_text("x = 1\n")
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": str(src)}
+    started = time.monotonic()
+    scan = subprocess.run([sys.executable, "-c", _TIMEOUT_SCAN, str(tmp_path)], env=env, capture_output=True, text=True, timeout=60)
+    assert scan.returncode == 0, scan.stderr
+    assert "Traceback" not in scan.stderr
+    assert time.monotonic() - started < 20
+    report = json.loads(scan.stdout[scan.stdout.index("{"):])
+    assert report["scanned_files"] == 20
+    assert report["skipped_files"] == [f"{tmp_path / 'slow.py'} (timed out after 0.5s)"]
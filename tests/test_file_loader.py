@@ -0,0 +1,114 @@
+# tests/test_file_loader.py
+
+"""Tests for the read-once source loader."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+from duplifinder import file_loader
+from duplifinder.cache import CacheManager
+from duplifinder.file_loader import SourceFile
+
+
+def test_source_file_single_open(tmp_path: Path):
+    """Test that sniff, digest, encoding and decode all use one open of the file."""
+    py_file = tmp_path / "mod.py"
+    py_file.write_bytes(b"# -*- coding: latin-1 -*-\ndef caf\xe9(): pass\r\n")
+
+    original_open = open
+    with patch("builtins.open", side_effect=original_open) as mock_open:
+        with SourceFile.load(py_file) as source:
+            assert source.looks_like_python()
+            digest = source.digest()
+            assert source.encoding == "iso-8859-1"
+            text = source.text()
+    assert mock_open.call_count == 1
+
+    assert text == "# -*- coding: latin-1 -*-\ndef caf\u00e9(): pass\n"  # Universal newlines
+    assert digest == CacheManager.compute_hash(py_file)
+
+
+def test_source_file_bom_and_lines(tmp_path: Path):
+    """Test BOM stripping and newline-only line splitting (form feeds stay inside lines)."""
+    py_file = tmp_path / "bom.py"
+    py_file.write_bytes(b"\xef\xbb\xbfclass A:\n    x = '\x0c'\n")
+
+    with SourceFile.load(py_file) as source:
+        assert source.text().startswith("class A:")
+        assert source.lines() == ["class A:\n", "    x = '\x0c'\n"]
+
+
+def test_source_file_sniff_rejects_plain_text(tmp_path: Path):
+    """Test the header sniff on the shared buffer."""
+    txt = tmp_path / "notes.py"
+    txt.write_text("just words")
+    with SourceFile.load(txt) as source:
+        assert not source.looks_like_python()
+
+
+def test_source_file_mmap_for_large_files(tmp_path: Path):
+    """Test files over the threshold are memory-mapped and still decode/hash identically."""
+    big = tmp_path / "big.py"
+    big.write_text("def f(): pass\n" * 100)
+
+    with patch.object(file_loader, "MMAP_THRESHOLD", 64):
+        source = SourceFile.load(big)
+    try:
+        assert not isinstance(source.data, bytes)
+        assert source.text().count("def f()") == 100
+        assert source.digest() == CacheManager.compute_hash(big)
+    finally:
+        source.close()
+
+
+def test_source_file_maps_files_over_max_bytes(tmp_path: Path):
+    """Test files over the caller's byte limit are mapped and streamed line by line."""
+    big = tmp_path / "big.py"
+    big.write_bytes(b"def f(): pass\r\n" * 50 + b"x = 1")
+
+    with SourceFile.load(big, max_bytes=100) as source:
+        assert not isinstance(source.data, bytes)
+        assert source.line_count() == 51
+        lines = list(source.iter_lines())
+    assert len(lines) == 51
+    assert lines[0] == "def f(): pass\n"
+    assert lines[-1] == "x = 1"
+
+
+def test_source_file_generated_and_minified(tmp_path: Path):
+    """Test the cheap generated/minified byte heuristics."""
+    pb2 = tmp_path / "api_pb2.py"
+    pb2.write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\ndef f(): pass\n")
+    minified = tmp_path / "bundle.py"
+    minified.write_text("x=[" + ",".join(["1"] * 2000) + "]\n")
+    normal = tmp_path / "mod.py"
+    normal.write_text("def f():\n    return 1\n" * 100)
+
+    with SourceFile.load(pb2) as source:
+        assert source.looks_generated()
+    with SourceFile.load(minified) as source:
+        assert not source.looks_generated()
+        assert source.looks_minified()
+    with SourceFile.load(normal) as source:
+        assert not source.looks_generated()
+        assert not source.looks_minified()
+
+
+def test_generated_banner_only_in_leading_comments(tmp_path: Path):
+    """Only banner lines in the leading comment block mark a file as generated."""
+    banners = [
+        "#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n# @generated by tools/gen.py\n",
+        "# Code generated by protoc-gen-x. DO NOT EDIT.\n",
+        "# Autogenerated by Thrift Compiler (0.9.3)\n",
+    ]
+    mentions = [
+        '"""Maps each auto-generated id to its row. Do not edit the ids by hand."""\n',
+        "# Helpers for ids\nx = 1\n# @generated\n",
+        "# Please do not edit the table below\n",
+        "def f():\n    # Code generated by hand, DO NOT EDIT is a joke here\n    pass\n",
+    ]
+    for i, head in enumerate(banners + mentions):
+        path = tmp_path / f"mod{i}.py"
+        path.write_text(head + "def f(): pass\n")
+        with SourceFile.load(path) as source:
+            assert source.looks_generated() == (i < len(banners)), head
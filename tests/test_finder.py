@@ -128,14 +128,15 @@ def test_find_definitions(mock_config: Config, caplog):
     # Mock the dependencies
     mock_discover = patch("duplifinder.definition_finder.discover_py_files", return_value=[Path("a.py")])
 
-    # Mock the result from the parallel runner
-    mock_run_parallel = patch(
-        "duplifinder.definition_finder.run_parallel",
-        return_value=[
+    # Mock the parallel runner: one combined partial for the batch, as a worker would return
+    def fake_run_parallel(py_files, process_fn, *, config, combine, **kwargs):
+        results = [
             ({"class": {"MyClass": [("a.py:1", "snippet")]}}, None, 5), # Successful
             (None, "b.py", 0),                                         # Skipped
         ]
-    )
+        return [combine([Path("a.py"), Path("b.py")], results, config)]
+
+    mock_run_parallel = patch("duplifinder.definition_finder.run_parallel", side_effect=fake_run_parallel)
 
     with mock_discover, mock_run_parallel:
         results, skipped, scanned, total_lines, dup_lines = find_definitions(mock_config)
@@ -148,6 +149,20 @@ def test_find_definitions(mock_config: Config, caplog):
     assert results["class"]["MyClass"] == [("a.py:1", "snippet")]
     assert "Scanned 1 files, skipped 1" in caplog.text
 
+def test_find_definitions_across_roots(tmp_path: Path):
+    """Test that duplicates spanning two roots land in one index."""
+    for svc in ("billing", "orders"):
+        (tmp_path / svc).mkdir()
+        (tmp_path / svc / "client.py").write_text(f"class HttpClient:\n    service = '{svc}'\n")
+    config = Config(root=tmp_path / "billing", roots=[tmp_path / "billing", tmp_path / "orders"], use_git_index=False)
+
+    results, skipped, scanned, _, _ = find_definitions(config)
+
+    assert scanned == 2
+    locations = [loc for loc, _ in results["class"]["HttpClient"]]
+    assert [Path(loc.rsplit(":", 1)[0]).parent.name for loc in locations] == ["billing", "orders"]
+
+
 def test_find_search_matches(mock_config: Config, caplog):
     """Test the find_search_matches function's core logic."""
     mock_config.verbose = True
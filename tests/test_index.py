@@ -0,0 +1,93 @@
+# tests/test_index.py
+
+"""Tests for the mergeable definition index and the worker-side combine."""
+
+import functools
+import pickle
+from pathlib import Path
+
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.config import Config
+from duplifinder.index import DefinitionIndex, combine_definitions
+from duplifinder.utils import run_parallel
+
+
+def test_add_and_merge():
+    config = Config()
+    left = combine_definitions(
+        [Path("a.py"), Path("b.py")],
+        [({"def": {"f": [("a.py:1", "")]}}, None, 3), ({}, "b.py", 0)],
+        config,
+    )
+    right = combine_definitions([Path("c.py"), Path("d.py")], [({"def": {"f": [("c.py:4", "")]}}, None, 7), (None, None, 0)], config)
+
+    index = DefinitionIndex(config.types_to_search)
+    index.merge(left)
+    index.merge(right)
+
+    assert index.definitions["def"]["f"] == [("a.py:1", ""), ("c.py:4", "")]
+    assert index.definitions["class"] == {}
+    assert index.skipped == ["b.py"]
+    assert (index.scanned, index.total_lines) == (2, 10)
+
+
+def test_combine_expands_identical_copies():
+    rep, copy = Path("a.py"), Path("vendor/a.py")
+    index = combine_definitions([rep], [({"def": {"f": [("a.py:1", "")]}}, None, 4)], Config(), clones={rep: [copy]})
+    assert index.scanned == 2
+    assert index.total_lines == 8
+    assert index.definitions["file"]["a.py"] == [("a.py:1", ""), ("vendor/a.py:1", "")]
+
+
+def _sample_index() -> DefinitionIndex:
+    paths = [Path(f"/home/dev/projects/service/src/package/module_{i}.py") for i in range(20)]
+    results = [
+        ({"def": {f"func_{i}_{j}": [(f"{p}:{10 * j + 1}", "def f(): ..." if j == 0 else "")] for j in range(15)}}, None, 150)
+        for i, p in enumerate(paths)
+    ]
+    return combine_definitions(paths, results, Config())
+
+
+def test_pickle_is_compact_and_decodes_lazily():
+    index = _sample_index()
+    plain = pickle.dumps({t: dict(n) for t, n in index.definitions.items()})
+    payload = pickle.dumps(index)
+    assert len(payload) < len(plain) / 2
+
+    restored = pickle.loads(payload)
+    assert restored._definitions is None  # Still packed
+    assert restored.definitions == index.definitions
+    assert (restored.scanned, restored.total_lines) == (index.scanned, index.total_lines)
+
+    target = DefinitionIndex()
+    target.merge(pickle.loads(payload))
+    assert target.definitions == index.definitions
+
+
+def test_pickle_keeps_empty_types():
+    restored = pickle.loads(pickle.dumps(DefinitionIndex({"class", "def"})))
+    assert restored.definitions == {"class": {}, "def": {}}
+
+
+def test_pickle_falls_back_for_unusual_locations():
+    index = combine_definitions([Path("a.py")], [({"def": {"f": [("<stdin>", "")]}}, None, 1)], Config())
+    assert pickle.loads(pickle.dumps(index)).definitions == {"def": {"f": [("<stdin>", "")]}}
+
+
+def test_process_workers_return_one_partial_per_chunk(tmp_path: Path):
+    files = []
+    for i in range(6):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(f"def shared(): pass\ndef f{i}(): pass\n")
+        files.append(f)
+    config = Config(parallel=True, use_multiprocessing=True, max_workers=2, chunk_size=3)
+    combine = functools.partial(combine_definitions, clones={})
+
+    partials = list(run_parallel(files, process_file_ast, config=config, combine=combine))
+
+    assert len(partials) == 2
+    index = DefinitionIndex()
+    for partial in partials:
+        index.merge(partial)
+    assert index.scanned == 6
+    assert len(index.definitions["def"]["shared"]) == 6
@@ -17,7 +17,7 @@ def mock_sys_exit(code=0):
 def test_main_default_run(monkeypatch, capsys):
     """Test default run: no dups → exit 0."""
     monkeypatch.setattr(sys, 'argv', ['duplifinder', '.'])
-    mock_config = Mock(search_mode=False, pattern_regexes=[], token_mode=False, audit_enabled=False, watch_mode=False)
+    mock_config = Mock(search_mode=False, pattern_regexes=[], token_mode=False, shard=None, audit_enabled=False, watch_mode=False)
     mock_config.root = Path('.')
     mock_config.ignore_dirs = set()
     mock_config.extensions = [] # Fixed: Added extensions
@@ -46,7 +46,7 @@ def test_main_scan_fail_high_skips(monkeypatch):
     """Test >10% skips → exit 3."""
     monkeypatch.setattr(sys, 'argv', ['duplifinder', '.'])
     # FIXED: Added audit_enabled=False
-    mock_config = Mock(search_mode=False, pattern_regexes=[], token_mode=False, audit_enabled=False, watch_mode=False)
+    mock_config = Mock(search_mode=False, pattern_regexes=[], token_mode=False, shard=None, audit_enabled=False, watch_mode=False)
     mock_config.root = Path('.')
     mock_config.ignore_dirs = set()
     mock_config.extensions = [] # Fixed: Added extensions
@@ -61,6 +61,24 @@ def test_main_scan_fail_high_skips(monkeypatch):
         assert exc.value.code == 3  # High skip rate
 
 
+def test_main_policy_skips_do_not_fail_scan(monkeypatch):
+    """Test files skipped by the large/generated file policy do not count toward the skip rate."""
+    monkeypatch.setattr(sys, 'argv', ['duplifinder', '.'])
+    mock_config = Mock(search_mode=False, pattern_regexes=[], token_mode=False, shard=None, audit_enabled=False, watch_mode=False, fail_on_duplicates=False)
+    mock_config.root = Path('.')
+    mock_config.dup_threshold = 0.1
+    nested_empty = {'class': {}, 'def': {}, 'async_def': {}}
+    skipped = [f"gen{i}_pb2.py (skipped by policy: generated)" for i in range(11)]
+
+    with patch('duplifinder.main.build_config', return_value=mock_config), \
+         patch('duplifinder.application.find_definitions', return_value=(nested_empty, skipped, 1, 10, 0)), \
+         patch('duplifinder.application.render_duplicates'), \
+         patch('sys.exit', side_effect=mock_sys_exit):
+        with pytest.raises(SystemExit) as exc:
+            main()
+        assert exc.value.code == 0
+
+
 def test_main_fail_on_dups(monkeypatch):
     """Test dups with --fail → exit 1."""
     monkeypatch.setattr(sys, 'argv', ['duplifinder', '.', '--fail'])
@@ -36,6 +36,7 @@ def test_render_search_json(capsys):
     """Test JSON search output."""
     config = Mock(spec=Config, verbose=True, search_specs=[])
     config.root = Path('.')
+    config.scan_roots = [config.root]
     results = {'class UIManager': [('file.py:1', 'snippet')]}
 
     # Call the function directly, capsys will capture the print
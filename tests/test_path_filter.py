@@ -0,0 +1,69 @@
+# tests/test_path_filter.py
+
+"""Tests for the compiled path filter."""
+
+import pytest
+from duplifinder.path_filter import (
+    EXCLUDE_PATTERN,
+    GITIGNORE,
+    IGNORE_DIR,
+    GitignoreRules,
+    PathFilter,
+    compile_gitignore_pattern,
+)
+
+
+def test_compile_gitignore_pattern_skips_blank_and_comments():
+    """Test that comments and blank lines produce no rule."""
+    assert compile_gitignore_pattern("") is None
+    assert compile_gitignore_pattern("# comment") is None
+    assert compile_gitignore_pattern("\\#literal") is not None
+
+
+def test_gitignore_negation_last_match_wins():
+    """Test .gitignore negation: the last matching rule decides, as in git."""
+    rules = GitignoreRules(["logs/*.log", "!logs/important.log"])
+
+    assert rules.match("logs/test.log", is_dir=False) is True
+    assert rules.match("logs/important.log", is_dir=False) is False
+    assert rules.match("src/app.py", is_dir=False) is None
+
+
+@pytest.mark.parametrize("pattern,path,is_dir,expected", [
+    ("/build/", "build", True, True),
+    ("/build/", "pkg/build", True, None),      # Anchored to the .gitignore directory
+    ("build/", "build", False, None),          # Directory-only rule ignores plain files
+    ("build/", "build/out.py", False, True),   # ...but covers files below the directory
+    ("*.pyc", "a/b/c.pyc", False, True),       # Unanchored rules match at any depth
+    ("docs/**/gen", "docs/a/b/gen", False, True),
+    ("**/tmp", "x/y/tmp", True, True),
+    ("data?.py", "data1.py", False, True),
+    ("data[!0-9].py", "data1.py", False, None),
+])
+def test_gitignore_rule_shapes(pattern, path, is_dir, expected):
+    """Test anchored, directory-only, wildcard and character-class rules."""
+    assert GitignoreRules([pattern]).match(path, is_dir) is expected
+
+
+def test_path_filter_reasons_and_nested_precedence():
+    """Test exclusion reasons and that deeper .gitignore files override their parents."""
+    path_filter = PathFilter(ignore_dirs={"node_modules"}, exclude_patterns={"*_pb2.py", "*/migrations/*"})
+    path_filter.add_gitignore("", ["*.log"])
+    path_filter.add_gitignore("pkg", ["!keep.log"])
+
+    assert path_filter.exclusion_reason("node_modules", is_dir=True) == IGNORE_DIR
+    assert path_filter.exclusion_reason("api_pb2.py") == EXCLUDE_PATTERN
+    assert path_filter.exclusion_reason("app/migrations/0001.py") == EXCLUDE_PATTERN
+    assert path_filter.exclusion_reason("debug.log") == GITIGNORE
+    assert path_filter.exclusion_reason("pkg/keep.log") is None
+    assert path_filter.exclusion_reason("pkg/app.py") is None
+
+
+def test_path_exclusion_reason_checks_parents():
+    """Test that a file is excluded when any parent directory is."""
+    path_filter = PathFilter(ignore_dirs={".venv"})
+    path_filter.add_gitignore("", ["/generated/"])
+
+    assert path_filter.path_exclusion_reason(".venv/lib/site.py") == IGNORE_DIR
+    assert path_filter.path_exclusion_reason("generated/api.py") == GITIGNORE
+    assert path_filter.path_exclusion_reason("src/api.py") is None
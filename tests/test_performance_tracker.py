@@ -74,3 +74,13 @@ def test_tracker_lifecycle_non_verbose(mock_tracemalloc, mock_time, mock_console
 
     tracker.print_metrics()
     mock_console.return_value.print.assert_not_called()
+
+
+def test_tracker_records_run_metrics(capsys):
+    tracker = PerformanceTracker(verbose=True)
+    tracker.record("Task chunks", 12)
+    tracker.print_metrics()
+    assert "Task chunks" in capsys.readouterr().out
+
+    tracker.reset()
+    assert tracker.metrics == {}
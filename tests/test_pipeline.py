@@ -0,0 +1,97 @@
+# tests/test_pipeline.py
+
+"""Tests for the staged scan pipeline."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from duplifinder import pipeline
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.utils import PerformanceTracker, discover_py_files
+
+
+def _make_tree(root: Path) -> None:
+    for i in range(40):
+        pkg = root / f"pkg{i % 4}"
+        pkg.mkdir(exist_ok=True)
+        (pkg / f"mod{i}.py").write_text(f"def shared():\n    pass\n\ndef only_{i}():\n    pass\n")
+    (root / "pkg0" / "copy_a.py").write_text("class Twin:\n    pass\n")
+    (root / "pkg1" / "copy_b.py").write_text("class Twin:\n    pass\n")
+    (root / "pkg2" / "broken.py").write_text("def broken(:\n")
+
+
+def _sorted(results):
+    return {t: {n: sorted(items) for n, items in names.items()} for t, names in results.items()}
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_pipeline_matches_batch_scan(tmp_path: Path, processes: bool):
+    _make_tree(tmp_path)
+    base = dict(root=tmp_path, parallel=True, use_multiprocessing=processes, max_workers=2, use_git_index=False)
+
+    batch = find_definitions(Config(**base))
+    tracker = PerformanceTracker(verbose=False)
+    staged = find_definitions(Config(pipeline=True, **base), tracker=tracker)
+
+    assert _sorted(staged[0]) == _sorted(batch[0])
+    assert sorted(staged[1]) == sorted(batch[1])
+    assert staged[2:] == batch[2:]
+    assert len(staged[0]["file"]) == 1  # The identical pair was parsed once
+    for stage in ("discover", "read", "parse", "merge"):
+        assert f"Stage {stage}" in tracker.metrics
+
+
+def test_pipeline_representative_is_first_discovered_copy(tmp_path: Path, monkeypatch):
+    for name in ("twin_a.py", "twin_b.py", "twin_c.py"):
+        (tmp_path / name).write_text("class Twin:\n    pass\n")
+    for name in ("bad_a.py", "bad_b.py"):
+        (tmp_path / name).write_text("def broken(:\n")
+    base = dict(root=tmp_path, parallel=True, max_workers=2, use_git_index=False, respect_gitignore=False)
+    batch = find_definitions(Config(**base))
+    order = discover_py_files(Config(**base))
+    firsts = {min((p for p in order if p.name.startswith(prefix)), key=order.index) for prefix in ("twin", "bad")}
+
+    load = pipeline.ScanPipeline._load
+
+    def slow_first_copies(self, path):
+        if path in firsts:
+            time.sleep(0.3)  # The other readers get to a later copy first
+        return load(self, path)
+
+    monkeypatch.setattr(pipeline.ScanPipeline, "_load", slow_first_copies)
+    staged = find_definitions(Config(pipeline=True, executor="threads", **base))
+
+    assert _sorted(staged[0]) == _sorted(batch[0])
+    assert sorted(staged[1]) == sorted(batch[1])
+    assert staged[2:] == batch[2:]
+
+
+def test_pipeline_logs_parse_strategy(tmp_path: Path, caplog):
+    _make_tree(tmp_path)
+    tracker = PerformanceTracker(verbose=False)
+    with caplog.at_level("INFO"):
+        find_definitions(Config(root=tmp_path, pipeline=True, max_workers=1, use_git_index=False), tracker=tracker)
+    assert "Pipeline parse pool: threads (1 workers) for a sequential config" in caplog.text
+    assert tracker.metrics["Executor"] == "threads"
+
+
+def test_pipeline_reports_stage_errors(tmp_path: Path, monkeypatch):
+    _make_tree(tmp_path)
+
+    def failing_discovery(config):
+        yield tmp_path / "pkg0" / "mod0.py"
+        raise OSError("disk vanished")
+
+    monkeypatch.setattr(pipeline, "iter_py_files", failing_discovery)
+    with pytest.raises(OSError, match="disk vanished"):
+        find_definitions(Config(root=tmp_path, pipeline=True, parallel=True, max_workers=2))
+
+
+def test_stage_stats_summary():
+    stats = pipeline.StageStats("read", capacity=16)
+    stats.add(items=3, idle=0.5, depth=4)
+    stats.add(items=2, blocked=0.25, depth=2)
+    assert stats.summary() == "5 items, idle 0.50s, blocked 0.25s, max queue 4/16"
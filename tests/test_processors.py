@@ -10,7 +10,8 @@ from duplifinder.ast_processor import process_file_ast
 from duplifinder.text_processor import process_file_text
 from duplifinder.token_processor import process_file_tokens, tokenize_block
 from duplifinder.config import Config
-from duplifinder.processor_utils import estimate_dup_lines
+from duplifinder.processor_utils import estimate_dup_lines, is_policy_skip
+from duplifinder.utils import discover_py_files
 
 import logging
 import tokenize
@@ -33,10 +34,10 @@ def test_process_file_ast_invalid(invalid_py_file, mock_config):
 
 
 def test_process_file_ast_exclude(mock_config, sample_py_file):
-    """Test exclude_patterns skips files."""
+    """Test exclude_patterns are resolved in discovery, so excluded files never reach processors."""
+    mock_config.root = sample_py_file.parent
     mock_config.exclude_patterns = {"test.py"}
-    defs, skipped, lines = process_file_ast(sample_py_file, mock_config)
-    assert skipped == str(sample_py_file)
+    assert sample_py_file not in discover_py_files(mock_config)
 
 
 def test_process_file_ast_exclude_names(mock_config, sample_py_file):
@@ -67,7 +68,7 @@ def test_process_file_text_match(sample_py_file, mock_config):
 def test_process_file_text_no_match(tmp_path: Path, mock_config):
     """Test no matches returns empty."""
     py_file = tmp_path / "no_match.py"
-    py_file.write_text("No item here")  # <-- FIXED: Changed text
+    py_file.write_text("class Item: pass")  # Python markers, so the header sniff accepts it
     patterns = [re.compile("match")]
     matches, skipped, lines = process_file_text(py_file, patterns, mock_config)
     assert matches == {}
@@ -130,7 +131,7 @@ def test_process_file_ast_unicode_error(tmp_path: Path, mock_config: Config, cap
     py_file = tmp_path / "test.py"
     py_file.write_text("pass") # Content doesn't matter, mock will raise
 
-    with patch("tokenize.open", side_effect=UnicodeDecodeError("utf-8", b"", 0, 1, "test error")):
+    with patch("builtins.open", side_effect=UnicodeDecodeError("utf-8", b"", 0, 1, "test error")):
         defs, skipped, lines = process_file_ast(py_file, mock_config)
 
     assert skipped == str(py_file)
@@ -142,7 +143,7 @@ def test_process_file_ast_generic_error(tmp_path: Path, mock_config: Config, cap
     py_file = tmp_path / "test.py"
     py_file.write_text("pass")
 
-    with patch("tokenize.open", side_effect=IOError("Disk full")):
+    with patch("builtins.open", side_effect=IOError("Disk full")):
         defs, skipped, lines = process_file_ast(py_file, mock_config)
 
     assert skipped == str(py_file)
@@ -150,16 +151,15 @@ def test_process_file_ast_generic_error(tmp_path: Path, mock_config: Config, cap
     assert "OSError: Disk full" in caplog.text
 
 def test_process_file_text_exclude(tmp_path: Path, mock_config: Config, caplog):
-    """Test text processor respects exclude_patterns."""
+    """Test files matching exclude_patterns are dropped in discovery for text mode."""
     caplog.set_level(logging.INFO)  # <-- ** FIX 1: ADD THIS LINE **
+    mock_config.root = tmp_path
     mock_config.exclude_patterns = {"test.py"}
     mock_config.verbose = True
     py_file = tmp_path / "test.py"
     py_file.write_text("TODO")
 
-    matches, skipped, lines = process_file_text(py_file, [], mock_config)
-
-    assert skipped == str(py_file)
+    assert discover_py_files(mock_config) == []
     assert "matches exclude pattern" in caplog.text
 
 def test_process_file_text_unicode_error(tmp_path: Path, mock_config: Config, caplog):
@@ -192,16 +192,16 @@ def test_tokenize_block_token_error():
     assert tokens == [] # Should fail gracefully and return empty list
 
 def test_process_file_tokens_exclude(tmp_path: Path, mock_config: Config, caplog):
-    """Test token processor respects exclude_patterns."""
+    """Test files matching exclude_patterns are dropped in discovery for token mode."""
     caplog.set_level(logging.INFO)  # <-- ** FIX 2: ADD THIS LINE **
-    mock_config.exclude_patterns = {"test.py"}
+    mock_config.root = tmp_path
+    mock_config.exclude_patterns = {"*/test.py"}
     mock_config.verbose = True
-    py_file = tmp_path / "test.py"
+    (tmp_path / "pkg").mkdir()
+    py_file = tmp_path / "pkg" / "test.py"
     py_file.write_text("def a(): pass")
 
-    sim, skipped, lines = process_file_tokens(py_file, mock_config)
-
-    assert skipped == str(py_file)
+    assert discover_py_files(mock_config) == []
     assert "matches exclude pattern" in caplog.text
 
 def test_process_file_tokens_unicode_error(tmp_path: Path, mock_config: Config, caplog):
@@ -226,3 +226,74 @@ def test_process_file_tokens_generic_error(tmp_path: Path, mock_config: Config,
     assert skipped == str(py_file)
     # FIXED: IOError is OSError
     assert "OSError: Disk full" in caplog.text
+
+
+def test_process_file_ast_skips_generated(tmp_path: Path, mock_config: Config):
+    """Test generated files are reported in the skipped list with their reason."""
+    pb2 = tmp_path / "api_pb2.py"
+    pb2.write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\nclass Msg: pass\n")
+    defs, skipped, lines = process_file_ast(pb2, mock_config)
+    assert skipped == f"{pb2} (skipped by policy: generated)"
+    assert is_policy_skip(skipped)
+    assert lines == 0
+
+    mock_config.skip_generated = False
+    defs, skipped, _ = process_file_ast(pb2, mock_config)
+    assert skipped is None
+    assert "Msg" in defs["class"]
+
+
+def test_process_file_ast_large_file_policy(tmp_path: Path, mock_config: Config):
+    """Test files over the line limit are skipped, or streamed with a line-based scan."""
+    big = tmp_path / "big.py"
+    big.write_text("class Big:\n    def method(self):\n        pass\n\n\nasync def top():\n    pass\n")
+    mock_config.max_file_lines = 3
+
+    _, skipped, _ = process_file_ast(big, mock_config)
+    assert skipped == f"{big} (skipped by policy: more than 3 lines)"
+
+    mock_config.large_file_mode = "stream"
+    with patch("duplifinder.ast_processor.ast.parse", side_effect=AssertionError("parsed")):
+        defs, skipped, lines = process_file_ast(big, mock_config)
+    assert skipped is None
+    assert lines == 7
+    assert defs["class"]["Big"] == [(f"{big}:1", "")]
+    assert defs["def"]["Big.method"] == [(f"{big}:2", "")]
+    assert defs["async_def"]["top"] == [(f"{big}:6", "")]
+
+
+def test_process_file_text_and_tokens_large_file_policy(tmp_path: Path, mock_config: Config):
+    """Test text mode streams oversized files while token mode skips them."""
+    big = tmp_path / "big.py"
+    big.write_text("def a(): pass\n" * 20)
+    mock_config.max_file_bytes = 100
+    mock_config.large_file_mode = "stream"
+
+    matches, skipped, lines = process_file_text(big, [re.compile(r"def a")], mock_config)
+    assert skipped is None
+    assert lines == 20
+    assert len(matches["def a"]) == 20
+
+    _, skipped, _ = process_file_tokens(big, mock_config)
+    assert skipped == f"{big} (skipped by policy: larger than 100 bytes)"
+
+
+def test_text_and_tokens_read_undeclared_latin1_as_utf8(tmp_path: Path, mock_config: Config):
+    """Test non-UTF-8 files without a coding cookie are still scanned (utf-8, undecodable bytes replaced)."""
+    latin1 = tmp_path / "legacy.py"
+    latin1.write_bytes('# café\ndef a():\n    return "TODO é"\n\ndef b():\n    return "TODO é"\n'.encode("latin-1"))
+
+    matches, skipped, lines = process_file_text(latin1, [re.compile("TODO")], mock_config)
+    assert skipped is None
+    assert lines == 6
+    assert matches["TODO"] == [f"{latin1}:3", f"{latin1}:6"]
+
+    _, skipped, lines = process_file_tokens(latin1, mock_config)
+    assert skipped is None
+    assert lines == 6
+
+    mock_config.max_file_bytes = 10
+    mock_config.large_file_mode = "stream"
+    matches, skipped, _ = process_file_text(latin1, [re.compile("TODO")], mock_config)
+    assert skipped is None
+    assert len(matches["TODO"]) == 2
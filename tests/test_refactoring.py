@@ -21,3 +21,8 @@ def test_async_function_duplication_suggestion():
 def test_token_duplication_suggestion():
     suggestion = get_refactoring_suggestion("token", 2)
     assert "Refactor the similar logic into a shared function" in suggestion
+
+def test_file_duplication_suggestion():
+    suggestion = get_refactoring_suggestion("file vendor/six.py", 4)
+    assert "Keep one copy of 'vendor/six.py'" in suggestion
+    assert "3 identical copies" in suggestion
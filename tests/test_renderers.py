@@ -20,6 +20,15 @@ def test_render_duplicates_empty(capsys, mock_config):
     assert "No duplicates found" in captured.out
 
 
+def test_render_duplicates_counts_policy_skips(capsys, mock_config):
+    from duplifinder.processor_utils import policy_skip_entry
+
+    mock_config.json_output = False
+    skipped = [policy_skip_entry("big.py", "larger than 100 bytes"), policy_skip_entry("gen_pb2.py", "generated"), "broken.py (SyntaxError)"]
+    render_duplicates({}, mock_config, False, 0.0, 0.1, 0, 0, 0, skipped)
+    assert "Skipped 2 large or generated file(s) by policy" in capsys.readouterr().out
+
+
 def test_render_duplicates_alert(capsys, mock_config):
     """Test dup rate alert."""
     mock_config.dup_threshold = 0.1
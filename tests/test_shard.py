@@ -0,0 +1,123 @@
+# tests/test_shard.py
+
+"""Tests for sharded scans: path-hash split, partial index files and merge."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from duplifinder.config import Config
+from duplifinder.definition_finder import find_definitions
+from duplifinder.exceptions import ConfigError, DuplifinderError
+from duplifinder.main import main
+from duplifinder.shard import merge_partials, write_partial
+from duplifinder.utils import discover_py_files, shard_of
+
+
+@pytest.fixture
+def sharded_tree(tmp_path: Path) -> Path:
+    for i in range(12):
+        pkg = tmp_path / f"pkg{i % 3}"
+        pkg.mkdir(exist_ok=True)
+        (pkg / f"mod{i}.py").write_text(f"class Shared:\n    pass\n\ndef helper():\n    return {i}\n\ndef only_{i}():\n    pass\n")
+    return tmp_path
+
+
+def _config(root: Path, **kwargs) -> Config:
+    return Config(root=root, respect_gitignore=False, **kwargs)
+
+
+def _write_shards(root: Path, out_dir: Path, count: int):
+    paths = []
+    for k in range(1, count + 1):
+        config = _config(root, shard=(k, count))
+        path = out_dir / f"part{k}.json"
+        write_partial(path, config, *find_definitions(config))
+        paths.append(path)
+    return paths
+
+
+def test_shards_partition_discovery(sharded_tree):
+    everything = {str(p) for p in discover_py_files(_config(sharded_tree))}
+    shards = [{str(p) for p in discover_py_files(_config(sharded_tree, shard=(k, 3)))} for k in (1, 2, 3)]
+
+    assert set().union(*shards) == everything
+    assert sum(len(s) for s in shards) == len(everything)
+    # Assignment depends only on the root-relative path
+    assert shard_of("pkg0/mod0.py", 3) == shard_of("pkg0/mod0.py", 3)
+
+
+def test_merged_partials_match_unsharded_scan(sharded_tree, tmp_path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    definitions, skipped, scanned, total_lines, dup_lines = find_definitions(_config(sharded_tree))
+
+    scan, index = merge_partials(list(reversed(_write_shards(sharded_tree, out_dir, 3))))
+
+    assert scan == {"roots": [str(sharded_tree)], "types": ["async_def", "class", "def"], "shards": 3}
+    assert {t: {n: sorted(locs) for n, locs in m.items()} for t, m in index.definitions.items()} == {
+        t: {n: sorted(locs) for n, locs in m.items()} for t, m in definitions.items()
+    }
+    assert (index.skipped, index.scanned, index.total_lines, index.dup_lines) == (skipped, scanned, total_lines, dup_lines)
+
+
+def test_merge_with_copies_split_across_shards(tmp_path):
+    """Identical files in different shards: the merged index lists each copy, as an undeduplicated scan does."""
+    root = tmp_path / "src"
+    root.mkdir()
+    body = "class Copied:\n    pass\n\ndef copied():\n    return 1\n"
+    for name in ("a.py", "b.py", "c.py"):
+        (root / name).write_text(body)
+    # Two copies share a shard, the third is hashed into the other one
+    assert shard_of("a.py", 2) == shard_of("b.py", 2) != shard_of("c.py", 2)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    _, index = merge_partials(_write_shards(root, out_dir, 2))
+    definitions, skipped, scanned, total_lines, dup_lines = find_definitions(_config(root, dedupe_files=False))
+
+    assert sorted(index.definitions["class"]["Copied"]) == sorted(definitions["class"]["Copied"])
+    assert len(index.definitions["class"]["Copied"]) == 3
+    assert "file" not in index.definitions
+    assert (index.scanned, index.total_lines, index.dup_lines) == (scanned, total_lines, dup_lines)
+
+
+def test_merge_rejects_incomplete_or_mixed_shards(sharded_tree, tmp_path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    first, second, third = _write_shards(sharded_tree, out_dir, 3)
+
+    with pytest.raises(DuplifinderError, match="Missing shard"):
+        merge_partials([first, third])
+    with pytest.raises(DuplifinderError, match="given twice"):
+        merge_partials([first, second, third, second])
+    (other,) = _write_shards(sharded_tree, tmp_path, 1)
+    with pytest.raises(DuplifinderError, match="not from the same"):
+        merge_partials([first, second, third, other])
+
+
+def test_shard_requires_definition_mode():
+    with pytest.raises(ConfigError):
+        Config(token_mode=True, shard=(1, 2))
+    with pytest.raises(ConfigError):
+        Config(shard=(3, 2))
+
+
+def test_main_shard_then_merge(sharded_tree, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("duplifinder.main.print_logo", lambda: None)
+    for k in (1, 2):
+        monkeypatch.setattr(sys, "argv", ["duplifinder", str(sharded_tree), "--no-gitignore", "--shard", f"{k}/2"])
+        with pytest.raises(SystemExit) as exc:
+            main()
+        assert exc.value.code == 0
+    assert "partial index written to .duplifinder_shard_2_of_2.json" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["duplifinder", "merge", ".duplifinder_shard_1_of_2.json", ".duplifinder_shard_2_of_2.json", "--json"])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["scanned_files"] == 12
+    assert len(report["duplicates"]["class Shared"]) == 12
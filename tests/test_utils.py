@@ -1,19 +1,37 @@
 # tests/test_utils.py
 
+import concurrent.futures
 import pytest
 from pathlib import Path
 import json
+import threading
+import time
+import shutil
+import subprocess
 import logging
 from unittest.mock import Mock, patch
 from duplifinder.utils import (
     audit_log_event,
     run_parallel,
     discover_py_files,
+    fold_cancellable,
+    iter_py_files,
     _parse_gitignore,
-    _matches_gitignore,
-    log_file_count
+    _bounded_submit,
+    _run_chunk,
+    _scan_dir,
+    log_file_count,
+    make_chunks,
+    schedule_longest_first,
+    PerformanceTracker,
+    DISCOVERY_LOOKAHEAD_PER_WORKER,
 )
+from duplifinder.audit import flush_audit_log
+from duplifinder.cache import CostHistory
 from duplifinder.config import Config
+from duplifinder.ast_processor import process_file_ast
+from duplifinder.executor import shutdown_pools
+from duplifinder.exceptions import ScanCancelled
 
 
 @pytest.fixture
@@ -30,6 +48,7 @@ def audit_config(tmp_path: Path) -> Config:
 def test_audit_log_event_enabled(audit_config: Config):
     """Test that audit log events are written when enabled."""
     audit_log_event(audit_config, "test_event", key="value")
+    flush_audit_log()
 
     log_file = audit_config.audit_log_path
     assert log_file.exists()
@@ -70,21 +89,13 @@ def test_run_parallel_parallel(mock_config: Config):
     items = [Path("a.py"), Path("b.py")]
     process_fn = Mock(return_value="processed")
 
-    # FIXED: Removed "src." from the patch path
-    with patch("duplifinder.utils.tqdm") as mock_tqdm:
-        # Mock the as_completed iterator
-        mock_future = Mock()
-        mock_future.result.return_value = "processed"
-
-        # This mocks the result of as_completed(futures)
-        mock_tqdm.return_value = [mock_future, mock_future]
-
-        results = list(run_parallel(items, process_fn, config=mock_config))
+    results = list(run_parallel(items, process_fn, config=mock_config))
 
-    # In a real parallel run, results might be out of order, but here we mock the return.
+    # In a real parallel run, results might be out of order; every file yields one result.
     assert results == ["processed", "processed"]
     assert process_fn.call_count == 2
 
+
 def test_parse_gitignore(tmp_path: Path, audit_config: Config):
     """Test parsing of .gitignore files."""
     gitignore = tmp_path / ".gitignore"
@@ -165,7 +176,7 @@ def test_discover_py_files_non_python_mime(tmp_path: Path, mock_config: Config,
     assert len(files) == 0
 
 def test_discover_py_files_no_markers(tmp_path: Path, mock_config: Config, caplog):
-    """Test discover_py_files skips .py files with no Python markers."""
+    """Test .py files with no Python markers are rejected by the processor's read, not discovery."""
     mock_config.root = tmp_path
     (tmp_path / "test.py").write_text("just some text") # No 'def' or 'class'
 
@@ -173,79 +184,189 @@ def test_discover_py_files_no_markers(tmp_path: Path, mock_config: Config, caplo
     with patch("mimetypes.guess_type", return_value=("text/x-python", None)), \
          caplog.at_level(logging.INFO):
         files = discover_py_files(mock_config)
+        result = process_file_ast(files[0], mock_config)
 
     assert "No Python markers" in caplog.text
-    assert len(files) == 0
+    assert result == (None, None, 0)  # Neither scanned nor skipped
 
 
 def test_run_parallel_multiprocessing(mock_config: Config):
-    """Test run_parallel with ProcessPoolExecutor."""
+    """Test run_parallel with ProcessPoolExecutor submits chunks of files."""
     mock_config.parallel = True
     mock_config.use_multiprocessing = True # <-- Key change
     mock_config.max_workers = 2
+    mock_config.chunk_size = 2
     items = [Path("a.py"), Path("b.py")]
     process_fn = Mock(return_value="processed")
 
-    # FIXED: Removed "src." from patch paths
-    with patch("duplifinder.utils.tqdm") as mock_tqdm, \
-         patch("concurrent.futures.ProcessPoolExecutor") as mock_executor:
-
-        mock_future = Mock()
-        mock_future.result.return_value = "processed"
-        mock_tqdm.return_value = [mock_future, mock_future]
-
-        mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
+    with patch("concurrent.futures.ProcessPoolExecutor") as mock_executor:
+        done = concurrent.futures.Future()
+        done.set_result((["processed", "processed"], [0.1, 0.1], {}))  # One chunk: results, per-file timings, cache updates
+        submit = mock_executor.return_value.submit
+        submit.return_value = done
 
         results = list(run_parallel(items, process_fn, config=mock_config))
 
     assert results == ["processed", "processed"]
+    assert submit.call_count == 1
+    assert submit.call_args.args[:3] == (_run_chunk, process_fn, items)
 
 
+def test_bounded_submit_limits_in_flight():
+    """Test the submission window never holds more than N pending tasks."""
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
 
-def test_matches_gitignore_negation(mock_config: Config):
-    """Test .gitignore negation logic."""
-    mock_config.root = Path("/app")
-    # Patterns must match relative paths
-    patterns = ["!logs/important.log", "logs/*.log"]
+    def work(n):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.001)
+        with lock:
+            in_flight -= 1
+        return n * 2
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        def submit(n):
+            return pool.submit(work, n)
+
+        consumed = []
+        for task, future in _bounded_submit(submit, range(50), window=3):
+            consumed.append(task)
+            assert future.result() == task * 2
+
+    assert sorted(consumed) == list(range(50))
+    assert peak <= 3
+
+
+def test_run_parallel_bounded_window(mock_config: Config):
+    """Test run_parallel submits lazily: results flow out before every file is submitted."""
+    mock_config.parallel = True
+    mock_config.use_multiprocessing = False
+    mock_config.max_workers = 2
+    mock_config.max_in_flight = 2
+    submitted = []
+    items = [Path(f"f{i}.py") for i in range(20)]
+
+    def process_fn(p, config):
+        submitted.append(p)
+        return p
+
+    gen = run_parallel(items, process_fn, config=mock_config)
+    first = next(gen)
+    assert first in items
+    assert len(submitted) <= 4  # Window of 2, plus the refill before the first result is handed over
+    assert sorted(list(gen) + [first]) == sorted(items)
+    gen.close()
+
+
+def test_make_chunks_by_count_and_bytes(tmp_path: Path):
+    """Test chunks adapt to file count, honour an explicit size and split on the byte budget."""
+    files = []
+    for i in range(100):
+        f = tmp_path / f"f{i}.py"
+        f.write_text("x = 1\n")
+        files.append(f)
+
+    adaptive = make_chunks(files, workers=2)
+    assert [len(c) for c in adaptive] == [13] * 7 + [9]  # ~4 chunks per worker
+    assert [p for c in adaptive for p in c] == files
+
+    assert [len(c) for c in make_chunks(files, workers=2, chunk_size=40)] == [40, 40, 20]
+
+    big = tmp_path / "big.py"
+    big.write_text("x = 1\n" * 10_000)
+    chunks = make_chunks(files[:3] + [big] + files[3:6], workers=1)
+    assert [big] in chunks  # A file over the byte budget is isolated in its own chunk
+    assert make_chunks([], workers=4) == []
+
+
+def test_schedule_longest_first(tmp_path: Path):
+    """Test files are ordered by size without history and by recorded cost with it."""
+    small, medium, large = Path("small.py"), Path("medium.py"), Path("large.py")
+    sizes = {"small.py": 10, "medium.py": 100, "large.py": 1000}
+    assert schedule_longest_first([small, medium, large], sizes) == [large, medium, small]
+
+    history = CostHistory(tmp_path / "costs.json", "process_file_ast")
+    history.record("small.py", 5.0)  # Small but slow to process
+    history.record("large.py", 0.1)
+    # medium.py has no record: 100 bytes at the observed 5.1s / 1010 bytes is ~0.5s
+    assert schedule_longest_first([small, medium, large], sizes, history) == [small, medium, large]
+
+
+def test_run_parallel_records_costs(tmp_path: Path, mock_config: Config):
+    """Test parallel runs persist per-file timings when caching is enabled."""
+    mock_config.parallel = True
+    mock_config.max_workers = 2
+    mock_config.enable_cache = True
+    mock_config.cost_history_path = tmp_path / "costs.json"
+    files = [tmp_path / "a.py", tmp_path / "b.py"]
+    for f in files:
+        f.write_text("x = 1\n")
+
+    def process(path, config):
+        return path.name
+
+    assert sorted(run_parallel(files, process, config=mock_config)) == ["a.py", "b.py"]
+    history = CostHistory(mock_config.cost_history_path, "process")
+    assert set(history.costs) == {str(f) for f in files}
+
+
+def test_run_parallel_process_pool_chunks(tmp_path: Path, mock_config: Config):
+    """Test a real process pool returns one result per file and records chunk metrics."""
+    files = []
+    for i in range(9):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(f"def f{i}(): pass\n")
+        files.append(f)
+    mock_config.parallel = True
+    mock_config.use_multiprocessing = True
+    mock_config.max_workers = 2
+    mock_config.chunk_size = 4
+    tracker = PerformanceTracker(verbose=True)
 
-    assert _matches_gitignore(Path("/app/logs/test.log"), patterns, mock_config) is True
-    assert _matches_gitignore(Path("/app/logs/important.log"), patterns, mock_config) is False
+    results = list(run_parallel(files, process_file_ast, config=mock_config, tracker=tracker))
 
+    names = sorted(name for defs, _, _ in results for name in defs["def"])
+    assert names == [f"f{i}" for i in range(9)]
+    assert tracker.metrics["Task chunks"] == 3
 
 
 def test_discover_py_files_stat_error(tmp_path: Path, audit_config, caplog):
     """Test discover_py_files handles stat errors."""
     audit_config.root = tmp_path
 
-    mock_file = Mock(spec=Path)
-    mock_file.name = "test.py"
-    mock_file.suffix = ".py" # Needs suffix to be checked as a python file
-    mock_file.parts = ("test.py",)
-    mock_file.relative_to.return_value = Path("test.py") # Required for gitignore check
-    mock_file.stat.side_effect = PermissionError("stat failed")
+    mock_entry = Mock()
+    mock_entry.name = "test.py"
+    mock_entry.path = str(tmp_path / "test.py")  # Never created, so the header read fails too
+    mock_entry.stat.side_effect = PermissionError("stat failed")
 
     # FIXED: Added mimetypes patch here as well.
-    with patch("pathlib.Path.rglob", return_value=[mock_file]), \
+    with patch("duplifinder.utils._walk_files", return_value=[mock_entry]), \
          patch("mimetypes.guess_type", return_value=("text/x-python", None)):
         files = discover_py_files(audit_config)
+    flush_audit_log()
 
     log_content = audit_config.audit_log_path.read_text()
     assert "stat_failed" in log_content
     assert len(files) == 0  # File is skipped because open() is not mocked for the Mock path object
 
 
-def test_discover_py_files_read_header_error(tmp_path: Path, audit_config, caplog):
-    """Test discover_py_files handles read errors on header check."""
+def test_discover_py_files_does_not_open_files(tmp_path: Path, audit_config, caplog):
+    """Test discovery decides from names and stat data only; file contents are read once, by workers."""
     audit_config.root = tmp_path
-    (tmp_path / "test.py").touch()
+    (tmp_path / "test.py").write_text("def a(): pass")
+    (tmp_path / ".gitignore").write_text("*.log\n")
 
     audit_config.respect_gitignore = False
 
     original_open = open
 
     def smart_open(path, *args, **kwargs):
-        # Make sure we only fail the 'rb' read, not the audit log 'a' write
-        if "test.py" in str(path) and args and args[0] == "rb":
+        # Make sure we only fail reads of scanned files, not the audit log 'a' write
+        if "test.py" in str(path):
             raise IOError("read failed")
         return original_open(path, *args, **kwargs)
 
@@ -253,6 +374,201 @@ def test_discover_py_files_read_header_error(tmp_path: Path, audit_config, caplo
          patch("builtins.open", side_effect=smart_open):
         files = discover_py_files(audit_config)
 
-    log_content = audit_config.audit_log_path.read_text()
-    assert "header_read_failed" in log_content
-    assert len(files) == 0  # File is skipped
\ No newline at end of file
+    assert files == [tmp_path / "test.py"]
+    flush_audit_log()
+    assert "file_accepted" in audit_config.audit_log_path.read_text()
+
+def test_discover_py_files_prunes_ignored_dirs(tmp_path: Path, mock_config: Config):
+    """Test that ignored and gitignored dirs are pruned before being listed."""
+    mock_config.root = tmp_path
+    (tmp_path / ".gitignore").write_text("generated/\n")
+    for d in ("pkg", "node_modules", "generated"):
+        (tmp_path / d).mkdir()
+        (tmp_path / d / "mod.py").write_text("def f(): pass")
+
+    listed = []
+    original_scan_dir = _scan_dir
+
+    def tracking_scan_dir(directory):
+        listed.append(Path(directory).name)
+        return original_scan_dir(directory)
+
+    with patch("duplifinder.utils._scan_dir", side_effect=tracking_scan_dir):
+        files = discover_py_files(mock_config)
+
+    assert [f.parent.name for f in files] == ["pkg"]
+    assert "node_modules" not in listed
+    assert "generated" not in listed
+    assert listed.count("pkg") == 1  # One pass, regardless of the number of extensions
+
+
+def test_discover_py_files_extension_set(tmp_path: Path, mock_config: Config):
+    """Test that only configured extensions are accepted, matched on the final suffix."""
+    mock_config.root = tmp_path
+    mock_config.extensions = {"py", "js"}
+    (tmp_path / "a.py").write_text("def a(): pass")
+    (tmp_path / "b.js").write_text("function b() {}")
+    (tmp_path / "c.js.map").write_text("{}")
+    (tmp_path / "Makefile").write_text("all:")
+
+    files = discover_py_files(mock_config)
+
+    assert sorted(f.name for f in files) == ["a.py", "b.js"]
+
+
+def test_discover_py_files_nested_gitignore(tmp_path: Path, mock_config: Config):
+    """Test that nested .gitignore files apply below their directory and can re-include files."""
+    mock_config.root = tmp_path
+    (tmp_path / ".gitignore").write_text("gen_*.py\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / ".gitignore").write_text("!gen_keep.py\nlocal.py\n")
+    for name in ("gen_a.py", "local.py", "pkg/gen_b.py", "pkg/gen_keep.py", "pkg/local.py", "pkg/mod.py"):
+        (tmp_path / name).write_text("def f(): pass")
+
+    files = discover_py_files(mock_config)
+
+    rel = sorted(f.relative_to(tmp_path).as_posix() for f in files)
+    assert rel == ["local.py", "pkg/gen_keep.py", "pkg/mod.py"]
+
+
+def test_discover_py_files_exclude_patterns(tmp_path: Path, audit_config: Config):
+    """Test that exclude_patterns are applied during discovery, by file name or relative path."""
+    audit_config.exclude_patterns = {"*_pb2.py", "*/migrations/*"}
+    (tmp_path / "app" / "migrations").mkdir(parents=True)
+    (tmp_path / "app" / "migrations" / "0001.py").write_text("class Migration: pass")
+    (tmp_path / "app" / "models_pb2.py").write_text("class Model: pass")
+    (tmp_path / "app" / "models.py").write_text("class Model: pass")
+
+    files = discover_py_files(audit_config)
+
+    assert [f.name for f in files] == ["models.py"]
+    flush_audit_log()
+    assert audit_config.audit_log_path.read_text().count("exclude_pattern_match") == 2
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_discover_git_index_parity_with_walker(tmp_path: Path, mock_config: Config):
+    """Test that the git index fast path discovers the same files as the walker."""
+    mock_config.root = tmp_path
+    mock_config.exclude_patterns = {"*_pb2.py"}
+    (tmp_path / ".gitignore").write_text("*.log\nout/\n")
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "out").mkdir()
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "pkg" / ".gitignore").write_text("local_*.py\n")
+    for name in ("a.py", "b.js", "api_pb2.py", "out/gen.py", "node_modules/dep.js",
+                 "pkg/mod.py", "pkg/local_x.py", "pkg/sub/deep.ts", "notes.txt"):
+        (tmp_path / name).write_text("def f(): pass")
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    subprocess.run(["git", "-C", str(tmp_path), "add", "a.py", "pkg/mod.py"], check=True)
+
+    mock_config.use_git_index = False
+    walked = sorted(discover_py_files(mock_config))
+    mock_config.use_git_index = True
+    with patch("duplifinder.utils._walk_files", side_effect=AssertionError("walker used")):
+        indexed = sorted(discover_py_files(mock_config))
+
+    assert indexed == walked
+    assert [p.relative_to(tmp_path).as_posix() for p in indexed] == ["a.py", "b.js", "pkg/mod.py", "pkg/sub/deep.ts"]
+
+
+def test_discover_falls_back_without_git(tmp_path: Path, mock_config: Config):
+    """Test that discovery falls back to the walker when git is unavailable."""
+    mock_config.root = tmp_path
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "a.py").write_text("def a(): pass")
+
+    with patch("duplifinder.vcs.subprocess.run", side_effect=FileNotFoundError("git")):
+        files = discover_py_files(mock_config)
+
+    assert [f.name for f in files] == ["a.py"]
+
+
+def test_discover_multiple_roots(tmp_path: Path, mock_config: Config):
+    """Test that several roots are discovered into one list, in root order and without duplicates."""
+    for svc in ("svc_a", "svc_b"):
+        (tmp_path / svc / "pkg").mkdir(parents=True)
+        (tmp_path / svc / "pkg" / "models.py").write_text("class Model: pass")
+    (tmp_path / "svc_b" / ".gitignore").write_text("gen/\n")
+    (tmp_path / "svc_b" / "gen").mkdir()
+    (tmp_path / "svc_b" / "gen" / "out.py").write_text("def gen(): pass")
+    mock_config.root = tmp_path / "svc_a"
+    # svc_a twice: overlapping roots must not scan a file twice
+    mock_config.roots = [tmp_path / "svc_a", tmp_path / "svc_b", tmp_path / "svc_a"]
+
+    files = discover_py_files(mock_config)
+
+    assert [p.relative_to(tmp_path).as_posix() for p in files] == ["svc_a/pkg/models.py", "svc_b/pkg/models.py"]
+
+
+@pytest.mark.parametrize("enable_cache", [False, True])
+def test_discover_parallel_walk_matches_sequential(tmp_path: Path, mock_config: Config, enable_cache: bool):
+    """Test that a concurrent directory walk yields the same files, in the same order."""
+    mock_config.root = tmp_path / "src"
+    mock_config.use_git_index = False
+    mock_config.enable_cache = enable_cache
+    mock_config.discovery_cache_path = tmp_path / "discovery.json"
+    (mock_config.root / ".gitignore").parent.mkdir()
+    (mock_config.root / ".gitignore").write_text("build/\n")
+    for d in range(6):
+        for sub in ("", "/inner", "/build", "/node_modules"):
+            (mock_config.root / f"pkg{d}{sub}").mkdir()
+            (mock_config.root / f"pkg{d}{sub}" / "mod.py").write_text("def f(): pass")
+    (mock_config.root / "pkg3" / ".gitignore").write_text("inner/\n")
+
+    mock_config.discovery_workers = 1
+    sequential = discover_py_files(mock_config)
+    mock_config.discovery_workers = 8
+    parallel = discover_py_files(mock_config)
+
+    assert parallel == sequential
+    assert len(sequential) == 11  # 6 pkgN/mod.py + 5 pkgN/inner/mod.py (pkg3/inner is ignored)
+
+
+def test_parallel_walk_lists_a_bounded_window_ahead(tmp_path: Path, mock_config: Config):
+    """Test the concurrent walk only lists a few directories per worker ahead of where it is."""
+    mock_config.root = tmp_path
+    mock_config.use_git_index = False
+    mock_config.enable_cache = False
+    mock_config.discovery_workers = 2
+    for d in range(100):
+        (tmp_path / f"pkg{d:03}").mkdir()
+        (tmp_path / f"pkg{d:03}" / "mod.py").write_text("def f(): pass")
+    listed = []
+
+    def counting_scan_dir(directory):
+        listed.append(directory)
+        return _scan_dir(directory)
+
+    with patch("duplifinder.utils._scan_dir", side_effect=counting_scan_dir):
+        files = iter_py_files(mock_config)
+        assert next(files).name == "mod.py"
+        time.sleep(0.2)  # Let the pool run as far ahead as it is allowed to
+        assert len(listed) <= 1 + 2 * DISCOVERY_LOOKAHEAD_PER_WORKER  # The root, then the lookahead
+        assert len(list(files)) == 99
+    assert len(listed) == 101
+
+
+def test_fold_cancellable_closes_results_and_reports_progress():
+    def results():
+        yield 1
+        yield 2
+        raise KeyboardInterrupt
+
+    gen = results()
+    folded = []
+    with pytest.raises(ScanCancelled) as exc:
+        fold_cancellable(gen, folded.append, lambda: (list(folded),), expected=5)
+    assert exc.value.results == ([1, 2],)
+    assert exc.value.not_processed == 3
+    assert gen.gi_frame is None  # Closed: run_parallel would cancel its queued work here
+
+
+def test_iter_py_files_matches_discover_py_files_across_roots(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "a.py").write_text("x = 1\n")
+    (tmp_path / "pkg" / "b.py").write_text("y = 2\n")
+    # Overlapping roots: pkg/b.py is listed under both, and kept once
+    config = Config(roots=[tmp_path / "pkg", tmp_path], respect_gitignore=False)
+    assert list(iter_py_files(config)) == discover_py_files(config)
+    assert sorted(p.name for p in discover_py_files(config)) == ["a.py", "b.py"]